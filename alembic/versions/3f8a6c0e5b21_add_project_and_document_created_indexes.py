@@ -0,0 +1,28 @@
+"""Add newest-first indexes for project and document listings
+
+Revision ID: 3f8a6c0e5b21
+Revises: 7c1e9d2b4f60
+Create Date: 2026-10-16 11:04:27.190534
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a6c0e5b21'
+down_revision: Union[str, None] = '7c1e9d2b4f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_user_created', 'projects', ['user_id', sa.text('created_at DESC')], unique=False)
+    op.create_index('idx_project_created', 'documents', ['project_id', sa.text('created_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_project_created', table_name='documents')
+    op.drop_index('idx_user_created', table_name='projects')
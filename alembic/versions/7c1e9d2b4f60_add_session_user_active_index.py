@@ -0,0 +1,26 @@
+"""Add composite index for active session lookups
+
+Revision ID: 7c1e9d2b4f60
+Revises: 24a232e81e4a
+Create Date: 2026-10-16 10:12:03.412907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e9d2b4f60'
+down_revision: Union[str, None] = '24a232e81e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_session_user_active', 'user_sessions', ['user_id', 'is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_session_user_active', table_name='user_sessions')
@@ -6,10 +6,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Tuple
+from typing import Any, Dict, Tuple
+from collections import OrderedDict
 import secrets
+import time
 
 from database import get_db, User, UserSession
 from config import settings
@@ -20,6 +23,12 @@ security = HTTPBearer()
 # Password hashing context using bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified JWT payloads keyed by raw token (least recently used evicted first).
+# A token string always decodes to the same payload, so a hit is as good as a
+# fresh signature check until the token's exp; revocation is still checked in the DB.
+JWT_CACHE_SIZE = 10_000
+_decoded_tokens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
 
 def hash_password(password: str) -> Tuple[str, str]:
     """
@@ -98,6 +107,40 @@ def create_access_token(user_id: str, email: str) -> Tuple[str, datetime]:
     return token, expire
 
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verify and decode a JWT access token, reusing earlier verifications of the same token
+
+    Args:
+        token: Raw JWT string
+
+    Returns:
+        Token payload
+
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    payload = _decoded_tokens.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            _decoded_tokens.move_to_end(token)
+            return payload
+        # Expired - drop it and let jwt.decode raise
+        del _decoded_tokens[token]
+
+    payload = jwt.decode(
+        token,
+        settings.jwt_secret_key,
+        algorithms=[settings.jwt_algorithm]
+    )
+
+    _decoded_tokens[token] = payload
+    if len(_decoded_tokens) > JWT_CACHE_SIZE:
+        _decoded_tokens.popitem(last=False)
+
+    return payload
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -128,12 +171,8 @@ async def get_current_user(
     )
 
     try:
-        # Decode JWT token
-        payload = jwt.decode(
-            token,
-            settings.jwt_secret_key,
-            algorithms=[settings.jwt_algorithm]
-        )
+        # Decode JWT token (signature check skipped for recently verified tokens)
+        payload = decode_access_token(token)
 
         # Extract user ID from payload
         user_id: str = payload.get("sub")
@@ -141,25 +180,27 @@ async def get_current_user(
         if user_id is None:
             raise credentials_exception
 
-        # Verify token is active in database
-        session = db.query(UserSession).filter(
-            UserSession.access_token == token,
-            UserSession.is_active == True,
-            UserSession.expires_at > datetime.utcnow()
+        # Verify token is active and load its user in one query
+        # (outer join so an inactive/missing user is told apart from a revoked token)
+        row = db.execute(
+            select(UserSession.id, User).outerjoin(
+                User,
+                (User.id == user_id) & (User.is_active == True)
+            ).where(
+                UserSession.access_token == token,
+                UserSession.is_active == True,
+                UserSession.expires_at > datetime.utcnow()
+            )
         ).first()
 
-        if not session:
+        if row is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token expired or invalid",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Get user from database
-        user = db.query(User).filter(
-            User.id == user_id,
-            User.is_active == True
-        ).first()
+        user = row.User
 
         if user is None:
             raise credentials_exception
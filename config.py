@@ -3,6 +3,7 @@ Configuration module for PATMASTER Document Extraction Pipeline
 Loads environment variables and provides configuration settings
 """
 import os
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from loguru import logger
@@ -32,9 +33,27 @@ class Settings(BaseSettings):
 
     # Redis Configuration
     redis_url: str = "redis://localhost:6379/0"
+    redis_result_cache: bool = False  # Share extraction results across workers/hosts through redis_url
+    redis_result_ttl_s: int = 24 * 3600
 
     # Concurrency Settings
     max_concurrent_extractions: int = 50
+    llama_max_concurrency: int = 4  # Concurrent LlamaParse requests per process
+    llama_max_workers: int = 8  # Upper bound for LlamaParse num_workers (scaled by page count)
+    gemini_max_concurrency: int = 8  # Concurrent Gemini Vision calls per process (across all extractions)
+    llama_scanned_parse_mode: str = "parse_page_with_llm"  # Cheaper mode for PDFs without a text layer
+
+    # Hybrid extraction: stop waiting once this many layers succeeded (opt-in)
+    hybrid_early_return: bool = False
+    hybrid_min_layers_required: int = 1
+    hybrid_v1_start_delay: float = 1.5  # V2 head start; V1 LlamaParse is skipped if V2 is complete by then
+    hybrid_v1_skip_min_confidence: float = 0.9  # Applies only when V2 reports a confidence score
+
+    # Image output: inline base64 copies in ExtractedImage (image_path is always written)
+    include_image_base64: bool = False
+
+    # Celery worker diagnostics: log per-task traced-memory deltas (tracemalloc slows tasks; opt-in)
+    worker_memory_profiling: bool = False
 
     # Timeouts (seconds)
     extraction_timeout: int = 300
@@ -46,6 +65,9 @@ class Settings(BaseSettings):
     # Project Paths
     base_dir: Path = Path(__file__).parent
     extracted_output_dir: Path = base_dir / "extracted_output"
+    llamaparse_cache_dir: Path = base_dir / "llamaparse_cache"  # Parse results keyed by file SHA-256
+    hybrid_cache_dir: Path = base_dir / "hybrid_cache"  # Merged hybrid results keyed by file SHA-256
+    extraction_result_cache_dir: Path = base_dir / "extraction_cache"  # Final ExtractionResults keyed by upload SHA-256
     static_dir: Path = base_dir / "static"
 
     model_config = SettingsConfigDict(
@@ -59,6 +81,9 @@ class Settings(BaseSettings):
         super().__init__(**kwargs)
         # Create directories if they don't exist
         self.extracted_output_dir.mkdir(parents=True, exist_ok=True)
+        self.llamaparse_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hybrid_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.extraction_result_cache_dir.mkdir(parents=True, exist_ok=True)
         self.static_dir.mkdir(parents=True, exist_ok=True)
 
 
@@ -75,10 +100,19 @@ except Exception as e:
     raise
 
 
+@lru_cache(maxsize=2048)
+def _session_dir_path(user_id: str, session_id: str) -> Path:
+    """Output directory path for a user session (pure path computation, memoized)"""
+    return settings.extracted_output_dir / f"{user_id}_{session_id}"
+
+
 def get_session_output_dir(user_id: str, session_id: str) -> Path:
     """Get or create output directory for a specific user session"""
-    session_dir = settings.extracted_output_dir / f"{user_id}_{session_id}"
-    session_dir.mkdir(parents=True, exist_ok=True)
+    session_dir = _session_dir_path(user_id, session_id)
+    # One stat for the common (existing) case instead of mkdir + stat. Existence is not
+    # cached: the cleanup task in the worker can remove the directory behind our back.
+    if not session_dir.is_dir():
+        session_dir.mkdir(parents=True, exist_ok=True)
     return session_dir
 
 
@@ -5,7 +5,7 @@ Uses libsql-client with custom SQLAlchemy pool for Turso cloud database
 from sqlalchemy import create_engine, event, pool, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
-from typing import Generator
+from typing import AsyncGenerator
 from loguru import logger
 import os
 import libsql_client
@@ -133,14 +133,23 @@ except Exception as e:
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    # Column defaults are all client-side, so committed objects already hold every value;
+    # keeping them loaded avoids a SELECT per object on the next attribute access
+    expire_on_commit=False,
     bind=engine
 )
 
 
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[Session, None]:
     """
     Dependency function to get database session
 
+    Declared async so FastAPI runs it on the event loop: a sync generator
+    dependency is entered and exited through the threadpool, and holding a
+    session while waiting for a free worker thread is what deadlocks
+    under load. Creating and closing a Session does no I/O worth offloading
+    (the engine uses a single in-memory StaticPool connection).
+
     Usage in FastAPI:
         @app.get("/endpoint")
         async def endpoint(db: Session = Depends(get_db)):
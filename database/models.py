@@ -41,6 +41,11 @@ class UserSession(Base):
     # Relationships
     user = relationship("User", back_populates="sessions")
 
+    # Indexes
+    __table_args__ = (
+        Index('idx_session_user_active', 'user_id', 'is_active'),
+    )
+
 
 class Project(Base):
     """User projects containing documents for extraction"""
@@ -56,7 +61,12 @@ class Project(Base):
 
     # Relationships
     user = relationship("User", back_populates="projects")
-    documents = relationship("Document", back_populates="project", cascade="all, delete-orphan")
+    documents = relationship("Document", back_populates="project", cascade="all, delete-orphan", order_by="Document.created_at.desc()")
+
+    # Index for listing a user's projects newest first
+    __table_args__ = (
+        Index('idx_user_created', user_id, created_at.desc()),
+    )
 
 
 class Document(Base):
@@ -79,9 +89,10 @@ class Document(Base):
     project = relationship("Project", back_populates="documents")
     extraction = relationship("Extraction", back_populates="document", uselist=False, cascade="all, delete-orphan")
 
-    # Index for faster lookups
+    # Indexes for faster lookups
     __table_args__ = (
         Index('idx_project_doctype', 'project_id', 'document_type'),
+        Index('idx_project_created', project_id, created_at.desc()),
     )
 
 
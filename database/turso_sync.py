@@ -2,15 +2,179 @@
 Turso Cloud Sync Layer
 Synchronizes SQLAlchemy operations to Turso cloud database via libsql-client
 NO local SQLite files - pure cloud persistence
+
+Durability: writes are applied to Turso by a background thread after the flush, so a
+request can return (e.g. 201) before its rows reach Turso. Until then the in-memory
+SQLite mirror is the only copy - a crash, SIGKILL or OOM kill in that window (one HTTP
+round trip normally, longer while Turso is failing and batches are retried) loses
+writes the client was told succeeded.
 """
 from sqlalchemy import event, inspect, text
 from sqlalchemy.orm import Session
 from loguru import logger
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 import json
+import queue
+import threading
+import time
 from datetime import datetime
 
 
+# Rows per multi-row INSERT statement sent to Turso
+INSERT_ROWS_PER_STATEMENT = 500
+
+# Attempts (with exponential backoff from the base delay) before a failed batch is split up
+TURSO_BATCH_ATTEMPTS = 4
+TURSO_RETRY_BASE_DELAY_S = 0.5
+
+# Longest shutdown wait for queued Turso writes; anything still queued after it is lost
+TURSO_FLUSH_TIMEOUT_S = 30.0
+
+# One queued write: UPDATE/DELETE SQL, or (table, columns, per-row VALUES) for a table's INSERTs
+_TursoWrite = Union[str, Tuple[str, List[str], List[str]]]
+
+# Turso writes captured at flush time, applied in order by a single background thread
+_write_queue: "queue.Queue[List[_TursoWrite]]" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+
+# Row writes (INSERT rows, UPDATEs, DELETEs) queued or being applied, for the bounded shutdown flush
+_pending_statements = 0
+_pending_changed = threading.Condition()
+
+
+def _build_insert_sql(table_name: str, columns: List[str], rows: List[str]) -> str:
+    """Build a (multi-row) INSERT SQL statement from VALUES rows"""
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join(rows)}"
+
+
+def _count_rows(writes: List[_TursoWrite]) -> int:
+    """Row writes in one flush (each INSERT row counts, UPDATE/DELETE count once)"""
+    return sum(1 if isinstance(write, str) else len(write[2]) for write in writes)
+
+
+def _expand_writes(writes: List[_TursoWrite]) -> List[Tuple[str, Optional[Tuple[str, List[str], List[str]]]]]:
+    """
+    SQL statements for one flush, INSERT rows chunked into multi-row statements
+
+    Returns:
+        List of (sql, insert group or None) - the group lets a failed INSERT be split per row
+    """
+    statements = []
+    for write in writes:
+        if isinstance(write, str):
+            statements.append((write, None))
+            continue
+
+        table_name, columns, rows = write
+        for start in range(0, len(rows), INSERT_ROWS_PER_STATEMENT):
+            chunk = (table_name, columns, rows[start:start + INSERT_ROWS_PER_STATEMENT])
+            statements.append((_build_insert_sql(*chunk), chunk))
+    return statements
+
+
+def _apply_statements(turso_client, writes: List[_TursoWrite]):
+    """
+    Apply one flush's writes to Turso
+
+    The batch is one transaction, so it is retried with exponential backoff first.
+    If it still fails, the statements are applied one by one, and a failing multi-row
+    INSERT is split into single-row INSERTs, so one bad row cannot drop the rest of
+    the flush. Any statement that still fails is logged with its full SQL so the row
+    can be recovered by hand.
+    """
+    statements = _expand_writes(writes)
+    sqls = [sql for sql, _ in statements]
+
+    delay = TURSO_RETRY_BASE_DELAY_S
+    for attempt in range(1, TURSO_BATCH_ATTEMPTS + 1):
+        try:
+            turso_client.batch(sqls)
+            logger.debug(f"✅ Synced to Turso: {len(sqls)} statements")
+            return
+        except Exception as e:
+            logger.warning(f"⚠️  Turso batch failed (attempt {attempt}/{TURSO_BATCH_ATTEMPTS}): {e}")
+            if attempt < TURSO_BATCH_ATTEMPTS:
+                time.sleep(delay)
+                delay *= 2
+
+    logger.error(f"❌ Turso batch of {len(sqls)} statements failed, applying them one by one")
+    for sql, insert_group in statements:
+        try:
+            turso_client.execute(sql)
+            continue
+        except Exception as e:
+            if insert_group is None or len(insert_group[2]) == 1:
+                logger.error(f"❌ Turso statement dropped ({e}): {sql}")
+                continue
+            logger.warning(f"⚠️  Turso multi-row INSERT failed ({e}), retrying its rows one by one")
+
+        table_name, columns, rows = insert_group
+        for row in rows:
+            row_sql = _build_insert_sql(table_name, columns, [row])
+            try:
+                turso_client.execute(row_sql)
+            except Exception as e:
+                logger.error(f"❌ Turso statement dropped ({e}): {row_sql}")
+
+
+def _start_writer(turso_client):
+    """
+    Start the background thread that applies queued Turso writes
+
+    One flush = one batch (single HTTP round trip). A single thread keeps the
+    statements in flush order, and request handlers never wait on Turso (see the
+    module docstring for the durability window this opens).
+    """
+    global _writer_thread
+    if _writer_thread is not None:
+        return
+
+    def writer():
+        global _pending_statements
+        while True:
+            writes = _write_queue.get()
+            try:
+                _apply_statements(turso_client, writes)
+            except Exception as e:
+                logger.error(f"❌ Turso sync failed unexpectedly: {e}")
+            finally:
+                with _pending_changed:
+                    _pending_statements -= _count_rows(writes)
+                    _pending_changed.notify_all()
+
+    _writer_thread = threading.Thread(target=writer, name="turso-sync", daemon=True)
+    _writer_thread.start()
+
+
+def _enqueue(writes: List[_TursoWrite]):
+    """Hand one flush's writes to the background writer"""
+    global _pending_statements
+    with _pending_changed:
+        _pending_statements += _count_rows(writes)
+    _write_queue.put(writes)
+
+
+def flush_turso_sync(timeout_s: float = TURSO_FLUSH_TIMEOUT_S) -> int:
+    """
+    Wait until every queued Turso write has been applied, for at most timeout_s (call on shutdown)
+
+    Blocking - run it off the event loop.
+
+    Returns:
+        Number of row writes still queued or in flight when the wait gave up (0 if all applied)
+    """
+    if _writer_thread is None:
+        return 0
+
+    with _pending_changed:
+        _pending_changed.wait_for(lambda: _pending_statements == 0, timeout=timeout_s)
+        abandoned = _pending_statements
+
+    if abandoned:
+        logger.error(f"❌ Turso flush gave up after {timeout_s:.0f}s: {abandoned} row writes not applied")
+    return abandoned
+
+
 def setup_turso_sync(engine, turso_client):
     """
     Set up event listeners to sync all database operations to Turso cloud
@@ -38,11 +202,9 @@ def setup_turso_sync(engine, turso_client):
             escaped = str(value).replace("'", "''")
             return f"'{escaped}'"
 
-    def build_insert_sql(table_name: str, values: Dict[str, Any]) -> str:
-        """Build INSERT SQL statement"""
-        columns = ", ".join(values.keys())
-        vals = ", ".join(serialize_value(v) for v in values.values())
-        return f"INSERT INTO {table_name} ({columns}) VALUES ({vals})"
+    def build_row_values(values: Dict[str, Any]) -> str:
+        """Build one parenthesized VALUES row"""
+        return "(" + ", ".join(serialize_value(v) for v in values.values()) + ")"
 
     def build_update_sql(table_name: str, pk_name: str, pk_value: Any, values: Dict[str, Any]) -> str:
         """Build UPDATE SQL statement"""
@@ -53,6 +215,8 @@ def setup_turso_sync(engine, turso_client):
         """Build DELETE SQL statement"""
         return f"DELETE FROM {table_name} WHERE {pk_name} = {serialize_value(pk_value)}"
 
+    _start_writer(turso_client)
+
     # ============================================================================
     # INSERT SYNC
     # ============================================================================
@@ -60,14 +224,18 @@ def setup_turso_sync(engine, turso_client):
     def sync_after_flush(session, flush_context):
         """
         Sync all INSERT/UPDATE/DELETE operations to Turso after flush
-        This runs BEFORE commit, so we can still rollback if Turso fails
+
+        The SQL is built here (object state is only valid now) and handed to the
+        background writer, so the flush never blocks on Turso HTTP latency.
         """
+        statements: List[_TursoWrite] = []
         try:
-            # Process new objects (INSERT)
+            # Process new objects (INSERT) - per-row VALUES grouped by table (the writer builds
+            # multi-row INSERTs from them and can fall back to single rows)
+            insert_rows: Dict[str, Tuple[List[str], List[str]]] = {}
             for obj in session.new:
                 table_name = obj.__tablename__
                 mapper = inspect(obj.__class__)
-                pk_name = mapper.primary_key[0].name
 
                 # Get all column values
                 values = {}
@@ -75,10 +243,12 @@ def setup_turso_sync(engine, turso_client):
                     col_name = column.name
                     values[col_name] = getattr(obj, col_name, None)
 
-                # Execute INSERT on Turso
-                sql = build_insert_sql(table_name, values)
-                logger.debug(f"Turso INSERT: {sql}")
-                turso_client.execute(sql)
+                columns, rows = insert_rows.setdefault(table_name, (list(values), []))
+                rows.append(build_row_values(values))
+
+            for table_name, (columns, rows) in insert_rows.items():
+                logger.debug(f"Turso INSERT: {len(rows)} rows into {table_name}")
+                statements.append((table_name, columns, rows))
 
             # Process updated objects (UPDATE)
             for obj in session.dirty:
@@ -98,7 +268,7 @@ def setup_turso_sync(engine, turso_client):
                     # Execute UPDATE on Turso
                     sql = build_update_sql(table_name, pk_name, pk_value, values)
                     logger.debug(f"Turso UPDATE: {sql}")
-                    turso_client.execute(sql)
+                    statements.append(sql)
 
             # Process deleted objects (DELETE)
             for obj in session.deleted:
@@ -110,14 +280,14 @@ def setup_turso_sync(engine, turso_client):
                 # Execute DELETE on Turso
                 sql = build_delete_sql(table_name, pk_name, pk_value)
                 logger.debug(f"Turso DELETE: {sql}")
-                turso_client.execute(sql)
-
-            logger.debug(f"✅ Synced to Turso: {len(session.new)} inserts, {len(session.dirty)} updates, {len(session.deleted)} deletes")
+                statements.append(sql)
 
         except Exception as e:
             logger.error(f"❌ Turso sync failed: {e}")
             # Don't raise - allow local transaction to continue
-            # TODO: Implement retry queue for failed syncs
+
+        if statements:
+            _enqueue(statements)
 
     logger.success("✅ Turso sync event listeners registered")
 
@@ -9,6 +9,7 @@ Production-grade document extraction for PDF and DOCX files with:
 - Async processing with Celery
 - Scalable to 10,000+ concurrent users
 """
+import asyncio
 import sys
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -16,7 +17,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from loguru import logger
 
 # Configure loguru
@@ -40,6 +41,14 @@ from config import settings, validate_api_keys
 from routers import auth, projects, documents
 from routers.auth import limiter
 from database.connection import init_database, check_database_connection
+from database.turso_sync import flush_turso_sync
+
+# orjson-backed responses when available (falls back to stdlib json)
+try:
+    import orjson  # noqa: F401
+    DEFAULT_RESPONSE_CLASS = ORJSONResponse
+except ImportError:
+    DEFAULT_RESPONSE_CLASS = JSONResponse
 
 
 @asynccontextmanager
@@ -111,6 +120,15 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Application shutting down...")
+
+    # Apply Turso writes still queued in the background (bounded, off the event loop)
+    await asyncio.to_thread(flush_turso_sync)
+
+    # Close pooled HTTP clients
+    from services.cloudinary_service import close_http_client
+    from pipeline.pdf_extractor_v2 import close_http_client as close_llamacloud_http_client
+    await close_http_client()
+    await close_llamacloud_http_client()
     logger.info("Cleanup complete. Goodbye!")
 
 
@@ -120,6 +138,7 @@ app = FastAPI(
     description="Production-grade document extraction pipeline for PDF and DOCX files",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=DEFAULT_RESPONSE_CLASS,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -3,13 +3,16 @@ Cloudinary Wrapper for Extraction Pipeline
 Downloads files from Cloudinary for processing, uploads results back to Cloudinary
 DOES NOT MODIFY extraction logic - just handles file I/O
 """
+import asyncio
 import tempfile
-import requests
 from pathlib import Path
 from loguru import logger
 from typing import Dict, Any
 import shutil
 
+# Extracted images uploaded to Cloudinary at once
+IMAGE_UPLOAD_CONCURRENCY = 8
+
 
 async def download_from_cloudinary_to_temp(cloudinary_url: str, filename: str) -> Path:
     """
@@ -25,20 +28,22 @@ async def download_from_cloudinary_to_temp(cloudinary_url: str, filename: str) -
     try:
         logger.info(f"📥 Downloading from Cloudinary: {cloudinary_url}")
 
-        # Download file
-        response = requests.get(cloudinary_url, timeout=60)
-        response.raise_for_status()
+        from services.cloudinary_service import download_file_to_path
 
         # Create temporary file with correct extension
         suffix = Path(filename).suffix
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
         temp_path = Path(temp_file.name)
-
-        # Write content
-        temp_file.write(response.content)
         temp_file.close()
 
-        logger.success(f"✅ Downloaded to temp: {temp_path} ({len(response.content) / 1024:.2f} KB)")
+        # Stream the download into it (async, chunked)
+        try:
+            size = await download_file_to_path(cloudinary_url, temp_path)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        logger.success(f"✅ Downloaded to temp: {temp_path} ({size / 1024:.2f} KB)")
 
         return temp_path
 
@@ -68,22 +73,32 @@ async def upload_extracted_images_to_cloudinary(
 
         logger.info(f"📤 Uploading {len(images_list)} extracted images to Cloudinary")
 
+        semaphore = asyncio.Semaphore(IMAGE_UPLOAD_CONCURRENCY)
+
+        async def upload_one(img, local_path: Path):
+            async with semaphore:
+                # Upload to Cloudinary
+                cloudinary_url = await upload_image_from_path(
+                    local_path,
+                    user_id,
+                    session_id,
+                    img.image_id if hasattr(img, 'image_id') else local_path.stem
+                )
+
+            # Update image path to Cloudinary URL
+            img.image_path = cloudinary_url
+            logger.debug(f"  ✅ {img.image_id}: {cloudinary_url}")
+
+        # Uploads overlap (bounded by the semaphore) instead of running one after another
+        uploads = []
         for img in images_list:
             if hasattr(img, 'image_path') and img.image_path:
                 local_path = Path(img.image_path)
 
                 if local_path.exists():
-                    # Upload to Cloudinary
-                    cloudinary_url = await upload_image_from_path(
-                        local_path,
-                        user_id,
-                        session_id,
-                        img.image_id if hasattr(img, 'image_id') else local_path.stem
-                    )
-
-                    # Update image path to Cloudinary URL
-                    img.image_path = cloudinary_url
-                    logger.debug(f"  ✅ {img.image_id}: {cloudinary_url}")
+                    uploads.append(upload_one(img, local_path))
+
+        await asyncio.gather(*uploads)
 
         logger.success(f"✅ All {len(images_list)} images uploaded to Cloudinary")
 
@@ -3,9 +3,12 @@ Diagram Description Module
 Uses Google Gemini 2.5 Flash Vision API to describe diagrams in structured format
 """
 import asyncio
+import hashlib
 import json
+import re
 import time
 from pathlib import Path
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 from loguru import logger
 
@@ -18,6 +21,17 @@ except ImportError:
 from .models import ExtractedImage, DiagramDescription
 from config import settings
 
+# Process-wide cap on in-flight Gemini calls: concurrent extractions share one rate limit
+_GEMINI_SEM = asyncio.Semaphore(settings.gemini_max_concurrency)
+
+# Parsed Gemini descriptions keyed by image content SHA-256 (least recently used evicted first);
+# repeated figures/logos across pages and documents are described once
+DESCRIPTION_CACHE_SIZE = 1024
+_description_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Descriptions being computed right now, so concurrent requests for the same image share one call
+_pending_descriptions: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+
 
 # Exact prompt as specified for patent diagram analysis
 DIAGRAM_DESCRIPTION_PROMPT = """You are a technical patent diagram analyzer. Given this image from a patent document, provide a STRUCTURED description.
@@ -92,7 +106,7 @@ class DiagramDescriber:
         """
         try:
             logger.info(f"Describing diagram: {image.image_id}")
-            start_time = time.time()
+            start_time = time.perf_counter()
 
             # Read image file
             image_path = Path(image.image_path)
@@ -106,11 +120,8 @@ class DiagramDescriber:
             # Determine MIME type from file extension
             mime_type = self._get_mime_type(image_path.suffix)
 
-            # Call Gemini Vision API
-            response = await self._call_gemini_vision(image_bytes, mime_type)
-
-            # Parse JSON response
-            description_data = self._parse_gemini_response(response)
+            # Call Gemini Vision API and parse its JSON (cached by image content)
+            description_data = await self._describe_image_bytes(image_bytes, mime_type)
 
             if not description_data:
                 logger.warning(f"Failed to parse Gemini response for {image.image_id}")
@@ -130,7 +141,7 @@ class DiagramDescriber:
                 image_type=description_data.get("image_type")
             )
 
-            processing_time = time.time() - start_time
+            processing_time = time.perf_counter() - start_time
             logger.success(f"Diagram {image.image_id} described in {processing_time:.2f}s")
 
             return diagram_desc
@@ -178,6 +189,52 @@ class DiagramDescriber:
         logger.info(f"Successfully described {len(descriptions)}/{len(images)} diagrams")
         return descriptions
 
+    async def _describe_image_bytes(self, image_bytes: bytes, mime_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Parsed Gemini description of an image, reusing earlier results for identical bytes
+
+        Args:
+            image_bytes: Image file bytes
+            mime_type: MIME type of image
+
+        Returns:
+            Parsed JSON dictionary or None if the response could not be parsed
+        """
+        key = hashlib.sha256(image_bytes).hexdigest()
+
+        # Already described
+        cached = _description_cache.get(key)
+        if cached is not None:
+            _description_cache.move_to_end(key)
+            logger.debug(f"Diagram description cache hit ({key[:12]})")
+            return cached
+
+        # Being described by another task - wait for that call instead of making a new one
+        pending = _pending_descriptions.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        _pending_descriptions[key] = future
+        try:
+            response = await self._call_gemini_vision(image_bytes, mime_type)
+            description_data = self._parse_gemini_response(response)
+
+            # Only successful parses are cached (a failure is retried next time)
+            if description_data:
+                _description_cache[key] = description_data
+                if len(_description_cache) > DESCRIPTION_CACHE_SIZE:
+                    _description_cache.popitem(last=False)
+
+            future.set_result(description_data)
+            return description_data
+
+        finally:
+            # Waiters of a failed/cancelled call get None (the caller logs the failure)
+            if not future.done():
+                future.set_result(None)
+            del _pending_descriptions[key]
+
     async def _call_gemini_vision(self, image_bytes: bytes, mime_type: str) -> str:
         """
         Call Gemini Vision API with image and prompt
@@ -200,14 +257,15 @@ class DiagramDescriber:
             ]
 
             # Make async API call
-            response = await self.client.aio.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config={
-                    "temperature": 0.1,  # Low temperature for consistent structured output
-                    "response_mime_type": "application/json"  # Request JSON response
-                }
-            )
+            async with _GEMINI_SEM:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config={
+                        "temperature": 0.1,  # Low temperature for consistent structured output
+                        "response_mime_type": "application/json"  # Request JSON response
+                    }
+                )
 
             return response.text
 
@@ -218,14 +276,15 @@ class DiagramDescriber:
             await asyncio.sleep(2)
 
             try:
-                response = await self.client.aio.models.generate_content(
-                    model=self.model,
-                    contents=contents,
-                    config={
-                        "temperature": 0.1,
-                        "response_mime_type": "application/json"
-                    }
-                )
+                async with _GEMINI_SEM:
+                    response = await self.client.aio.models.generate_content(
+                        model=self.model,
+                        contents=contents,
+                        config={
+                            "temperature": 0.1,
+                            "response_mime_type": "application/json"
+                        }
+                    )
                 return response.text
             except Exception as retry_error:
                 logger.error(f"Gemini API retry failed: {retry_error}")
@@ -249,8 +308,6 @@ class DiagramDescriber:
         except json.JSONDecodeError:
             # Sometimes Gemini returns JSON wrapped in markdown code blocks
             # Try to extract JSON from markdown code blocks
-            import re
-
             # Look for JSON in code blocks
             json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
             matches = re.findall(json_pattern, response_text, re.DOTALL)
@@ -292,15 +349,19 @@ class DiagramDescriber:
         return mime_types.get(file_extension.lower(), "image/png")
 
 
-async def describe_diagrams_batch(images: List[ExtractedImage]) -> List[DiagramDescription]:
+async def describe_diagrams_batch(
+    images: List[ExtractedImage],
+    max_concurrency: int = 8
+) -> List[DiagramDescription]:
     """
     Convenience function to describe multiple diagrams
 
     Args:
         images: List of ExtractedImage objects
+        max_concurrency: Maximum concurrent Gemini calls for this batch (the process-wide cap still applies)
 
     Returns:
         List of DiagramDescription objects
     """
     describer = DiagramDescriber()
-    return await describer.describe_multiple_diagrams(images)
+    return await describer.describe_multiple_diagrams(images, max_concurrent=max_concurrency)
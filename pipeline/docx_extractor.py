@@ -2,6 +2,7 @@
 DOCX Extraction Module
 Uses python-docx to extract text, images, and tables from Word documents
 """
+import asyncio
 import base64
 import time
 from pathlib import Path
@@ -11,7 +12,7 @@ from docx.opc.constants import RELATIONSHIP_TYPE as RT
 from loguru import logger
 
 from .models import ExtractedImage, ExtractedTable
-from config import get_session_output_dir
+from config import settings, get_session_output_dir
 
 
 class DOCXExtractor:
@@ -33,7 +34,7 @@ class DOCXExtractor:
             Dictionary containing extracted text, images, tables, and metadata
         """
         logger.info(f"Starting DOCX extraction for {docx_path}")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
             doc = Document(docx_path)
@@ -53,7 +54,7 @@ class DOCXExtractor:
             # Build plain text
             text_plain = "\n".join([p["text"] for p in paragraphs if p["text"].strip()])
 
-            processing_time = time.time() - start_time
+            processing_time = time.perf_counter() - start_time
 
             logger.success(f"DOCX extraction completed in {processing_time:.2f}s")
             logger.info(f"Extracted: {len(paragraphs)} paragraphs, {len(images)} images, {len(tables)} tables")
@@ -132,8 +133,10 @@ class DOCXExtractor:
                         with open(img_path, "wb") as f:
                             f.write(image_data)
 
-                        # Convert to base64
-                        image_base64 = base64.b64encode(image_data).decode("utf-8")
+                        # Convert to base64 (only when inline copies are enabled)
+                        image_base64 = None
+                        if settings.include_image_base64:
+                            image_base64 = base64.b64encode(image_data).decode("utf-8")
 
                         # Create ExtractedImage object
                         extracted_image = ExtractedImage(
@@ -263,8 +266,6 @@ async def extract_docx_complete(docx_path: str, user_id: str, session_id: str) -
     extractor = DOCXExtractor(user_id, session_id)
 
     # Run synchronous extraction in thread pool to avoid blocking
-    import asyncio
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, extractor.extract_docx, docx_path)
+    result = await asyncio.to_thread(extractor.extract_docx, docx_path)
 
     return result
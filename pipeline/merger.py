@@ -4,7 +4,7 @@ Combines extracted data from all sources into final ExtractionResult
 """
 import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 from loguru import logger
 
@@ -168,19 +168,26 @@ class ExtractionMerger:
         return result
 
     @staticmethod
-    def save_result_to_json(result: ExtractionResult, output_path: Path):
+    def dump_result_json(result: ExtractionResult) -> bytes:
+        """Serialize an ExtractionResult to UTF-8 JSON bytes (same format save_result_to_json writes)"""
+        return result.model_dump_json(indent=2).encode("utf-8")
+
+    @staticmethod
+    def save_result_to_json(result: ExtractionResult, output_path: Path, blob: Optional[bytes] = None):
         """
         Save ExtractionResult to JSON file
 
         Args:
             result: ExtractionResult to save
             output_path: Path to save JSON file
+            blob: Output of dump_result_json(result), to reuse one serialization for several files
         """
         try:
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(result.model_dump_json(indent=2))
+            if blob is None:
+                blob = ExtractionMerger.dump_result_json(result)
+            output_path.write_bytes(blob)
 
             logger.success(f"Extraction result saved to {output_path}")
 
@@ -200,10 +207,8 @@ class ExtractionMerger:
             Loaded ExtractionResult
         """
         try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = f.read()
-
-            result = ExtractionResult.model_validate_json(data)
+            # pydantic-core parses the raw bytes directly (no intermediate str decode)
+            result = ExtractionResult.model_validate_json(json_path.read_bytes())
             logger.success(f"Extraction result loaded from {json_path}")
 
             return result
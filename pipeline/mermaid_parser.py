@@ -4,11 +4,14 @@ Extracts and parses Mermaid code blocks from markdown text
 Converts them into structured DiagramDescription objects
 """
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 
 from .models import DiagramDescription
 
+# Fenced ```mermaid blocks
+MERMAID_BLOCK_PATTERN = re.compile(r'```mermaid\s+(.*?)```', re.DOTALL | re.IGNORECASE)
+
 
 class MermaidParser:
     """Parses Mermaid code blocks and converts them to DiagramDescription objects"""
@@ -16,34 +19,60 @@ class MermaidParser:
     def __init__(self):
         self.diagram_id_counter = 0
 
-    def extract_mermaid_diagrams(self, markdown_text: str) -> List[DiagramDescription]:
+    def extract_mermaid_diagrams(self, markdown_text: str, start_number: int = 1) -> List[DiagramDescription]:
         """
         Extract all Mermaid code blocks from markdown text and convert to DiagramDescription
 
         Args:
-            markdown_text: Full markdown text containing mermaid code blocks
+            markdown_text: Markdown text (a full document or one page) containing mermaid code blocks
+            start_number: Number of the first diagram found
 
         Returns:
             List of DiagramDescription objects
         """
+        return self.extract_mermaid_diagrams_numbered(markdown_text, start_number)[0]
+
+    def extract_mermaid_diagrams_numbered(
+        self,
+        markdown_text: str,
+        start_number: int = 1
+    ) -> Tuple[List[DiagramDescription], int]:
+        """
+        Extract Mermaid diagrams and report the next free diagram number
+
+        Blocks are numbered by match position, including blocks that fail to parse, so
+        per-page callers must continue from the returned number (not from the diagram count)
+        to keep ids unique.
+
+        Args:
+            markdown_text: Markdown text (a full document or one page) containing mermaid code blocks
+            start_number: Number of the first block found
+
+        Returns:
+            Tuple of (DiagramDescription objects, number for the next block)
+        """
         diagrams = []
 
+        # No code fence at all - skip the regex scan
+        if "```" not in markdown_text:
+            return diagrams, start_number
+
         # Find all mermaid code blocks
-        mermaid_pattern = r'```mermaid\s+(.*?)```'
-        matches = re.findall(mermaid_pattern, markdown_text, re.DOTALL | re.IGNORECASE)
+        matches = MERMAID_BLOCK_PATTERN.findall(markdown_text)
 
-        logger.info(f"Found {len(matches)} Mermaid code blocks in markdown")
+        if matches:
+            logger.info(f"Found {len(matches)} Mermaid code blocks in markdown")
 
-        for idx, mermaid_code in enumerate(matches):
+        for diagram_number, mermaid_code in enumerate(matches, start=start_number):
             try:
-                diagram = self._parse_mermaid_code(mermaid_code, idx + 1)
+                diagram = self._parse_mermaid_code(mermaid_code, diagram_number)
                 if diagram:
                     diagrams.append(diagram)
-                    logger.debug(f"Parsed Mermaid diagram {idx + 1}: {diagram.diagram_type}")
+                    logger.debug(f"Parsed Mermaid diagram {diagram_number}: {diagram.diagram_type}")
             except Exception as e:
-                logger.warning(f"Failed to parse Mermaid diagram {idx + 1}: {e}")
+                logger.warning(f"Failed to parse Mermaid diagram {diagram_number}: {e}")
 
-        return diagrams
+        return diagrams, start_number + len(matches)
 
     def _parse_mermaid_code(self, mermaid_code: str, diagram_number: int) -> Optional[DiagramDescription]:
         """
@@ -2,7 +2,8 @@
 Pydantic models for document extraction pipeline
 Defines all data structures used throughout the extraction process
 """
-from pydantic import BaseModel, Field
+from html import escape
+from pydantic import BaseModel, Field, field_serializer
 from typing import List, Optional, Dict, Any
 from enum import Enum
 from datetime import datetime
@@ -34,6 +35,7 @@ class ExtractedImage(BaseModel):
     presigned_url: Optional[str] = Field(None, description="Cloud URL from LlamaCloud API")
     image_type: Optional[str] = Field(None, description="Type: embedded, screenshot, layout")
     b_box: Optional[BoundingBox] = Field(None, description="Bounding box on page")
+    perceptual_hash: Optional[int] = Field(None, description="64-bit dHash fingerprint for near-duplicate detection")
 
 
 class DiagramDescription(BaseModel):
@@ -50,11 +52,33 @@ class DiagramDescription(BaseModel):
     image_type: Optional[str] = Field(None, description="If not a diagram: photo, screenshot, logo, chart, graph")
 
 
+def _rows_to_html(headers: List[str], rows: List[List[str]]) -> str:
+    """Convert headers and rows to HTML table (cell text is HTML-escaped)"""
+    # Collect fragments and join once - repeated += re-copies the whole string
+    parts = ["<table>\n"]
+
+    if headers:
+        parts.append("  <thead>\n    <tr>\n")
+        parts.extend(f"      <th>{escape(header)}</th>\n" for header in headers)
+        parts.append("    </tr>\n  </thead>\n")
+
+    if rows:
+        parts.append("  <tbody>\n")
+        for row in rows:
+            parts.append("    <tr>\n")
+            parts.extend(f"      <td>{escape(cell)}</td>\n" for cell in row)
+            parts.append("    </tr>\n")
+        parts.append("  </tbody>\n")
+
+    parts.append("</table>")
+    return "".join(parts)
+
+
 class ExtractedTable(BaseModel):
     """Represents a table extracted from a document"""
     table_id: str = Field(..., description="Unique identifier like 'page5_table1'")
     page_number: int = Field(..., description="Page number where table was found")
-    html_content: str = Field(..., description="Table rendered as HTML")
+    html_content: Optional[str] = Field(None, description="Table rendered as HTML (built from headers/rows when omitted)")
     headers: List[str] = Field(default_factory=list, description="Column headers")
     rows: List[List[str]] = Field(default_factory=list, description="Table data rows")
     num_rows: int = Field(0, description="Number of rows in table")
@@ -62,6 +86,17 @@ class ExtractedTable(BaseModel):
     b_box: Optional[BoundingBox] = Field(None, description="Bounding box on page")
     extraction_source: Optional[str] = Field(None, description="Source: llamaparse_v1, llamacloud_v2, or merged")
 
+    def get_html(self) -> str:
+        """Table HTML, rendering (and keeping) it from headers/rows on first use"""
+        if self.html_content is None:
+            self.html_content = _rows_to_html(self.headers, self.rows)
+        return self.html_content
+
+    @field_serializer("html_content")
+    def _serialize_html_content(self, html_content: Optional[str]) -> str:
+        # Serialized results always carry HTML, so JSON consumers see no difference
+        return html_content if html_content is not None else _rows_to_html(self.headers, self.rows)
+
 
 class ExtractionMetadata(BaseModel):
     """Metadata about the extraction process"""
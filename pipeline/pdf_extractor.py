@@ -4,17 +4,27 @@ Uses LlamaParse (agentic mode) + PyMuPDF in parallel for maximum extraction qual
 """
 import asyncio
 import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterator, Callable
 import fitz  # PyMuPDF
 from loguru import logger
+from lxml import html as lxml_html
 
 try:
     from pdf2image import convert_from_path
     PDF2IMAGE_AVAILABLE = True
 except ImportError:
-    logger.warning("pdf2image not available. Presentation-style PDF fallback disabled.")
+    logger.warning("pdf2image not available. Poppler last-resort page rendering disabled.")
     PDF2IMAGE_AVAILABLE = False
 
 try:
@@ -28,6 +38,89 @@ from .table_parser import TableParser
 from .mermaid_parser import MermaidParser
 from config import settings, get_session_output_dir
 
+# Landscape first page above this width/height ratio is treated as a slide deck
+PRESENTATION_ASPECT_RATIO = 1.2
+
+# PDFs with fewer text characters than this on the first pages are treated as scans
+SCANNED_TEXT_THRESHOLD = 200
+SCANNED_PROBE_PAGES = 3
+
+# One LlamaParse worker per this many pages, capped by settings.llama_max_workers
+PAGES_PER_LLAMA_WORKER = 8
+
+# Background threads writing extracted image files per PDF
+IMAGE_WRITE_WORKERS = 4
+
+# Resolution for full-page renders in the presentation fallback
+PAGE_RENDER_DPI = 150  # Good balance of quality and file size
+
+# Markdown link [text](url) - keeps the text
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+
+# Per-image budgets: larger embedded images are downscaled / not inlined as base64
+MAX_IMAGE_PIXELS = 16_000_000
+MAX_BASE64_BYTES = 2_000_000
+
+# Bump when the cached LlamaParse payload or parser options change (invalidates old entries)
+LLAMAPARSE_CACHE_VERSION = 2
+
+# Pages rendered by the presentation-style fallback
+FALLBACK_RENDER_PAGES = 10
+
+# Client-side throttle shared by all extractors in this process (avoids provider rate limits)
+_LLAMA_SEM = asyncio.Semaphore(settings.llama_max_concurrency)
+
+# Serializes the short MuPDF probes and page rasterization in this process (renders allocate
+# full-page pixmaps); the per-document image and text passes run unlocked so extractions for
+# different users never queue behind each other
+_FITZ_LOCK = threading.Lock()
+
+
+@dataclass(slots=True)
+class _SavedXref:
+    """First file written for an embedded image xref, reused by its later placements"""
+    ext: str
+    width: Optional[int]
+    height: Optional[int]
+    image_base64: Optional[str]
+    path: Path
+    write_future: Optional[Future]  # None when the file was written synchronously
+
+
+def _link_saved_file(saved: _SavedXref, target: Path):
+    """Create target as a hardlink of an xref's first file once that file is on disk (copy if links fail)"""
+    if saved.write_future is not None:
+        saved.write_future.result()  # Submitted earlier to the same FIFO pool, so already running or done
+    target.unlink(missing_ok=True)  # Re-extraction into the same session
+    try:
+        os.link(saved.path, target)
+    except OSError:
+        shutil.copyfile(saved.path, target)
+
+
+@dataclass(slots=True)
+class _RawImage:
+    """Lightweight image record built in the PyMuPDF loop; converted to ExtractedImage at the boundary"""
+    image_id: str
+    page_number: int
+    image_path: str
+    image_base64: Optional[str]
+    width: Optional[int]
+    height: Optional[int]
+
+
+def _file_sha256(file_path: str) -> str:
+    """Stream a file through SHA-256 without loading it fully into memory"""
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _encode_base64(data: bytes) -> Optional[str]:
+    """Base64 copy of image bytes for inline display, or None when settings.include_image_base64 is off"""
+    if not settings.include_image_base64:
+        return None
+    return base64.b64encode(data).decode("ascii")
+
 
 class PDFExtractor:
     """Handles PDF extraction using LlamaParse + PyMuPDF in parallel"""
@@ -38,18 +131,48 @@ class PDFExtractor:
         self.output_dir = get_session_output_dir(user_id, session_id)
 
         # Initialize LlamaParse with agentic mode
-        self.parser = LlamaParse(
+        self.parser = self._build_parser("parse_page_with_agent", settings.llama_max_workers)  # Agentic mode for best results
+
+        # Parsers per (parse_mode, num_workers), created on first use
+        self._parsers: Dict[Tuple[str, int], LlamaParse] = {
+            ("parse_page_with_agent", settings.llama_max_workers): self.parser
+        }
+
+    def _build_parser(self, parse_mode: str, num_workers: int) -> LlamaParse:
+        """Create a LlamaParse client with the pipeline's standard output options"""
+        return LlamaParse(
             api_key=settings.llama_cloud_api_key,
-            parse_mode="parse_page_with_agent",  # Agentic mode for best results
+            parse_mode=parse_mode,
             model="gemini-2.5-flash",  # Best price/performance ratio
             high_res_ocr=True,  # Maximum OCR accuracy
             adaptive_long_table=True,  # Handle long tables across pages
             outlined_table_extraction=True,  # Better table detection
             output_tables_as_HTML=True,  # Tables as HTML for easy rendering
             result_type="markdown",  # Markdown output for structured text
-            num_workers=4,  # Parallel processing for multi-page docs
+            num_workers=num_workers,  # Parallel processing for multi-page docs
         )
 
+    def _get_parser(self, parse_mode: str, page_count: int) -> LlamaParse:
+        """
+        LlamaParse client for a parse mode with workers sized to the document
+
+        Args:
+            parse_mode: LlamaParse parse mode
+            page_count: Number of pages in the PDF (0 if unknown)
+
+        Returns:
+            Cached LlamaParse client
+        """
+        if page_count > 0:
+            num_workers = min(max(page_count // PAGES_PER_LLAMA_WORKER, 1), settings.llama_max_workers)
+        else:
+            num_workers = settings.llama_max_workers
+
+        key = (parse_mode, num_workers)
+        if key not in self._parsers:
+            self._parsers[key] = self._build_parser(parse_mode, num_workers)
+        return self._parsers[key]
+
     async def extract_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """
         Extract all content from PDF using parallel LlamaParse + PyMuPDF
@@ -58,16 +181,23 @@ class PDFExtractor:
             pdf_path: Path to the PDF file
 
         Returns:
-            Dictionary containing extracted text, images, tables, and metadata
+            Dictionary containing extracted text, images, tables, page count, file size, and metadata
         """
         logger.info(f"Starting PDF extraction for {pdf_path}")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            # Run LlamaParse and PyMuPDF extractions in parallel
+            # Cheap probe so the presentation fallback can start up front and scans skip agentic mode
+            aspect_ratio, page_count, parser = await self._plan_extraction(pdf_path)
+            speculative_fallback = aspect_ratio > PRESENTATION_ASPECT_RATIO
+
+            # Run LlamaParse and PyMuPDF extractions in parallel; landscape decks also get their
+            # pages rendered on the PyMuPDF thread, from the same open document
             llamaparse_result, pymupdf_result = await asyncio.gather(
-                self._extract_with_llamaparse(pdf_path),
-                self._extract_with_pymupdf(pdf_path),
+                self._extract_with_llamaparse(pdf_path, parser),
+                self._extract_with_pymupdf(
+                    pdf_path, render_pages=FALLBACK_RENDER_PAGES if speculative_fallback else 0
+                ),
                 return_exceptions=True
             )
 
@@ -107,12 +237,16 @@ class PDFExtractor:
                 logger.success(f"PyMuPDF extraction completed in {pymupdf_time:.2f}s")
 
             # Check if this is a presentation-style PDF and apply image fallback if needed
-            if self._is_presentation_style_pdf(pdf_path, len(images), len(mermaid_diagrams)):
+            if speculative_fallback:
+                logger.info("Detected presentation-style PDF - using page images rendered with the image pass")
+                if not isinstance(pymupdf_result, Exception):
+                    images.extend(pymupdf_result.get("page_images", []))
+            elif self._is_presentation_style_pdf(aspect_ratio, len(images), len(mermaid_diagrams)):
                 logger.info("Detected presentation-style PDF - applying page image fallback")
-                page_images = self._extract_page_images_fallback(pdf_path)
+                page_images = await asyncio.to_thread(self._extract_page_images_fallback, pdf_path)
                 images.extend(page_images)
 
-            total_time = time.time() - start_time
+            total_time = time.perf_counter() - start_time
 
             return {
                 "text_markdown": text_markdown,
@@ -124,6 +258,8 @@ class PDFExtractor:
                 "llamaparse_time": llamaparse_time,
                 "pymupdf_time": pymupdf_time,
                 "total_time": total_time,
+                "total_pages": page_count,  # From the up-front probe (0 if unknown)
+                "file_size": os.path.getsize(pdf_path),
                 "extraction_method": "llamaparse_agentic + pymupdf"
             }
 
@@ -131,24 +267,158 @@ class PDFExtractor:
             logger.error(f"PDF extraction failed: {e}")
             raise
 
-    async def _extract_with_llamaparse(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract text and tables using LlamaParse agentic mode"""
-        start_time = time.time()
+    async def extract_text_fast(
+        self,
+        pdf_path: str,
+        plan: Optional[Tuple[float, int, LlamaParse]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract text, tables and Mermaid diagrams without waiting for images
+
+        Lets callers start on the markdown (e.g. LLM prompting) while
+        extract_images_stream() is still decoding and encoding images.
+
+        Args:
+            pdf_path: Path to the PDF file
+            plan: Result of _plan_extraction() if the caller already probed the PDF
+                (the LlamaParse path then never opens the PDF with MuPDF)
+
+        Returns:
+            Dictionary with text_markdown, text_plain, tables, mermaid_diagrams,
+            confidence_score and llamaparse_time
+        """
+        logger.info(f"Starting text-only PDF extraction for {pdf_path}")
+
+        _, _, parser = plan or await self._plan_extraction(pdf_path)
 
         try:
-            logger.info("Starting LlamaParse extraction (agentic mode)")
+            llamaparse_result = await self._extract_with_llamaparse(pdf_path, parser)
+        except Exception as e:
+            logger.error(f"LlamaParse extraction failed: {e}")
+            # Fall back to the PDF's own text layer
+            logger.warning("Using PyMuPDF text extraction as LlamaParse fallback")
+            return {
+                "text_markdown": "",
+                "text_plain": await asyncio.to_thread(self._pymupdf_text_plain, pdf_path),
+                "tables": [],
+                "mermaid_diagrams": [],
+                "confidence_score": None,
+                "llamaparse_time": 0
+            }
 
-            # Use async load to avoid blocking
-            documents = await self.parser.aload_data(pdf_path)
+        return {
+            "text_markdown": llamaparse_result["text_markdown"],
+            "text_plain": llamaparse_result["text_plain"],
+            "tables": llamaparse_result["tables"],
+            "mermaid_diagrams": llamaparse_result["mermaid_diagrams"],
+            "confidence_score": llamaparse_result["confidence_score"],
+            "llamaparse_time": llamaparse_result["processing_time"]
+        }
 
-            # Combine all document pages into single markdown and plain text
-            text_markdown = ""
-            text_plain = ""
+    async def extract_images_stream(
+        self,
+        pdf_path: str,
+        mermaid_diagrams_found: int = 0
+    ) -> AsyncIterator[ExtractedImage]:
+        """
+        Yield extracted images as soon as each one is on disk
 
-            for doc in documents:
-                text_markdown += doc.text + "\n\n"
-                # Strip markdown formatting for plain text
-                text_plain += self._markdown_to_plain(doc.text) + "\n\n"
+        Presentation-style PDFs additionally yield full-page renders once the
+        embedded images are exhausted.
+
+        Args:
+            pdf_path: Path to the PDF file
+            mermaid_diagrams_found: Mermaid diagrams found in the text, if already known
+
+        Yields:
+            ExtractedImage objects in completion order
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def on_image(raw: _RawImage):
+            loop.call_soon_threadsafe(queue.put_nowait, raw)
+
+        # Images are pushed from the extraction thread; the sentinel follows the last one
+        extraction = asyncio.ensure_future(asyncio.to_thread(self._pymupdf_sync_extract, pdf_path, on_image))
+        extraction.add_done_callback(lambda _: queue.put_nowait(done))
+
+        images_found = 0
+        try:
+            while (raw := await queue.get()) is not done:
+                images_found += 1
+                yield self._to_extracted_image(raw)
+        finally:
+            if not extraction.done():
+                extraction.cancel()
+
+        if extraction.exception() is not None:
+            logger.error(f"PyMuPDF extraction failed: {extraction.exception()}")
+
+        aspect_ratio, _, _ = await asyncio.to_thread(self._probe_pdf, pdf_path)
+        if self._is_presentation_style_pdf(aspect_ratio, images_found, mermaid_diagrams_found):
+            logger.info("Detected presentation-style PDF - applying page image fallback")
+            for page_image in await asyncio.to_thread(self._extract_page_images_fallback, pdf_path):
+                yield page_image
+
+    async def _plan_extraction(self, pdf_path: str) -> Tuple[float, int, LlamaParse]:
+        """
+        Probe the PDF and pick the LlamaParse client for it
+
+        Returns:
+            Tuple of (first page aspect ratio, page count (0 if unknown), LlamaParse client)
+        """
+        aspect_ratio, probe_text_chars, page_count = await asyncio.to_thread(self._probe_pdf, pdf_path)
+
+        parse_mode = "parse_page_with_agent"
+        if 0 < aspect_ratio <= PRESENTATION_ASPECT_RATIO and probe_text_chars < SCANNED_TEXT_THRESHOLD:
+            logger.info(
+                f"PDF looks scanned-only ({probe_text_chars} chars in first {SCANNED_PROBE_PAGES} pages) - "
+                f"using LlamaParse {settings.llama_scanned_parse_mode}"
+            )
+            parse_mode = settings.llama_scanned_parse_mode
+
+        return aspect_ratio, page_count, self._get_parser(parse_mode, page_count)
+
+    async def _extract_with_llamaparse(self, pdf_path: str, parser: Optional[LlamaParse] = None) -> Dict[str, Any]:
+        """Extract text and tables using LlamaParse (agentic mode unless another parser is given)"""
+        parser = parser or self.parser
+        start_time = time.perf_counter()
+
+        try:
+            # Reuse a previous parse of identical file content in the same parse mode if available
+            parse_mode = getattr(parser, "parse_mode", None) or "default"
+            file_hash = await asyncio.to_thread(_file_sha256, pdf_path)
+            cache_path = settings.llamaparse_cache_dir / f"v{LLAMAPARSE_CACHE_VERSION}_{parse_mode}_{file_hash}.json"
+            cached = await asyncio.to_thread(self._load_llamaparse_cache, cache_path)
+
+            if cached is not None:
+                logger.info(f"LlamaParse cache hit for {file_hash[:12]} ({parse_mode})")
+                page_texts, confidence_score = cached
+            else:
+                logger.info(f"Starting LlamaParse extraction ({parse_mode})")
+
+                # Use async load to avoid blocking; throttled across concurrent extractions
+                async with _LLAMA_SEM:
+                    documents = await parser.aload_data(pdf_path)
+
+                page_texts = [doc.text for doc in documents]
+
+                # Get confidence score if available from metadata
+                confidence_score = None
+                if documents and hasattr(documents[0], 'metadata'):
+                    confidence_score = documents[0].metadata.get('confidence_score')
+
+                # An empty parse is LlamaParse's usual failure shape - never replay it
+                if page_texts:
+                    await asyncio.to_thread(self._save_llamaparse_cache, cache_path, page_texts, confidence_score)
+
+            # Combine all document pages into single markdown
+            text_markdown = "".join(page_text + "\n\n" for page_text in page_texts)
+
+            # Strip markdown formatting for plain text in one pass over the joined document
+            text_plain = self._markdown_to_plain(text_markdown)
 
             # Extract tables from markdown (LlamaParse includes tables in HTML format)
             tables = self._extract_tables_from_markdown(text_markdown)
@@ -156,12 +426,7 @@ class PDFExtractor:
             # Extract Mermaid diagrams from markdown
             mermaid_diagrams = self._extract_mermaid_diagrams(text_markdown)
 
-            # Get confidence score if available from metadata
-            confidence_score = None
-            if documents and hasattr(documents[0], 'metadata'):
-                confidence_score = documents[0].metadata.get('confidence_score')
-
-            processing_time = time.time() - start_time
+            processing_time = time.perf_counter() - start_time
 
             return {
                 "text_markdown": text_markdown.strip(),
@@ -176,18 +441,50 @@ class PDFExtractor:
             logger.error(f"LlamaParse extraction error: {e}")
             raise
 
-    async def _extract_with_pymupdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract images and text using PyMuPDF (runs in parallel with LlamaParse)"""
-        start_time = time.time()
+    def _load_llamaparse_cache(self, cache_path: Path) -> Optional[Tuple[List[str], Optional[float]]]:
+        """Load cached LlamaParse page texts and confidence score, or None on miss"""
+        if not cache_path.exists():
+            return None
+
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["pages"], data.get("confidence_score")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable LlamaParse cache {cache_path.name}: {e}")
+            return None
+
+    def _save_llamaparse_cache(self, cache_path: Path, page_texts: List[str], confidence_score: Optional[float]):
+        """Persist LlamaParse page texts so identical uploads skip the API call"""
+        try:
+            # Unique temp file per writer: concurrent parses of the same PDF must not share it
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=cache_path.parent, suffix=".tmp", delete=False
+            ) as f:
+                json.dump({"pages": page_texts, "confidence_score": confidence_score}, f)
+            os.replace(f.name, cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to write LlamaParse cache {cache_path.name}: {e}")
+
+    async def _extract_with_pymupdf(self, pdf_path: str, render_pages: int = 0) -> Dict[str, Any]:
+        """
+        Extract images and text using PyMuPDF (runs in parallel with LlamaParse)
+
+        Args:
+            pdf_path: Path to the PDF file
+            render_pages: Also render this many leading pages to images (under "page_images")
+        """
+        start_time = time.perf_counter()
 
         try:
             logger.info("Starting PyMuPDF extraction")
 
             # Run in thread pool to avoid blocking async event loop
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self._pymupdf_sync_extract, pdf_path)
+            result = await asyncio.to_thread(self._pymupdf_sync_extract, pdf_path, None, render_pages)
+
+            result["images"] = [self._to_extracted_image(raw) for raw in result["images"]]
 
-            processing_time = time.time() - start_time
+            processing_time = time.perf_counter() - start_time
             result["processing_time"] = processing_time
 
             return result
@@ -196,68 +493,188 @@ class PDFExtractor:
             logger.error(f"PyMuPDF extraction error: {e}")
             raise
 
-    def _pymupdf_sync_extract(self, pdf_path: str) -> Dict[str, Any]:
-        """Synchronous PyMuPDF extraction (called from thread pool)"""
-        doc = fitz.open(pdf_path)
-        images: List[ExtractedImage] = []
-        text_blocks = []
-        text_plain = ""
+    def _to_extracted_image(self, raw: _RawImage) -> ExtractedImage:
+        """Fields are produced internally with the right types, so skip Pydantic validation"""
+        return ExtractedImage.model_construct(
+            image_id=raw.image_id,
+            page_number=raw.page_number,
+            image_path=raw.image_path,
+            image_base64=raw.image_base64,
+            width=raw.width,
+            height=raw.height
+        )
 
-        for page_num, page in enumerate(doc):
-            # Extract images from page
-            image_list = page.get_images(full=True)
+    def _pymupdf_text_plain(self, pdf_path: str) -> str:
+        """Plain text of every page from the PDF's own text layer"""
+        doc = fitz.open(pdf_path)
+        try:
+            return "".join(
+                f"\n--- Page {page_num + 1} ---\n{page.get_text('text')}\n"
+                for page_num, page in enumerate(doc)
+            ).strip()
+        finally:
+            doc.close()
 
-            for img_index, img in enumerate(image_list):
-                try:
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
+    def _pymupdf_sync_extract(
+        self,
+        pdf_path: str,
+        on_image: Optional[Callable[[_RawImage], None]] = None,
+        render_pages: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Synchronous PyMuPDF extraction (called from thread pool)
 
-                    # Save image to disk
-                    img_filename = f"page{page_num + 1}_img{img_index + 1}.{image_ext}"
-                    img_path = self.output_dir / img_filename
+        Args:
+            pdf_path: Path to the PDF file
+            on_image: Optional callback invoked (from a worker thread) once each image is on disk
+            render_pages: Also render this many leading pages to images, after the image pass
+        """
+        images: List[_RawImage] = []
+        text_blocks = []
+        page_texts: List[str] = []
 
-                    with open(img_path, "wb") as f:
-                        f.write(image_bytes)
+        # First saved file per xref: repeated images (logos, letterheads) are decoded, encoded and
+        # written once, later placements hardlink that file (no image bytes are kept around)
+        saved_by_xref: Dict[int, _SavedXref] = {}
 
-                    # Convert to base64 for frontend display
-                    image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+        # Image files are written on a small pool so disk I/O overlaps with MuPDF decoding
+        writer = ThreadPoolExecutor(max_workers=IMAGE_WRITE_WORKERS, thread_name_prefix="pdf-img-write")
+        pending_writes: List[Tuple[Future, _RawImage]] = []
 
-                    # Create ExtractedImage object
-                    extracted_image = ExtractedImage(
-                        image_id=f"page{page_num + 1}_img{img_index + 1}",
-                        page_number=page_num + 1,
-                        image_path=str(img_path),
-                        image_base64=image_base64,
-                        width=base_image.get("width"),
-                        height=base_image.get("height")
-                    )
+        def notify_if_written(write_future: Future, raw_image: _RawImage):
+            if write_future.exception() is None:
+                on_image(raw_image)
 
-                    images.append(extracted_image)
-                    logger.debug(f"Extracted image: {img_filename}")
+        page_images: Optional[List[ExtractedImage]] = []
 
+        doc = fitz.open(pdf_path)
+        try:
+            for page_num, page in enumerate(doc):
+                # Extract images from page
+                image_list = page.get_images(full=True)
+
+                for img_index, img in enumerate(image_list):
+                    try:
+                        # get_images(full=True) rows: (xref, smask, width, height, ...) - no decode needed
+                        xref, width, height = img[0], img[2], img[3]
+                        image_id = f"page{page_num + 1}_img{img_index + 1}"
+                        write_future = None
+
+                        saved = saved_by_xref.get(xref)
+                        if saved is not None:
+                            # Repeat placement: link the first file once it has been written
+                            img_filename = f"{image_id}.{saved.ext}"
+                            img_path = self.output_dir / img_filename
+                            write_future = writer.submit(_link_saved_file, saved, img_path)
+                        elif width * height > MAX_IMAGE_PIXELS:
+                            # Huge scan: write a downscaled JPEG straight from MuPDF and skip base64
+                            img_filename = f"{image_id}.jpg"
+                            img_path = self.output_dir / img_filename
+                            width, height = self._save_downscaled_image(doc, xref, img_path)
+                            saved = _SavedXref("jpg", width, height, None, img_path, None)
+                        else:
+                            base_image = doc.extract_image(xref)
+                            image_bytes = base_image["image"]
+                            # Convert to base64 for frontend display if enabled (oversized streams keep path only)
+                            image_base64 = None
+                            if settings.include_image_base64 and len(image_bytes) <= MAX_BASE64_BYTES:
+                                image_base64 = base64.b64encode(image_bytes).decode("ascii")
+
+                            # Save image to disk
+                            img_filename = f"{image_id}.{base_image['ext']}"
+                            img_path = self.output_dir / img_filename
+
+                            write_future = writer.submit(img_path.write_bytes, image_bytes)
+                            saved = _SavedXref(
+                                base_image["ext"], base_image.get("width"), base_image.get("height"),
+                                image_base64, img_path, write_future
+                            )
+
+                        saved_by_xref.setdefault(xref, saved)
+                        width, height, image_base64 = saved.width, saved.height, saved.image_base64
+
+                        raw_image = _RawImage(
+                            image_id=image_id,
+                            page_number=page_num + 1,
+                            image_path=str(img_path),
+                            image_base64=image_base64,
+                            width=width,
+                            height=height
+                        )
+                        images.append(raw_image)
+                        if write_future is not None:
+                            pending_writes.append((write_future, raw_image))
+                            if on_image is not None:
+                                write_future.add_done_callback(
+                                    lambda fut, raw=raw_image: notify_if_written(fut, raw)
+                                )
+                        elif on_image is not None:
+                            on_image(raw_image)
+                        logger.debug(f"Extracted image: {img_filename}")
+
+                    except Exception as e:
+                        logger.warning(f"Failed to extract image on page {page_num + 1}: {e}")
+
+                # Extract text with coordinates (for potential future use)
+                text_dict = page.get_text("dict")
+                text_blocks.append(text_dict)
+
+                # Also extract plain text for fallback
+                page_text = page.get_text("text")
+                page_texts.append(f"\n--- Page {page_num + 1} ---\n{page_text}\n")
+
+            # Presentation fallback renders reuse this document instead of a second open
+            if render_pages:
+                try:
+                    page_images = self._render_doc_pages(doc, render_pages)
+                    logger.success(f"Rendered {len(page_images)} full-page images with the image pass")
                 except Exception as e:
-                    logger.warning(f"Failed to extract image on page {page_num + 1}: {e}")
+                    logger.warning(f"PyMuPDF page rendering failed, trying pdf2image: {e}")
+                    page_images = None
+        finally:
+            doc.close()
 
-            # Extract text with coordinates (for potential future use)
-            text_dict = page.get_text("dict")
-            text_blocks.append(text_dict)
+        if page_images is None:
+            page_images = self._render_pages_with_pdf2image(pdf_path, render_pages)
 
-            # Also extract plain text for fallback
-            page_text = page.get_text("text")
-            text_plain += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
+        # Reap image writes - images whose file could not be written are dropped
+        failed_writes = set()
+        for write_future, raw_image in pending_writes:
+            try:
+                write_future.result()
+            except Exception as e:
+                logger.warning(f"Failed to save image {raw_image.image_id} on page {raw_image.page_number}: {e}")
+                failed_writes.add(id(raw_image))
+        writer.shutdown()
 
-        doc.close()
+        if failed_writes:
+            images = [image for image in images if id(image) not in failed_writes]
 
         logger.info(f"PyMuPDF extracted {len(images)} images from {len(text_blocks)} pages")
 
         return {
             "images": images,
             "text_blocks": text_blocks,
-            "text_plain": text_plain.strip()
+            "text_plain": "".join(page_texts).strip(),
+            "page_images": page_images
         }
 
+    def _save_downscaled_image(self, doc: fitz.Document, xref: int, img_path: Path) -> Tuple[int, int]:
+        """Render an oversized embedded image as a halved-until-in-budget JPEG, returns (width, height)"""
+        pix = fitz.Pixmap(doc, xref)
+
+        # JPEG cannot carry alpha or CMYK
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.colorspace is not None and pix.colorspace.n > 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+
+        while pix.width * pix.height > MAX_IMAGE_PIXELS:
+            pix.shrink(1)
+
+        pix.save(str(img_path), output="jpg")
+        return pix.width, pix.height
+
     def _markdown_to_plain(self, markdown: str) -> str:
         """Convert markdown to plain text by removing formatting"""
         # Simple markdown stripping (can be enhanced with libraries like markdown2 if needed)
@@ -267,8 +684,7 @@ class PDFExtractor:
         # Remove bold/italic
         plain = plain.replace("**", "").replace("__", "").replace("*", "").replace("_", "")
         # Remove links but keep text
-        import re
-        plain = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', plain)
+        plain = MARKDOWN_LINK_PATTERN.sub(r'\1', plain)
         return plain
 
     def _extract_tables_from_markdown(self, markdown: str) -> List[ExtractedTable]:
@@ -276,25 +692,30 @@ class PDFExtractor:
         tables = []
 
         # LlamaParse with output_tables_as_HTML=True embeds tables as HTML
-        # We need to find HTML table tags in the markdown
-        import re
+        # Parse the markdown once with lxml and walk the outermost <table> elements
+        if "<table" not in markdown.lower():
+            return tables
 
-        html_pattern = r'<table.*?>(.*?)</table>'
-        matches = re.findall(html_pattern, markdown, re.DOTALL | re.IGNORECASE)
+        fragment = lxml_html.fragment_fromstring(markdown, create_parent="div")
+        table_elements = [
+            el for el in fragment.iter("table")
+            if next(el.iterancestors("table"), None) is None  # Nested tables stay inside their parent
+        ]
 
         table_parser = TableParser()
+        table_htmls = [
+            lxml_html.tostring(table_el, encoding="unicode", with_tail=False)
+            for table_el in table_elements
+        ]
 
-        for idx, table_html in enumerate(matches):
-            try:
-                # Reconstruct full HTML table
-                full_html = f"<table>{table_html}</table>"
+        # Try to detect page numbers from context (page markers are scanned once for all tables)
+        page_numbers = table_parser.detect_table_pages_batch(table_htmls, markdown)
 
+        for idx, (full_html, page_number) in enumerate(zip(table_htmls, page_numbers)):
+            try:
                 # Parse HTML to extract structured data
                 headers, rows, num_rows, num_cols = table_parser.parse_html_table(full_html)
 
-                # Try to detect page number from context
-                page_number = table_parser.detect_table_page_from_context(full_html, markdown)
-
                 table = ExtractedTable(
                     table_id=f"table_{idx + 1}",
                     page_number=page_number,
@@ -324,12 +745,45 @@ class PDFExtractor:
             logger.warning(f"Failed to extract Mermaid diagrams: {e}")
             return []
 
-    def _is_presentation_style_pdf(self, pdf_path: str, images_found: int, mermaid_diagrams_found: int) -> bool:
+    def _probe_pdf(self, pdf_path: str) -> Tuple[float, int, int]:
+        """
+        Cheap pre-extraction probe
+
+        Returns:
+            Tuple of (first page width/height ratio, text characters on the first
+            SCANNED_PROBE_PAGES pages, page count) - (0, 0, 0) if the PDF cannot be inspected
+        """
+        try:
+            with _FITZ_LOCK:
+                doc = fitz.open(pdf_path)
+                try:
+                    if len(doc) == 0:
+                        return 0, 0, 0
+
+                    first_page = doc[0]
+                    width = first_page.rect.width
+                    height = first_page.rect.height
+                    aspect_ratio = width / height if height > 0 else 0
+
+                    text_chars = sum(
+                        len(doc[i].get_text("text").strip())
+                        for i in range(min(SCANNED_PROBE_PAGES, len(doc)))
+                    )
+
+                    return aspect_ratio, text_chars, len(doc)
+                finally:
+                    doc.close()
+
+        except Exception as e:
+            logger.debug(f"Error probing PDF: {e}")
+            return 0, 0, 0
+
+    def _is_presentation_style_pdf(self, aspect_ratio: float, images_found: int, mermaid_diagrams_found: int) -> bool:
         """
         Detect if PDF is presentation-style (PPTX converted) that may have rendered diagrams
 
         Args:
-            pdf_path: Path to PDF
+            aspect_ratio: Width/height ratio of the first page
             images_found: Number of embedded images found by PyMuPDF
             mermaid_diagrams_found: Number of Mermaid diagrams found in text
 
@@ -340,33 +794,20 @@ class PDFExtractor:
         if mermaid_diagrams_found > 0 and images_found == 0:
             return True
 
-        # Check page dimensions - presentations typically have landscape aspect ratio
-        try:
-            doc = fitz.open(pdf_path)
-            if len(doc) == 0:
-                return False
-
-            first_page = doc[0]
-            width = first_page.rect.width
-            height = first_page.rect.height
-            doc.close()
-
-            # Landscape orientation (width > height) is common for presentations
-            # Standard presentation: 10" x 7.5" = 1.33:1 ratio
-            aspect_ratio = width / height if height > 0 else 0
-
-            if aspect_ratio > 1.2:  # Landscape
-                return True
-
-        except Exception as e:
-            logger.debug(f"Error checking PDF dimensions: {e}")
+        # Landscape orientation (width > height) is common for presentations
+        # Standard presentation: 10" x 7.5" = 1.33:1 ratio
+        return aspect_ratio > PRESENTATION_ASPECT_RATIO
 
-        return False
-
-    def _extract_page_images_fallback(self, pdf_path: str, max_pages: int = 10) -> List[ExtractedImage]:
+    def _extract_page_images_fallback(
+        self,
+        pdf_path: str,
+        max_pages: int = FALLBACK_RENDER_PAGES
+    ) -> List[ExtractedImage]:
         """
         Fallback method to extract page images for presentation-style PDFs
 
+        Renders in-process with PyMuPDF; pdf2image/Poppler is only used if that fails
+
         Args:
             pdf_path: Path to PDF
             max_pages: Maximum pages to convert (to avoid huge processing)
@@ -374,20 +815,74 @@ class PDFExtractor:
         Returns:
             List of ExtractedImage objects (one per page)
         """
+        try:
+            logger.info("Rendering PDF pages to images with PyMuPDF (presentation fallback)")
+            extracted_images = self._render_pages_with_pymupdf(pdf_path, max_pages)
+            logger.success(f"Extracted {len(extracted_images)} full-page images via fallback")
+            return extracted_images
+
+        except Exception as e:
+            logger.warning(f"PyMuPDF page rendering failed, trying pdf2image: {e}")
+
+        return self._render_pages_with_pdf2image(pdf_path, max_pages)
+
+    def _render_pages_with_pymupdf(self, pdf_path: str, max_pages: int) -> List[ExtractedImage]:
+        """Rasterize the first max_pages pages with MuPDF (no subprocess, no second PDF parser)"""
+        doc = fitz.open(pdf_path)
+        try:
+            return self._render_doc_pages(doc, max_pages)
+        finally:
+            doc.close()
+
+    def _render_doc_pages(self, doc: fitz.Document, max_pages: int) -> List[ExtractedImage]:
+        """Rasterize the first max_pages pages of an open document (one page render at a time per process)"""
+        extracted_images = []
+        zoom = PAGE_RENDER_DPI / 72
+        matrix = fitz.Matrix(zoom, zoom)
+
+        for page_num in range(1, min(max_pages, doc.page_count) + 1):
+            try:
+                with _FITZ_LOCK:
+                    pix = doc[page_num - 1].get_pixmap(matrix=matrix, alpha=False)
+                    img_bytes = pix.tobytes("png")
+
+                # Save image to disk
+                img_filename = f"page{page_num}_fullpage.png"
+                img_path = self.output_dir / img_filename
+                img_path.write_bytes(img_bytes)
+
+                extracted_images.append(ExtractedImage(
+                    image_id=f"page{page_num}_fullpage",
+                    page_number=page_num,
+                    image_path=str(img_path),
+                    image_base64=_encode_base64(img_bytes),
+                    width=pix.width,
+                    height=pix.height
+                ))
+                logger.debug(f"Extracted full-page image for page {page_num}")
+
+            except Exception as e:
+                logger.warning(f"Failed to extract page {page_num} as image: {e}")
+
+        return extracted_images
+
+    def _render_pages_with_pdf2image(self, pdf_path: str, max_pages: int) -> List[ExtractedImage]:
+        """Last-resort page rasterization through pdf2image/Poppler"""
         if not PDF2IMAGE_AVAILABLE:
             logger.warning("pdf2image not available, skipping page image extraction")
             return []
 
         try:
-            logger.info(f"Converting PDF pages to images (presentation fallback)")
+            logger.info("Converting PDF pages to images with pdf2image (presentation fallback)")
 
             # Convert PDF pages to images (limit to first max_pages)
             images = convert_from_path(
                 pdf_path,
-                dpi=150,  # Good balance of quality and file size
+                dpi=PAGE_RENDER_DPI,
                 fmt='png',
                 first_page=1,
-                last_page=max_pages
+                last_page=max_pages,
+                thread_count=os.cpu_count() or 4  # Parallel Poppler rasterization
             )
 
             extracted_images = []
@@ -398,13 +893,13 @@ class PDFExtractor:
                     img_filename = f"page{page_num}_fullpage.png"
                     img_path = self.output_dir / img_filename
 
-                    pil_image.save(img_path, 'PNG')
+                    # Fast zlib level - page renders are re-compressed downstream anyway
+                    pil_image.save(img_path, 'PNG', pnginfo=None, compress_level=1, optimize=False)
 
-                    # Convert to base64
-                    import io
-                    img_buffer = io.BytesIO()
-                    pil_image.save(img_buffer, format='PNG')
-                    image_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+                    # Convert to base64 from the saved file (avoids a second PNG encode)
+                    image_base64 = None
+                    if settings.include_image_base64:
+                        image_base64 = _encode_base64(img_path.read_bytes())
 
                     # Create ExtractedImage object
                     extracted_image = ExtractedImage(
@@ -422,7 +917,7 @@ class PDFExtractor:
                 except Exception as e:
                     logger.warning(f"Failed to extract page {page_num} as image: {e}")
 
-            logger.success(f"Extracted {len(extracted_images)} full-page images via fallback")
+            logger.success(f"Extracted {len(extracted_images)} full-page images via pdf2image")
             return extracted_images
 
         except Exception as e:
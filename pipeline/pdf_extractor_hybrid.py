@@ -8,15 +8,60 @@ Runs THREE extraction engines in parallel and merges results:
 Combines best results from all three sources for maximum accuracy
 """
 import asyncio
+import json
+import os
+import shutil
+import tempfile
 import time
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Set, Tuple
+from llama_cloud_services import LlamaParse
 from loguru import logger
+from PIL import Image
 
-from .pdf_extractor import PDFExtractor  # V1 - Old LlamaParse
+from .pdf_extractor import PDFExtractor, FALLBACK_RENDER_PAGES, PRESENTATION_ASPECT_RATIO, _file_sha256  # V1 - Old LlamaParse
 from .pdf_extractor_v2 import PDFExtractorV2, LLAMACLOUD_AVAILABLE  # V2 - New LlamaCloud
 from .models import ExtractedImage, ExtractedTable, DiagramDescription
-from config import get_session_output_dir
+from config import settings, get_session_output_dir
+
+# Shared read-only default for missing result lists
+_EMPTY: Tuple = ()
+
+# Bump when the merged result shape changes so stale cache entries are ignored
+HYBRID_CACHE_VERSION = 1
+
+# Images whose 64-bit dHash differs in at most this many bits are treated as duplicates
+IMAGE_HASH_MAX_DISTANCE = 4
+# Hash split into 8-bit bands - two hashes within the distance share at least one band exactly
+IMAGE_HASH_BANDS = 8
+
+
+def _dhash(image_path: str) -> Optional[int]:
+    """
+    64-bit difference hash of an image file (None if it cannot be read)
+
+    Grayscale 9x8 thumbnail; each bit says whether a pixel is brighter than its right neighbour.
+    """
+    try:
+        with Image.open(image_path) as img:
+            img.draft("L", (64, 64))  # Let JPEG decode at reduced scale
+            pixels = list(img.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    except Exception:
+        return None
+
+    fingerprint = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            fingerprint = (fingerprint << 1) | (left > right)
+    return fingerprint
+
+
+def _hash_bands(fingerprint: int) -> List[Tuple[int, int]]:
+    """(band index, band value) keys used to bucket hashes for near-duplicate lookup"""
+    return [(band, (fingerprint >> (band * 8)) & 0xFF) for band in range(IMAGE_HASH_BANDS)]
 
 
 class HybridPDFExtractor:
@@ -27,23 +72,46 @@ class HybridPDFExtractor:
     - Layer 3: PyMuPDF (direct image extraction)
     """
 
+    # Per-layer time budgets (seconds) - a stalled upstream degrades to an empty layer
+    V1_TIMEOUT_S = 240
+    V2_TIMEOUT_S = 240
+    GATHER_TIMEOUT_S = max(V1_TIMEOUT_S, V2_TIMEOUT_S) + 15
+
+    # Layer key -> extraction_method prefix used for empty results
+    LAYER_METHODS = {"v1": "llamaparse_v1", "v2": "llamacloud_v2", "pymupdf": "pymupdf"}
+    LAYER_NAMES = {"v1": "Layer 1 (V1)", "v2": "Layer 2 (V2)", "pymupdf": "Layer 3 (PyMuPDF)"}
+
     def __init__(self, user_id: str, session_id: str):
         self.user_id = user_id
         self.session_id = session_id
         self.output_dir = get_session_output_dir(user_id, session_id)
 
-        # Initialize all extractors
-        self.extractor_v1 = PDFExtractor(user_id, session_id)  # Includes PyMuPDF
-
-        self.extractor_v2 = None
-        if LLAMACLOUD_AVAILABLE:
-            try:
-                self.extractor_v2 = PDFExtractorV2(user_id, session_id)
-                logger.info("LlamaCloud V2 extractor initialized")
-            except Exception as e:
-                logger.warning(f"LlamaCloud V2 extractor failed to initialize: {e}")
-        else:
-            logger.warning("LlamaCloud V2 not available, will use V1 + PyMuPDF only")
+        # Extractors (and their API clients) are created on first use
+        self._extractor_v1: Optional[PDFExtractor] = None
+        self._extractor_v2: Optional[PDFExtractorV2] = None
+        self._v2_initialized = False
+
+    @property
+    def extractor_v1(self) -> PDFExtractor:
+        """LlamaParse V1 + PyMuPDF extractor"""
+        if self._extractor_v1 is None:
+            self._extractor_v1 = PDFExtractor(self.user_id, self.session_id)  # Includes PyMuPDF
+        return self._extractor_v1
+
+    @property
+    def extractor_v2(self) -> Optional[PDFExtractorV2]:
+        """LlamaCloud V2 extractor, or None if unavailable"""
+        if not self._v2_initialized:
+            self._v2_initialized = True
+            if LLAMACLOUD_AVAILABLE:
+                try:
+                    self._extractor_v2 = PDFExtractorV2(self.user_id, self.session_id)
+                    logger.info("LlamaCloud V2 extractor initialized")
+                except Exception as e:
+                    logger.warning(f"LlamaCloud V2 extractor failed to initialize: {e}")
+            else:
+                logger.warning("LlamaCloud V2 not available, will use V1 + PyMuPDF only")
+        return self._extractor_v2
 
     async def extract_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """
@@ -56,67 +124,215 @@ class HybridPDFExtractor:
             Merged extraction results from all sources
         """
         logger.info(f"🚀 Starting TRIPLE-LAYER extraction for {pdf_path}")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            # Launch all extractors in parallel
-            tasks = []
-
-            # Layer 1: Old LlamaParse + PyMuPDF (always runs)
-            logger.info("⚡ Launching Layer 1: LlamaParse V1 + PyMuPDF")
-            tasks.append(self.extractor_v1.extract_pdf(pdf_path))
+            # Identical uploads reuse the previous merged result
+            file_hash = await asyncio.to_thread(_file_sha256, pdf_path)
+            cached_result = await asyncio.to_thread(self._load_cached_result, file_hash)
+            if cached_result is not None:
+                cached_result["total_time"] = time.perf_counter() - start_time
+                logger.success(f"✅ Reused cached extraction for {file_hash[:12]} in {cached_result['total_time']:.2f}s")
+                return cached_result
+
+            # Probe once up front: V1 gets its parser and PyMuPDF its page renders without a second open
+            plan = await self.extractor_v1._plan_extraction(pdf_path)
+            aspect_ratio = plan[0]
+
+            # Launch all extractors in parallel, keyed by layer so results can be handled as they land
+            layer_tasks: Dict[asyncio.Task, str] = {}
+            layer_results: Dict[str, Dict[str, Any]] = {}
 
             # Layer 2: New LlamaCloud (if available)
+            v2_task = None
             if self.extractor_v2:
                 logger.info("⚡ Launching Layer 2: LlamaCloud V2")
-                tasks.append(self.extractor_v2.extract_pdf(pdf_path))
+                v2_task = asyncio.ensure_future(
+                    self._guarded(self.extractor_v2.extract_pdf(pdf_path), "v2", self.V2_TIMEOUT_S)
+                )
+                layer_tasks[v2_task] = "v2"
             else:
-                # Create dummy result if V2 unavailable
+                # Empty result if V2 unavailable
                 logger.info("⚠️  Layer 2 skipped: LlamaCloud V2 not available")
-                async def dummy_v2():
-                    return {
-                        "text_markdown": "",
-                        "text_plain": "",
-                        "images": [],
-                        "tables": [],
-                        "mermaid_diagrams": [],
-                        "total_time": 0,
-                        "extraction_method": "llamacloud_v2_unavailable"
-                    }
-                tasks.append(dummy_v2())
-
-            # Run all tasks in parallel
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Unpack results
-            v1_result = results[0] if not isinstance(results[0], Exception) else None
-            v2_result = results[1] if len(results) > 1 and not isinstance(results[1], Exception) else None
-
-            # Handle extraction failures
-            if isinstance(results[0], Exception):
-                logger.error(f"Layer 1 (V1) failed: {results[0]}")
-                v1_result = self._get_empty_result("llamaparse_v1_failed")
-
-            if len(results) > 1 and isinstance(results[1], Exception):
-                logger.error(f"Layer 2 (V2) failed: {results[1]}")
-                v2_result = self._get_empty_result("llamacloud_v2_failed")
+                layer_results["v2"] = self._get_empty_result("llamacloud_v2_unavailable")
+
+            # Layer 1: Old LlamaParse (after V2's head start, skipped if V2 already covered it)
+            logger.info("⚡ Launching Layer 1: LlamaParse V1")
+            layer_tasks[asyncio.ensure_future(
+                self._guarded(self._run_v1(pdf_path, v2_task, plan), "v1", self.V1_TIMEOUT_S)
+            )] = "v1"
+
+            # Layer 3: PyMuPDF as its own peer so local image work never waits on (or dies with) LlamaParse
+            logger.info("⚡ Launching Layer 3: PyMuPDF")
+            layer_tasks[asyncio.ensure_future(
+                self._guarded(self._run_pymupdf(pdf_path, aspect_ratio), "pymupdf", self.V1_TIMEOUT_S)
+            )] = "pymupdf"
+
+            # Collect layers in completion order (overall deadline is a backstop for the per-layer timeouts)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.GATHER_TIMEOUT_S
+            pending = set(layer_tasks)
+            layers_succeeded = 0
+
+            try:
+                while pending:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        logger.error(f"Extraction layers exceeded {self.GATHER_TIMEOUT_S}s overall budget")
+                        break
+
+                    done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        layer = layer_tasks[task]
+                        layer_results[layer], succeeded = task.result()
+                        if layer != "pymupdf":
+                            layers_succeeded += succeeded
+
+                    # Early return counts the text layers, but always keeps the local PyMuPDF output
+                    if (
+                        pending
+                        and settings.hybrid_early_return
+                        and "pymupdf" in layer_results
+                        and layers_succeeded >= settings.hybrid_min_layers_required
+                    ):
+                        logger.info(f"Early return with {layers_succeeded} layer(s) - cancelling slower layers")
+                        break
+            finally:
+                # Cancel anything still running - also when our caller cancels us - and drain it (no timeout)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+            for task in pending:
+                layer = layer_tasks[task]
+                layer_results[layer] = self._get_empty_result(f"{self.LAYER_METHODS[layer]}_cancelled")
+
+            v1_result = await self._compose_v1_result(
+                pdf_path, layer_results["v1"], layer_results["pymupdf"], aspect_ratio
+            )
+            v2_result = layer_results["v2"]
 
             # Merge results from all layers
             logger.info("🔄 Merging results from all layers...")
-            merged_result = self._merge_extraction_results(v1_result, v2_result)
+            # Off the event loop: image merging decodes thumbnails for perceptual hashing
+            merged_result = await asyncio.to_thread(self._merge_extraction_results, v1_result, v2_result)
 
-            total_time = time.time() - start_time
+            total_time = time.perf_counter() - start_time
             merged_result["total_time"] = total_time
 
             logger.success(f"✅ TRIPLE-LAYER extraction completed in {total_time:.2f}s")
             self._log_extraction_summary(v1_result, v2_result, merged_result)
 
+            # Only complete extractions are worth replaying
+            if not any(
+                part.endswith(("_failed", "_timeout", "_cancelled"))
+                for method in merged_result["extraction_sources"].values()
+                for part in method.split(" + ")
+            ):
+                await asyncio.to_thread(self._save_cached_result, file_hash, merged_result)
+
             return merged_result
 
         except Exception as e:
             logger.error(f"Hybrid extraction failed: {e}")
             raise
 
+    async def batch_extract(
+        self,
+        pdf_paths: List[str],
+        max_concurrency: int = 4,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract several PDFs with this one extractor (shared clients and connections)
+
+        Args:
+            pdf_paths: Paths to the PDF files
+            max_concurrency: Maximum PDFs extracted at the same time
+            progress: Optional callback called with (pdf_path, result) as each PDF finishes
+
+        Returns:
+            One result per path, in input order - failed files yield
+            {"status": "error", "error": ..., "file": ...}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def extract_one(pdf_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.extract_pdf(pdf_path)
+                except Exception as e:
+                    logger.error(f"Batch extraction failed for {pdf_path}: {e}")
+                    result = {"status": "error", "error": str(e), "file": pdf_path}
+
+            if progress:
+                progress(pdf_path, result)
+            return result
+
+        logger.info(f"Starting batch extraction of {len(pdf_paths)} PDFs (concurrency {max_concurrency})")
+        return await asyncio.gather(*(extract_one(pdf_path) for pdf_path in pdf_paths))
+
+    def _cache_path(self, file_hash: str) -> Path:
+        """Location of the cached merged result for a PDF content hash"""
+        return settings.hybrid_cache_dir / f"v{HYBRID_CACHE_VERSION}_{file_hash}.json"
+
+    def _load_cached_result(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a cached merged result and link its image files into this session
+
+        Returns:
+            Merged result, or None on a miss or if the cached images are gone
+        """
+        cache_path = self._cache_path(file_hash)
+        if not cache_path.exists():
+            return None
+
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+
+            result["images"] = [ExtractedImage.model_validate(img) for img in result["images"]]
+            result["tables"] = [ExtractedTable.model_validate(table) for table in result["tables"]]
+            result["mermaid_diagrams"] = [DiagramDescription.model_validate(d) for d in result["mermaid_diagrams"]]
+
+            # Hardlink image files from the original session instead of copying bytes
+            for image in result["images"]:
+                if not image.image_path:
+                    continue
+                source = Path(image.image_path)
+                target = self.output_dir / source.name
+                if target != source and not target.exists():
+                    try:
+                        os.link(source, target)
+                    except OSError:
+                        shutil.copy2(source, target)  # Different filesystem
+                image.image_path = str(target)
+
+            return result
+
+        except Exception as e:
+            logger.warning(f"Ignoring unusable hybrid cache {cache_path.name}: {e}")
+            return None
+
+    def _save_cached_result(self, file_hash: str, result: Dict[str, Any]):
+        """Persist a merged result so identical uploads skip all extraction layers"""
+        cache_path = self._cache_path(file_hash)
+        try:
+            payload = dict(result)
+            payload["images"] = [img.model_dump() for img in result["images"]]
+            payload["tables"] = [table.model_dump() for table in result["tables"]]
+            payload["mermaid_diagrams"] = [d.model_dump() for d in result["mermaid_diagrams"]]
+
+            # Unique temp file per writer: concurrent extractions of the same PDF must not share it
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=cache_path.parent, suffix=".tmp", delete=False
+            ) as f:
+                json.dump(payload, f)
+            os.replace(f.name, cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to write hybrid cache {cache_path.name}: {e}")
+
     def _merge_extraction_results(
         self,
         v1_result: Dict[str, Any],
@@ -132,39 +348,37 @@ class HybridPDFExtractor:
         - Mermaid: Combine both (same source but good to merge)
         """
 
+        v1_get, v2_get = v1_result.get, v2_result.get
+
         # Text merging - prefer V2 for page-level structure
-        text_markdown = v2_result.get("text_markdown") or v1_result.get("text_markdown", "")
-        text_plain = v2_result.get("text_plain") or v1_result.get("text_plain", "")
+        v1_markdown = v1_get("text_markdown")
+        v2_markdown = v2_get("text_markdown")
+        text_markdown = v2_markdown or v1_markdown or ""
+        text_plain = v2_get("text_plain") or v1_get("text_plain", "")
 
         # If both available, use V2 (better page tracking)
-        if v2_result.get("text_markdown") and v1_result.get("text_markdown"):
+        if v2_markdown and v1_markdown:
             logger.info("Using LlamaCloud V2 text (has page markers)")
-        elif v1_result.get("text_markdown"):
+        elif v1_markdown:
             logger.info("Using LlamaParse V1 text (V2 unavailable)")
 
         # Tables merging - combine both sources
-        tables_v1 = v1_result.get("tables", [])
-        tables_v2 = v2_result.get("tables", [])
-
         # V2 tables have bounding boxes and exact page numbers
         # V1 tables may catch tables V2 missed
-        merged_tables = self._merge_tables(tables_v1, tables_v2)
+        merged_tables = self._merge_tables(v1_get("tables", _EMPTY), v2_get("tables", _EMPTY))
 
         # Images merging - combine all sources
-        images_v1 = v1_result.get("images", [])  # Embedded images + presentation fallback
-        images_v2 = v2_result.get("images", [])  # Page screenshots + embedded + layout
-
-        merged_images = self._merge_images(images_v1, images_v2)
+        merged_images = self._merge_images(
+            v1_get("images", _EMPTY),  # Embedded images + presentation fallback
+            v2_get("images", _EMPTY)  # Page screenshots + embedded + layout
+        )
 
         # Mermaid diagrams - combine both (deduplicate by content)
-        mermaid_v1 = v1_result.get("mermaid_diagrams", [])
-        mermaid_v2 = v2_result.get("mermaid_diagrams", [])
-
-        merged_mermaid = self._merge_mermaid_diagrams(mermaid_v1, mermaid_v2)
+        merged_mermaid = self._merge_mermaid_diagrams(v1_get("mermaid_diagrams", _EMPTY), v2_get("mermaid_diagrams", _EMPTY))
 
         # Metadata merging
-        v1_time = v1_result.get("llamaparse_time", 0) + v1_result.get("pymupdf_time", 0)
-        v2_time = v2_result.get("total_time", 0)
+        v1_time = v1_get("llamaparse_time", 0) + v1_get("pymupdf_time", 0)
+        v2_time = v2_get("total_time", 0)
 
         return {
             "text_markdown": text_markdown,
@@ -172,13 +386,13 @@ class HybridPDFExtractor:
             "images": merged_images,
             "tables": merged_tables,
             "mermaid_diagrams": merged_mermaid,
-            "confidence_score": v1_result.get("confidence_score") or v2_result.get("confidence_score"),
+            "confidence_score": v1_get("confidence_score") or v2_get("confidence_score"),
             "v1_processing_time": v1_time,
             "v2_processing_time": v2_time,
             "extraction_method": "hybrid_triple_layer (v1 + v2 + pymupdf)",
             "extraction_sources": {
-                "v1": v1_result.get("extraction_method", "unknown"),
-                "v2": v2_result.get("extraction_method", "unknown")
+                "v1": v1_get("extraction_method", "unknown"),
+                "v2": v2_get("extraction_method", "unknown")
             }
         }
 
@@ -192,42 +406,51 @@ class HybridPDFExtractor:
         - Prefer V2 tables (have bounding boxes and exact page numbers)
         - Add V1 tables that V2 might have missed (deduplicate by content similarity)
         """
-        merged = []
-
         # Add all V2 tables (priority - they have bounding boxes)
+        merged = list(tables_v2)
+
+        # Index V2 tables once so each V1 table is only checked against plausible matches
+        v2_shapes = set()
+        v2_headers_by_count = defaultdict(list)
         for table in tables_v2:
-            merged.append(table)
+            if table.page_number > 0:
+                v2_shapes.add((table.page_number, table.num_rows, table.num_cols))
+            if table.headers:
+                v2_headers_by_count[len(table.headers)].append(tuple(h.lower() for h in table.headers))
 
         # Add V1 tables that don't match V2 tables
-        for v1_table in tables_v1:
-            # Check if similar table exists in V2
-            is_duplicate = False
-            for v2_table in tables_v2:
-                if self._tables_are_similar(v1_table, v2_table):
-                    is_duplicate = True
-                    break
-
-            if not is_duplicate:
-                merged.append(v1_table)
+        merged += [
+            v1_table for v1_table in tables_v1
+            if not self._has_similar_table(v1_table, v2_shapes, v2_headers_by_count)
+        ]
 
         logger.info(f"Tables merged: {len(tables_v2)} from V2, {len(tables_v1)} from V1, {len(merged)} total (deduped)")
         return merged
 
-    def _tables_are_similar(self, table1: ExtractedTable, table2: ExtractedTable) -> bool:
-        """Check if two tables are likely the same (for deduplication)"""
-        # Same page and similar row/col counts
-        if table1.page_number > 0 and table2.page_number > 0:
-            if table1.page_number == table2.page_number:
-                if abs(table1.num_rows - table2.num_rows) <= 1:
-                    if abs(table1.num_cols - table2.num_cols) <= 1:
+    def _has_similar_table(
+        self,
+        table: ExtractedTable,
+        shapes: Set[Tuple[int, int, int]],
+        headers_by_count: Dict[int, List[Tuple[str, ...]]]
+    ) -> bool:
+        """Check if a likely-identical table is already indexed (for deduplication)"""
+        # Same page and similar row/col counts (fields read once, not per probe)
+        page, num_rows, num_cols = table.page_number, table.num_rows, table.num_cols
+        if page > 0:
+            for rows in (num_rows - 1, num_rows, num_rows + 1):
+                for cols in (num_cols - 1, num_cols, num_cols + 1):
+                    if (page, rows, cols) in shapes:
                         return True
 
         # Similar content (first row signature)
-        if table1.headers and table2.headers:
-            if len(table1.headers) == len(table2.headers):
+        if table.headers:
+            headers_lower = tuple(h.lower() for h in table.headers)
+            # More than 70% of headers must match (integer form of matches / count > 0.7)
+            match_floor = 7 * len(headers_lower)
+            for other_headers in headers_by_count.get(len(headers_lower), ()):
                 # Check if headers match
-                matches = sum(1 for h1, h2 in zip(table1.headers, table2.headers) if h1.lower() == h2.lower())
-                if matches / len(table1.headers) > 0.7:  # 70% header match
+                matches = sum(map(str.__eq__, headers_lower, other_headers))
+                if 10 * matches > match_floor:
                     return True
 
         return False
@@ -242,44 +465,214 @@ class HybridPDFExtractor:
         - V1: Embedded images (PyMuPDF) + presentation fallback (pdf2image)
         - V2: Page screenshots + embedded + layout images
         - Keep all unique images
+        - Duplicates are near-identical by perceptual hash; page-level heuristic only when a file can't be hashed
         """
-        merged = []
-
         # Add all V2 images (page screenshots are unique to V2)
+        merged = list(images_v2)
+
+        # Bucket V2 hashes by band so each V1 image only meets near candidates
+        v2_hash_buckets = defaultdict(list)
         for img in images_v2:
-            merged.append(img)
+            fingerprint = self._image_hash(img)
+            if fingerprint is not None:
+                for key in _hash_bands(fingerprint):
+                    v2_hash_buckets[key].append(fingerprint)
 
-        # Add V1 images that don't overlap with V2
-        for v1_img in images_v1:
-            # Check if same image exists in V2 (by page number and type)
-            is_duplicate = False
-            for v2_img in images_v2:
-                if v1_img.page_number == v2_img.page_number:
-                    # If both are from same page and similar type, likely duplicate
-                    if v1_img.image_id.startswith("page") and v2_img.image_type == "screenshot":
-                        is_duplicate = True
-                        break
+        # Pages that V2 already captured as a screenshot
+        screenshot_pages = {img.page_number for img in images_v2 if img.image_type == "screenshot"}
 
-            if not is_duplicate:
-                merged.append(v1_img)
+        # Add V1 images that don't overlap with V2
+        merged += [
+            v1_img for v1_img in images_v1
+            if not self._is_duplicate_image(v1_img, v2_hash_buckets, screenshot_pages)
+        ]
 
         logger.info(f"Images merged: {len(images_v2)} from V2, {len(images_v1)} from V1, {len(merged)} total")
         return merged
 
+    def _is_duplicate_image(
+        self,
+        image: ExtractedImage,
+        hash_buckets: Dict[Tuple[int, int], List[int]],
+        screenshot_pages: Set[int]
+    ) -> bool:
+        """Check if an image is a near-duplicate of an indexed one (for deduplication)"""
+        fingerprint = self._image_hash(image)
+        if fingerprint is not None:
+            return any(
+                (fingerprint ^ other).bit_count() <= IMAGE_HASH_MAX_DISTANCE
+                for key in _hash_bands(fingerprint)
+                for other in hash_buckets.get(key, ())
+            )
+
+        # No pixels to compare: page-level V1 images on a screenshotted page are duplicates
+        return image.image_id.startswith("page") and image.page_number in screenshot_pages
+
+    def _image_hash(self, image: ExtractedImage) -> Optional[int]:
+        """Perceptual hash of an extracted image, computed once and stored on the model"""
+        if image.perceptual_hash is None and image.image_path:
+            image.perceptual_hash = _dhash(image.image_path)
+        return image.perceptual_hash
+
     def _merge_mermaid_diagrams(
         self,
         diagrams_v1: List[DiagramDescription],
         diagrams_v2: List[DiagramDescription]
     ) -> List[DiagramDescription]:
-        """Merge Mermaid diagrams (usually identical, but combine to be safe)"""
-        # Mermaid diagrams come from markdown text, so V1 and V2 should find the same ones
-        # Use V2 if available (better page tracking), otherwise V1
-        if diagrams_v2:
-            logger.info(f"Using {len(diagrams_v2)} Mermaid diagrams from V2")
-            return diagrams_v2
-        else:
-            logger.info(f"Using {len(diagrams_v1)} Mermaid diagrams from V1")
-            return diagrams_v1
+        """Merge Mermaid diagrams by content so diagrams seen by only one source survive"""
+        merged = []
+        # Exact set of int hashes rather than a Bloom filter: a false positive would silently drop
+        # a unique diagram, and the set is small next to the diagrams kept in `merged`
+        seen_content = set()
+        seen_ids = set()
+        kept_per_source = {"v1": 0, "v2": 0}
+
+        # V2 first (better page tracking), then V1 diagrams V2 didn't find
+        for source, diagrams in (("v2", diagrams_v2), ("v1", diagrams_v1)):
+            for diagram in diagrams:
+                # Parsed content without the per-source numbering in image_id
+                content_key = hash(diagram.model_dump_json(exclude={"image_id"}))
+                if content_key in seen_content:
+                    continue
+                seen_content.add(content_key)
+
+                # Both sources number diagrams from 1 - keep ids unique
+                if diagram.image_id in seen_ids:
+                    diagram = diagram.model_copy(update={"image_id": f"{diagram.image_id}_{source}"})
+                seen_ids.add(diagram.image_id)
+
+                merged.append(diagram)
+                kept_per_source[source] += 1
+
+        logger.info(
+            f"Mermaid diagrams merged: {kept_per_source['v2']} from V2, "
+            f"{kept_per_source['v1']} unique from V1, {len(merged)} total"
+        )
+        return merged
+
+    async def _run_v1(
+        self,
+        pdf_path: str,
+        v2_task: Optional[asyncio.Task],
+        plan: Tuple[float, int, LlamaParse]
+    ) -> Dict[str, Any]:
+        """
+        Run Layer 1 LlamaParse text extraction, skipping the round-trip if Layer 2 answers completely first
+
+        Args:
+            pdf_path: Path to the PDF file
+            v2_task: The running Layer 2 task (None if V2 is unavailable)
+            plan: (aspect ratio, page count, LlamaParse client) from the up-front probe
+
+        Returns:
+            V1 text/tables/Mermaid result, or an empty "skipped" result when V2 already has text and tables
+        """
+        if v2_task is not None and settings.hybrid_v1_start_delay > 0:
+            done, _ = await asyncio.wait({v2_task}, timeout=settings.hybrid_v1_start_delay)
+            if done:
+                v2_result, succeeded = v2_task.result()
+                if succeeded and self._is_complete_result(v2_result):
+                    logger.info("Layer 2 returned text and tables - skipping LlamaParse V1")
+                    return self._get_empty_result("llamaparse_v1_skipped")
+
+        result = await self.extractor_v1.extract_text_fast(pdf_path, plan)
+        result["extraction_method"] = "llamaparse_agentic"
+        return result
+
+    def _is_complete_result(self, result: Dict[str, Any]) -> bool:
+        """Whether a layer result has text and tables (and enough confidence, if reported)"""
+        if not result.get("text_markdown") or not result.get("tables"):
+            return False
+
+        confidence_score = result.get("confidence_score")
+        return confidence_score is None or confidence_score >= settings.hybrid_v1_skip_min_confidence
+
+    async def _run_pymupdf(self, pdf_path: str, aspect_ratio: float) -> Dict[str, Any]:
+        """
+        Run Layer 3: PyMuPDF embedded images, plus page renders for landscape (presentation) PDFs
+
+        Args:
+            pdf_path: Path to the PDF file
+            aspect_ratio: First page width/height ratio from the up-front probe
+
+        Returns:
+            PyMuPDF result
+        """
+        presentation_style = aspect_ratio > PRESENTATION_ASPECT_RATIO
+
+        # Page renders share the PyMuPDF thread and document (MuPDF is not thread-safe)
+        result = await self.extractor_v1._extract_with_pymupdf(
+            pdf_path, render_pages=FALLBACK_RENDER_PAGES if presentation_style else 0
+        )
+        page_images = result.pop("page_images", [])
+        if presentation_style:
+            logger.info("Detected presentation-style PDF - using page images rendered with the image pass")
+            result["images"] = result["images"] + page_images
+
+        result["extraction_method"] = "pymupdf"
+        return result
+
+    async def _compose_v1_result(
+        self,
+        pdf_path: str,
+        text_result: Dict[str, Any],
+        pymupdf_result: Dict[str, Any],
+        aspect_ratio: float
+    ) -> Dict[str, Any]:
+        """
+        Combine Layer 1 text and Layer 3 PyMuPDF output into the V1 result shape used by the merge
+
+        Args:
+            pdf_path: Path to the PDF file
+            text_result: LlamaParse V1 result (text, tables, Mermaid)
+            pymupdf_result: PyMuPDF result (images, fallback text)
+            aspect_ratio: First page width/height ratio from the up-front probe
+
+        Returns:
+            V1 result with images, timings and a combined extraction_method
+        """
+        result = dict(text_result)
+        result["images"] = list(pymupdf_result.get("images", _EMPTY))
+        result["pymupdf_time"] = pymupdf_result.get("processing_time", 0)
+        result["extraction_method"] = f"{text_result['extraction_method']} + {pymupdf_result['extraction_method']}"
+
+        # If LlamaParse produced nothing, use PyMuPDF text as fallback
+        if not result.get("text_plain") and pymupdf_result.get("text_plain"):
+            result["text_plain"] = pymupdf_result["text_plain"]
+            logger.warning("Using PyMuPDF text extraction as LlamaParse fallback")
+
+        # Mermaid diagrams but no embedded images on a portrait PDF: render pages after all
+        if aspect_ratio <= PRESENTATION_ASPECT_RATIO and self.extractor_v1._is_presentation_style_pdf(
+            aspect_ratio, len(result["images"]), len(result.get("mermaid_diagrams", _EMPTY))
+        ):
+            logger.info("Detected presentation-style PDF - applying page image fallback")
+            result["images"] += await asyncio.to_thread(self.extractor_v1._extract_page_images_fallback, pdf_path)
+
+        return result
+
+    async def _guarded(self, coro: Awaitable[Dict[str, Any]], layer: str, timeout_s: float) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run one extraction layer under its own timeout
+
+        Args:
+            coro: The layer's extract_pdf coroutine
+            layer: Layer key ("v1" or "v2")
+            timeout_s: Time budget for this layer
+
+        Returns:
+            Tuple of (result, whether the layer succeeded) - timeouts and failures yield empty results
+        """
+        try:
+            result = await asyncio.wait_for(coro, timeout=timeout_s)
+        except asyncio.TimeoutError:
+            logger.error(f"{self.LAYER_NAMES[layer]} timed out after {timeout_s}s")
+            return self._get_empty_result(f"{self.LAYER_METHODS[layer]}_timeout"), False
+        except Exception as e:
+            logger.error(f"{self.LAYER_NAMES[layer]} failed: {e}")
+            return self._get_empty_result(f"{self.LAYER_METHODS[layer]}_failed"), False
+
+        logger.info(f"{self.LAYER_NAMES[layer]} finished")
+        return result, True
 
     def _get_empty_result(self, method: str) -> Dict[str, Any]:
         """Return empty result structure for failed extractions"""
@@ -299,47 +692,56 @@ class HybridPDFExtractor:
         v2_result: Dict[str, Any],
         merged_result: Dict[str, Any]
     ):
-        """Log detailed summary of extraction results"""
-        logger.info("=" * 60)
-        logger.info("EXTRACTION SUMMARY")
-        logger.info("=" * 60)
+        """Log detailed summary of extraction results (only formatted if an INFO sink is enabled)"""
+        logger.opt(lazy=True).info(
+            "{}", lambda: self._format_extraction_summary(v1_result, v2_result, merged_result)
+        )
+
+    def _result_counts(self, result: Dict[str, Any]) -> Tuple[int, int, int]:
+        """(tables, images, mermaid diagrams) counts of an extraction result"""
+        get = result.get
+        return len(get("tables", _EMPTY)), len(get("images", _EMPTY)), len(get("mermaid_diagrams", _EMPTY))
 
+    def _format_extraction_summary(
+        self,
+        v1_result: Dict[str, Any],
+        v2_result: Dict[str, Any],
+        merged_result: Dict[str, Any]
+    ) -> str:
+        """Build the multi-line extraction summary"""
         # Layer 1 stats
-        v1_tables = len(v1_result.get("tables", []))
-        v1_images = len(v1_result.get("images", []))
-        v1_mermaid = len(v1_result.get("mermaid_diagrams", []))
+        v1_tables, v1_images, v1_mermaid = self._result_counts(v1_result)
         v1_time = v1_result.get("llamaparse_time", 0) + v1_result.get("pymupdf_time", 0)
 
-        logger.info(f"Layer 1 (V1 + PyMuPDF):")
-        logger.info(f"  - Tables: {v1_tables}")
-        logger.info(f"  - Images: {v1_images}")
-        logger.info(f"  - Mermaid: {v1_mermaid}")
-        logger.info(f"  - Time: {v1_time:.2f}s")
-
         # Layer 2 stats
-        v2_tables = len(v2_result.get("tables", []))
-        v2_images = len(v2_result.get("images", []))
-        v2_mermaid = len(v2_result.get("mermaid_diagrams", []))
+        v2_tables, v2_images, v2_mermaid = self._result_counts(v2_result)
         v2_time = v2_result.get("total_time", 0)
 
-        logger.info(f"Layer 2 (LlamaCloud V2):")
-        logger.info(f"  - Tables: {v2_tables} (with bboxes)")
-        logger.info(f"  - Images: {v2_images} (screenshots + embedded)")
-        logger.info(f"  - Mermaid: {v2_mermaid}")
-        logger.info(f"  - Time: {v2_time:.2f}s")
-
         # Merged stats
-        merged_tables = len(merged_result.get("tables", []))
-        merged_images = len(merged_result.get("images", []))
-        merged_mermaid = len(merged_result.get("mermaid_diagrams", []))
+        merged_tables, merged_images, merged_mermaid = self._result_counts(merged_result)
         merged_time = merged_result.get("total_time", 0)
 
-        logger.info(f"MERGED RESULT:")
-        logger.info(f"  - Tables: {merged_tables} ({merged_tables - max(v1_tables, v2_tables)} additional)")
-        logger.info(f"  - Images: {merged_images} (combined from both)")
-        logger.info(f"  - Mermaid: {merged_mermaid}")
-        logger.info(f"  - Total Time: {merged_time:.2f}s")
-        logger.info("=" * 60)
+        return "\n".join([
+            "=" * 60,
+            "EXTRACTION SUMMARY",
+            "=" * 60,
+            "Layer 1 (V1 + PyMuPDF):",
+            f"  - Tables: {v1_tables}",
+            f"  - Images: {v1_images}",
+            f"  - Mermaid: {v1_mermaid}",
+            f"  - Time: {v1_time:.2f}s",
+            "Layer 2 (LlamaCloud V2):",
+            f"  - Tables: {v2_tables} (with bboxes)",
+            f"  - Images: {v2_images} (screenshots + embedded)",
+            f"  - Mermaid: {v2_mermaid}",
+            f"  - Time: {v2_time:.2f}s",
+            "MERGED RESULT:",
+            f"  - Tables: {merged_tables} ({merged_tables - max(v1_tables, v2_tables)} additional)",
+            f"  - Images: {merged_images} (combined from both)",
+            f"  - Mermaid: {merged_mermaid}",
+            f"  - Total Time: {merged_time:.2f}s",
+            "=" * 60,
+        ])
 
 
 async def extract_pdf_hybrid(pdf_path: str, user_id: str, session_id: str) -> Dict[str, Any]:
@@ -356,3 +758,25 @@ async def extract_pdf_hybrid(pdf_path: str, user_id: str, session_id: str) -> Di
     """
     extractor = HybridPDFExtractor(user_id, session_id)
     return await extractor.extract_pdf(pdf_path)
+
+
+async def extract_pdfs_hybrid(
+    pdf_paths: List[str],
+    user_id: str,
+    session_id: str,
+    max_concurrency: int = 4
+) -> List[Dict[str, Any]]:
+    """
+    Convenience function for hybrid extraction of several PDFs with one extractor
+
+    Args:
+        pdf_paths: Paths to PDF files
+        user_id: User identifier
+        session_id: Session identifier
+        max_concurrency: Maximum PDFs extracted at the same time
+
+    Returns:
+        Merged extraction results per PDF, in input order
+    """
+    extractor = HybridPDFExtractor(user_id, session_id)
+    return await extractor.batch_extract(pdf_paths, max_concurrency=max_concurrency)
@@ -5,10 +5,13 @@ Provides structured page-level results, bounding boxes, and page screenshots
 """
 import asyncio
 import base64
+import re
 import time
 import httpx
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from operator import attrgetter
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from loguru import logger
 
 try:
@@ -22,8 +25,62 @@ except ImportError:
 from .models import ExtractedImage, ExtractedTable, DiagramDescription, BoundingBox
 from .table_parser import TableParser
 from .mermaid_parser import MermaidParser
+from .pdf_extractor import _file_sha256
 from config import settings, get_session_output_dir
 
+# Parallel presigned-URL image downloads per extraction
+IMAGE_DOWNLOAD_CONCURRENCY = 16
+# Images up to this size are written/encoded inline - a thread hand-off costs more than the work
+INLINE_IMAGE_IO_MAX_BYTES = 256 * 1024
+# LlamaCloud full-page screenshot filenames, e.g. page_3.jpg
+PAGE_SCREENSHOT_RE = re.compile(r"^page_(\d+)\.jpg$")
+
+# Keep-alive connections held by the shared download client (presigned URLs share a few hosts)
+HTTP_KEEPALIVE_CONNECTIONS = 32
+HTTP_TIMEOUT_S = 30.0
+
+# LlamaCloud file ids of PDFs already uploaded by this process, keyed by content SHA-256
+# (least recently used evicted first)
+UPLOADED_FILE_IDS_SIZE = 1024
+_uploaded_file_ids: "OrderedDict[str, str]" = OrderedDict()
+
+# Process-wide client for image downloads, so connections (and TLS sessions) survive across extractions
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _forget_file_id(file_id: str):
+    """Drop a cached LlamaCloud file id so the next extraction uploads the file again"""
+    for file_hash, cached_id in list(_uploaded_file_ids.items()):
+        if cached_id == file_id:
+            del _uploaded_file_ids[file_hash]
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared image-download client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_S,
+            limits=httpx.Limits(max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared image-download client (call on application / worker shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _cell_text_getter(rows: List[Any]) -> Callable[[Any], str]:
+    """Text accessor for a table's cells, probed once on the first cell instead of per cell"""
+    first_cells = getattr(rows[0], 'cells', None) if rows else None
+    if first_cells and hasattr(first_cells[0], 'text'):
+        return attrgetter('text')
+    return str
+
 
 class PDFExtractorV2:
     """Handles PDF extraction using new LlamaCloud API with advanced features"""
@@ -50,75 +107,50 @@ class PDFExtractorV2:
             Dictionary containing extracted text, images, tables, and metadata
         """
         logger.info(f"Starting LlamaCloud V2 extraction for {pdf_path}")
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            # Step 1: Upload file to LlamaCloud
-            upload_start = time.time()
-            file_obj = await self.client.files.create(
-                file=pdf_path,
-                purpose="parse"
-            )
-            upload_time = time.time() - upload_start
-            logger.info(f"File uploaded to LlamaCloud: {file_obj.id} ({upload_time:.2f}s)")
+            # Step 1: Upload file to LlamaCloud (skipped if this content was uploaded before)
+            upload_start = time.perf_counter()
+            file_id, reused = await self._upload_file(pdf_path)
+            upload_time = time.perf_counter() - upload_start
 
             # Step 2: Parse with advanced options
-            parse_start = time.time()
-            result = await self.client.parsing.parse(
-                file_id=file_obj.id,
-                tier="agentic",  # Highest quality parsing
-                version="latest",  # Use latest parsing version
-
-                # Advanced output options
-                output_options={
-                    "markdown": {
-                        "annotate_links": True,  # Preserve URLs
-                        "tables": {
-                            "compact_markdown_tables": True,  # Better table formatting
-                            "merge_continued_tables": True  # Merge multi-page tables
-                        },
-                        "inline_images": True  # Embed images in markdown
-                    },
-                    "images_to_save": ["embedded", "screenshot", "layout"],  # All image types
-                    "spatial_text": {
-                        "preserve_layout_alignment_across_pages": True,  # Better structure
-                        "preserve_very_small_text": True  # Capture fine print
-                    }
-                },
-
-                # Processing options
-                processing_options={
-                    "cost_optimizer": {
-                        "enable": True  # Reduce API costs
-                    }
-                },
-
-                # Expand to get all result fields
-                expand=["text", "items", "markdown", "images_content_metadata"]
-            )
-            parse_time = time.time() - parse_start
+            parse_start = time.perf_counter()
+            try:
+                result = await self._parse(file_id)
+            except Exception as e:
+                # The remote copy may have expired - drop the id, and upload again once if it was reused
+                _forget_file_id(file_id)
+                if not reused:
+                    raise
+                logger.warning(f"Parsing reused LlamaCloud upload {file_id} failed ({e}), uploading again")
+                file_id, _ = await self._upload_file(pdf_path)
+                try:
+                    result = await self._parse(file_id)
+                except Exception:
+                    _forget_file_id(file_id)
+                    raise
+            parse_time = time.perf_counter() - parse_start
             logger.success(f"LlamaCloud parsing completed ({parse_time:.2f}s)")
 
             # Step 3: Process results
-            processing_start = time.time()
+            processing_start = time.perf_counter()
 
-            # Extract text per page
-            text_markdown = self._extract_markdown(result)
+            # Extract text per page (Mermaid diagrams are parsed while the markdown is assembled)
+            text_markdown, mermaid_diagrams = self._extract_markdown_and_mermaid(result)
             text_plain = self._extract_plain_text(result)
 
             # Extract tables with bounding boxes from structured items
             tables = await self._extract_tables_from_items(result)
 
-            # Extract Mermaid diagrams from markdown
-            mermaid_diagrams = self._extract_mermaid_diagrams(text_markdown)
-
             # Extract images with presigned URLs
             images = await self._extract_images(result)
 
-            processing_time = time.time() - processing_start
+            processing_time = time.perf_counter() - processing_start
             logger.info(f"Result processing completed ({processing_time:.2f}s)")
 
-            total_time = time.time() - start_time
+            total_time = time.perf_counter() - start_time
 
             return {
                 "text_markdown": text_markdown,
@@ -132,28 +164,102 @@ class PDFExtractorV2:
                 "processing_time": processing_time,
                 "total_time": total_time,
                 "extraction_method": "llamacloud_v2_agentic",
-                "file_id": file_obj.id
+                "file_id": file_id
             }
 
         except Exception as e:
             logger.error(f"LlamaCloud V2 extraction failed: {e}")
             raise
 
-    def _extract_markdown(self, result) -> str:
-        """Extract page-level markdown text"""
+    async def _upload_file(self, pdf_path: str) -> Tuple[str, bool]:
+        """
+        Upload a PDF to LlamaCloud, reusing the file id of identical content uploaded earlier
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Tuple of (LlamaCloud file id, whether it was reused from an earlier upload)
+        """
+        file_hash = await asyncio.to_thread(_file_sha256, pdf_path)
+        file_id = _uploaded_file_ids.get(file_hash)
+        if file_id is not None:
+            _uploaded_file_ids.move_to_end(file_hash)
+            logger.info(f"Reusing LlamaCloud upload {file_id} for identical content ({file_hash[:12]})")
+            return file_id, True
+
+        file_obj = await self.client.files.create(
+            file=pdf_path,
+            purpose="parse"
+        )
+        _uploaded_file_ids[file_hash] = file_obj.id
+        if len(_uploaded_file_ids) > UPLOADED_FILE_IDS_SIZE:
+            _uploaded_file_ids.popitem(last=False)
+        logger.info(f"File uploaded to LlamaCloud: {file_obj.id}")
+        return file_obj.id, False
+
+    async def _parse(self, file_id: str):
+        """Parse an uploaded file with the agentic tier and all advanced output options"""
+        return await self.client.parsing.parse(
+            file_id=file_id,
+            tier="agentic",  # Highest quality parsing
+            version="latest",  # Use latest parsing version
+
+            # Advanced output options
+            output_options={
+                "markdown": {
+                    "annotate_links": True,  # Preserve URLs
+                    "tables": {
+                        "compact_markdown_tables": True,  # Better table formatting
+                        "merge_continued_tables": True  # Merge multi-page tables
+                    },
+                    "inline_images": True  # Embed images in markdown
+                },
+                "images_to_save": ["embedded", "screenshot", "layout"],  # All image types
+                "spatial_text": {
+                    "preserve_layout_alignment_across_pages": True,  # Better structure
+                    "preserve_very_small_text": True  # Capture fine print
+                }
+            },
+
+            # Processing options
+            processing_options={
+                "cost_optimizer": {
+                    "enable": True  # Reduce API costs
+                }
+            },
+
+            # Expand to get all result fields
+            expand=["text", "items", "markdown", "images_content_metadata"]
+        )
+
+    def _extract_markdown_and_mermaid(self, result) -> Tuple[str, List[DiagramDescription]]:
+        """Assemble page-level markdown and parse Mermaid diagrams from each page in the same pass"""
+        fragments = []
+        diagrams = []
+
         try:
             if not hasattr(result, 'markdown') or not result.markdown:
-                return ""
+                return "", diagrams
 
-            markdown_text = ""
+            mermaid_parser = MermaidParser()
+            next_number = 1  # Counts every matched block, parsed or not, so ids stay unique across pages
             for page in result.markdown.pages:
-                markdown_text += f"\n<!-- Page {page.page_number} -->\n"
-                markdown_text += page.markdown + "\n\n"
+                fragments.append(f"\n<!-- Page {page.page_number} -->\n{page.markdown}\n\n")
 
-            return markdown_text.strip()
+                try:
+                    page_diagrams, next_number = mermaid_parser.extract_mermaid_diagrams_numbered(
+                        page.markdown, start_number=next_number
+                    )
+                    diagrams.extend(page_diagrams)
+                except Exception as e:
+                    logger.warning(f"Failed to extract Mermaid diagrams from page {page.page_number}: {e}")
+
+            logger.info(f"Extracted {len(diagrams)} Mermaid diagrams from LlamaCloud markdown")
+            return "".join(fragments).strip(), diagrams
         except Exception as e:
             logger.warning(f"Failed to extract markdown: {e}")
-            return ""
+            return "".join(fragments).strip(), diagrams
 
     def _extract_plain_text(self, result) -> str:
         """Extract page-level plain text"""
@@ -161,12 +267,10 @@ class PDFExtractorV2:
             if not hasattr(result, 'text') or not result.text:
                 return ""
 
-            plain_text = ""
-            for page in result.text.pages:
-                plain_text += f"\n--- Page {page.page_number} ---\n"
-                plain_text += page.text + "\n\n"
-
-            return plain_text.strip()
+            return "".join(
+                f"\n--- Page {page.page_number} ---\n{page.text}\n\n"
+                for page in result.text.pages
+            ).strip()
         except Exception as e:
             logger.warning(f"Failed to extract plain text: {e}")
             return ""
@@ -188,50 +292,36 @@ class PDFExtractorV2:
                         table_counter += 1
 
                         try:
-                            # Extract table data
-                            headers = []
-                            rows = []
-
-                            # First row is usually headers
-                            if item.rows and len(item.rows) > 0:
-                                first_row = item.rows[0]
-                                if hasattr(first_row, 'cells'):
-                                    headers = [cell.text if hasattr(cell, 'text') else str(cell)
-                                             for cell in first_row.cells]
-
-                                    # Remaining rows are data
-                                    for row_idx in range(1, len(item.rows)):
-                                        row_obj = item.rows[row_idx]
-                                        if hasattr(row_obj, 'cells'):
-                                            row_data = [cell.text if hasattr(cell, 'text') else str(cell)
-                                                      for cell in row_obj.cells]
-                                            rows.append(row_data)
-
-                            # If no explicit headers, use all rows as data
-                            if not headers and item.rows:
-                                for row_obj in item.rows:
-                                    if hasattr(row_obj, 'cells'):
-                                        row_data = [cell.text if hasattr(cell, 'text') else str(cell)
-                                                  for cell in row_obj.cells]
-                                        rows.append(row_data)
+                            # Cell type is uniform within a table - pick the text accessor once
+                            get_text = _cell_text_getter(item.rows)
+
+                            # First row is usually headers (when it has any cells); otherwise every row is data
+                            first_cells = getattr(item.rows[0], 'cells', None) if item.rows else None
+                            headers = [get_text(cell) for cell in first_cells] if first_cells else []
+                            data_rows = item.rows[1:] if headers else (item.rows or [])
+
+                            # Single pass over the data rows
+                            rows = [
+                                [get_text(cell) for cell in row_obj.cells]
+                                for row_obj in data_rows
+                                if hasattr(row_obj, 'cells')
+                            ]
 
                             # Extract bounding box if available
                             b_box = None
-                            if hasattr(item, 'b_box') and item.b_box:
+                            item_b_box = getattr(item, 'b_box', None)
+                            if item_b_box:
                                 b_box = BoundingBox(
-                                    x=item.b_box.x if hasattr(item.b_box, 'x') else 0,
-                                    y=item.b_box.y if hasattr(item.b_box, 'y') else 0,
-                                    width=item.b_box.width if hasattr(item.b_box, 'width') else 0,
-                                    height=item.b_box.height if hasattr(item.b_box, 'height') else 0
+                                    x=getattr(item_b_box, 'x', 0),
+                                    y=getattr(item_b_box, 'y', 0),
+                                    width=getattr(item_b_box, 'width', 0),
+                                    height=getattr(item_b_box, 'height', 0)
                                 )
 
-                            # Generate HTML representation
-                            html_content = self._rows_to_html(headers, rows)
-
+                            # HTML is rendered from headers/rows only when first needed
                             table = ExtractedTable(
                                 table_id=f"llamacloud_table_{table_counter}",
                                 page_number=page.page_number,
-                                html_content=html_content,
                                 headers=headers,
                                 rows=rows,
                                 num_rows=len(rows),
@@ -253,39 +343,6 @@ class PDFExtractorV2:
             logger.error(f"Failed to extract tables from items: {e}")
             return tables
 
-    def _rows_to_html(self, headers: List[str], rows: List[List[str]]) -> str:
-        """Convert headers and rows to HTML table"""
-        html = "<table>\n"
-
-        if headers:
-            html += "  <thead>\n    <tr>\n"
-            for header in headers:
-                html += f"      <th>{header}</th>\n"
-            html += "    </tr>\n  </thead>\n"
-
-        if rows:
-            html += "  <tbody>\n"
-            for row in rows:
-                html += "    <tr>\n"
-                for cell in row:
-                    html += f"      <td>{cell}</td>\n"
-                html += "    </tr>\n"
-            html += "  </tbody>\n"
-
-        html += "</table>"
-        return html
-
-    def _extract_mermaid_diagrams(self, markdown: str) -> List[DiagramDescription]:
-        """Extract and parse Mermaid diagrams from markdown text"""
-        try:
-            mermaid_parser = MermaidParser()
-            diagrams = mermaid_parser.extract_mermaid_diagrams(markdown)
-            logger.info(f"Extracted {len(diagrams)} Mermaid diagrams from LlamaCloud markdown")
-            return diagrams
-        except Exception as e:
-            logger.warning(f"Failed to extract Mermaid diagrams: {e}")
-            return []
-
     async def _extract_images(self, result) -> List[ExtractedImage]:
         """Extract images from LlamaCloud result with presigned URLs"""
         images = []
@@ -295,70 +352,22 @@ class PDFExtractorV2:
                 logger.warning("No images_content_metadata in result")
                 return images
 
-            image_counter = 0
-
-            for image_meta in result.images_content_metadata.images:
-                try:
-                    image_counter += 1
-
-                    # Determine image type
-                    import re
-                    is_page_screenshot = re.match(r"^page_(\d+)\.jpg$", image_meta.filename) is not None
-                    is_embedded = "embedded" in image_meta.filename.lower()
-                    is_layout = "layout" in image_meta.filename.lower()
-
-                    image_type = "screenshot" if is_page_screenshot else ("embedded" if is_embedded else "layout")
-
-                    # Extract page number from filename
-                    page_number = 0
-                    if is_page_screenshot:
-                        match = re.match(r"^page_(\d+)\.jpg$", image_meta.filename)
-                        if match:
-                            page_number = int(match.group(1))
-
-                    # Download image if presigned URL available
-                    image_path = None
-                    image_base64 = None
-
-                    if image_meta.presigned_url:
-                        try:
-                            # Download image
-                            async with httpx.AsyncClient() as http_client:
-                                response = await http_client.get(image_meta.presigned_url)
-                                image_bytes = response.content
-
-                            # Save to disk
-                            img_filename = f"llamacloud_{image_meta.filename}"
-                            img_path = self.output_dir / img_filename
-
-                            with open(img_path, "wb") as img_file:
-                                img_file.write(image_bytes)
-
-                            # Convert to base64
-                            image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-                            image_path = str(img_path)
-
-                            logger.debug(f"Downloaded {image_meta.filename}, {image_meta.size_bytes} bytes")
-
-                        except Exception as download_error:
-                            logger.warning(f"Failed to download image {image_meta.filename}: {download_error}")
-
-                    # Create ExtractedImage object
-                    extracted_image = ExtractedImage(
-                        image_id=f"llamacloud_img_{image_counter}",
-                        page_number=page_number,
-                        image_path=image_path or "",
-                        image_base64=image_base64,
-                        presigned_url=image_meta.presigned_url,
-                        image_type=image_type,
-                        width=None,  # Not provided in metadata
-                        height=None
-                    )
-
-                    images.append(extracted_image)
+            # Download all images concurrently over the shared pooled client (bounded by a semaphore)
+            semaphore = asyncio.Semaphore(IMAGE_DOWNLOAD_CONCURRENCY)
+            http_client = _get_http_client()
+            outcomes = await asyncio.gather(
+                *(
+                    self._build_image(http_client, semaphore, image_counter, image_meta)
+                    for image_counter, image_meta in enumerate(result.images_content_metadata.images, start=1)
+                ),
+                return_exceptions=True
+            )
 
-                except Exception as e:
-                    logger.warning(f"Failed to process image {image_counter}: {e}")
+            for image_counter, outcome in enumerate(outcomes, start=1):
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Failed to process image {image_counter}: {outcome}")
+                else:
+                    images.append(outcome)
 
             logger.info(f"Extracted {len(images)} images from LlamaCloud")
             return images
@@ -367,6 +376,81 @@ class PDFExtractorV2:
             logger.error(f"Failed to extract images: {e}")
             return images
 
+    async def _build_image(
+        self,
+        http_client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        image_counter: int,
+        image_meta: Any
+    ) -> ExtractedImage:
+        """
+        Classify one LlamaCloud image and download it via its presigned URL
+
+        Args:
+            http_client: Shared pooled HTTP client
+            semaphore: Bounds concurrent downloads
+            image_counter: 1-based position used for the image_id
+            image_meta: Entry from images_content_metadata.images
+
+        Returns:
+            ExtractedImage (without local file/base64 if the download failed)
+        """
+        # Determine image type (one match yields both the type and the page number)
+        page_match = PAGE_SCREENSHOT_RE.match(image_meta.filename)
+        is_page_screenshot = page_match is not None
+        is_embedded = "embedded" in image_meta.filename.lower()
+
+        image_type = "screenshot" if is_page_screenshot else ("embedded" if is_embedded else "layout")
+
+        # Extract page number from filename
+        page_number = int(page_match.group(1)) if page_match else 0
+
+        # Download image if presigned URL available
+        image_path = None
+        image_base64 = None
+
+        if image_meta.presigned_url:
+            try:
+                # Download image
+                async with semaphore:
+                    response = await http_client.get(image_meta.presigned_url)
+                    response.raise_for_status()
+                    image_bytes = response.content
+
+                # Save to disk and convert to base64 if enabled (large images off the event loop)
+                img_filename = f"llamacloud_{image_meta.filename}"
+                img_path = self.output_dir / img_filename
+
+                if len(image_bytes) > INLINE_IMAGE_IO_MAX_BYTES:
+                    image_base64 = await asyncio.to_thread(self._save_and_encode, img_path, image_bytes)
+                else:
+                    image_base64 = self._save_and_encode(img_path, image_bytes)
+                image_path = str(img_path)
+
+                logger.debug(f"Downloaded {image_meta.filename}, {image_meta.size_bytes} bytes")
+
+            except Exception as download_error:
+                logger.warning(f"Failed to download image {image_meta.filename}: {download_error}")
+
+        # Create ExtractedImage object
+        return ExtractedImage(
+            image_id=f"llamacloud_img_{image_counter}",
+            page_number=page_number,
+            image_path=image_path or "",
+            image_base64=image_base64,
+            presigned_url=image_meta.presigned_url,
+            image_type=image_type,
+            width=None,  # Not provided in metadata
+            height=None
+        )
+
+    def _save_and_encode(self, img_path: Path, image_bytes: bytes) -> Optional[str]:
+        """Write a downloaded image to disk and return its base64 encoding (None if inline copies are off)"""
+        img_path.write_bytes(image_bytes)
+        if not settings.include_image_base64:
+            return None
+        return base64.b64encode(image_bytes).decode("ascii")
+
 
 async def extract_pdf_complete_v2(pdf_path: str, user_id: str, session_id: str) -> Dict[str, Any]:
     """
@@ -2,18 +2,28 @@
 FastAPI Router for Document Extraction Endpoints
 Handles file uploads and extraction job management
 """
+import asyncio
+import hashlib
+import json
 import os
+import shutil
 import uuid
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
-from fastapi import APIRouter, UploadFile, File, HTTPException, Path as PathParam
+from typing import List, Optional, Tuple
+import aiofiles
+from fastapi import (
+    APIRouter, BackgroundTasks, UploadFile, File, HTTPException, Path as PathParam, Response, status
+)
 from fastapi.responses import HTMLResponse, JSONResponse
 from loguru import logger
+from redis.asyncio import Redis
 
 from .models import (
     UploadResponse,
     ExtractionResult,
+    ExtractedImage,
     ExtractionStatus,
     FileType
 )
@@ -26,210 +36,574 @@ from config import settings, get_session_output_dir
 # Create router
 router = APIRouter(prefix="/api/v1", tags=["extraction"])
 
-# In-memory storage for extraction results (replace with Redis in production)
-extraction_cache: dict = {}
+# In-memory LRU of extraction results (L1); Redis, if enabled, and extraction_result.json back it
+extraction_cache: OrderedDict = OrderedDict()
 
+# Background job state lives next to the session's results, so every uvicorn worker sees it
+JOB_STATUS_FILE = "extraction_status.json"
 
-@router.post("/{user_id}/{session_id}/upload_idf_pdf")
-async def upload_idf_pdf(
-    user_id: str = PathParam(..., description="User identifier"),
-    session_id: str = PathParam(..., description="Session identifier"),
-    file: UploadFile = File(..., description="PDF file to extract")
-) -> UploadResponse:
+# Failed jobs stay visible to /status for this long, then the session reads as pending again
+FAILED_JOB_TTL_S = 3600
+
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Leading bytes inspected to confirm an upload's real file type
+MAGIC_SNIFF_BYTES = 1024
+
+
+# Maximum results kept in extraction_cache (least recently used evicted first)
+EXTRACTION_CACHE_MAX_ENTRIES = 128
+
+# Redis key prefix for the shared result tier (enabled by settings.redis_result_cache)
+REDIS_RESULT_KEY_PREFIX = "extraction_result:"
+_redis: Optional[Redis] = None
+
+# Viewer template contents, re-read only when the file's mtime changes
+_viewer_template: Optional[str] = None
+_viewer_template_mtime: float = 0.0
+
+
+async def _save_upload(file: UploadFile, upload_path: Path) -> Tuple[int, str]:
     """
-    Upload and extract content from PDF file (IDF - Invention Disclosure Form)
+    Stream an uploaded file to disk without buffering it whole in memory
 
-    This endpoint:
-    1. Accepts a PDF file upload
-    2. Extracts text using LlamaParse (agentic mode)
-    3. Extracts images using PyMuPDF
-    4. Describes diagrams using Gemini Vision
-    5. Returns complete extraction result
+    Args:
+        file: Incoming upload
+        upload_path: Destination path
+
+    Returns:
+        Tuple of (bytes written, SHA-256 hex digest of the content)
     """
-    logger.info(f"PDF upload received: {file.filename} for user {user_id}, session {session_id}")
+    file_size = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(upload_path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            digest.update(chunk)
+            await out.write(chunk)
+    return file_size, digest.hexdigest()
+
+
+async def _has_expected_magic(file: UploadFile, file_type: FileType) -> bool:
+    """Check an upload's leading bytes against its declared type, leaving the stream at the start"""
+    head = await file.read(MAGIC_SNIFF_BYTES)
+    await file.seek(0)
+
+    if file_type == FileType.PDF:
+        # PDF readers accept the header anywhere in the first 1 KB
+        return b"%PDF-" in head
+    # DOCX is a ZIP container
+    return head.startswith(b"PK\x03\x04")
+
+
+def _write_job_status(output_dir: Path, job_id: str, job: ExtractionStatus):
+    """Atomically replace the session's job status file with this job's state"""
+    payload = {"job_id": job_id, "updated_at": time.time(), "job": job.model_dump(mode="json")}
+    status_path = output_dir / JOB_STATUS_FILE
+    tmp_path = status_path.with_name(f"{JOB_STATUS_FILE}.{os.getpid()}.{job_id}.tmp")
+    tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+    tmp_path.replace(status_path)
+
+
+def _read_job_status(output_dir: Path) -> Optional[Tuple[str, float, ExtractionStatus]]:
+    """
+    Read the session's job status file
 
-    # Validate file type
-    if not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+    Returns:
+        Tuple of (job id, last update epoch seconds, status), or None if no job is recorded
+    """
+    try:
+        payload = json.loads((output_dir / JOB_STATUS_FILE).read_text(encoding="utf-8"))
+        return payload["job_id"], payload["updated_at"], ExtractionStatus.model_validate(payload["job"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable job status in {output_dir.name}: {e}")
+        return None
 
+
+def _is_current_job(output_dir: Path, job_id: str) -> bool:
+    """True while job_id is the session's latest job (a re-upload supersedes it)"""
+    job_status = _read_job_status(output_dir)
+    return job_status is not None and job_status[0] == job_id
+
+
+def _update_job_status(output_dir: Path, job_id: str, job: ExtractionStatus) -> bool:
+    """Persist a job's progress unless a newer upload has superseded it; returns whether it was current"""
+    if not _is_current_job(output_dir, job_id):
+        return False
     try:
-        # Create output directory for this session
-        output_dir = get_session_output_dir(user_id, session_id)
+        _write_job_status(output_dir, job_id, job)
+    except OSError as e:
+        logger.warning(f"Failed to record job status for {output_dir.name}: {e}")
+    return True
 
-        # Save uploaded file
-        upload_path = output_dir / file.filename
-        file_content = await file.read()
-        file_size = len(file_content)
 
-        with open(upload_path, "wb") as f:
-            f.write(file_content)
+def _clear_job_status(output_dir: Path, job_id: Optional[str] = None):
+    """Remove the session's job status (only if it still belongs to job_id, when given)"""
+    if job_id is not None and not _is_current_job(output_dir, job_id):
+        return
+    (output_dir / JOB_STATUS_FILE).unlink(missing_ok=True)
 
-        logger.info(f"File saved to {upload_path} ({file_size} bytes)")
 
-        # Start extraction process
-        start_time = time.time()
+def _cache_result(cache_key: str, result: ExtractionResult):
+    """Store a result in the in-memory cache, evicting the oldest entries beyond the cap"""
+    extraction_cache[cache_key] = result
+    extraction_cache.move_to_end(cache_key)
+    while len(extraction_cache) > EXTRACTION_CACHE_MAX_ENTRIES:
+        extraction_cache.popitem(last=False)
 
-        # Stage 1: Extract PDF (LlamaParse + PyMuPDF in parallel)
-        extraction_data = await extract_pdf_complete(
-            str(upload_path),
-            user_id,
-            session_id
-        )
 
-        # Get total pages from PyMuPDF
-        import fitz
-        doc = fitz.open(str(upload_path))
-        total_pages = len(doc)
-        doc.close()
+def _load_viewer_template(viewer_path: Path) -> Optional[str]:
+    """Return the viewer HTML template, reading the file only when it has changed"""
+    global _viewer_template, _viewer_template_mtime
 
-        # Stage 2: Describe diagrams with Gemini Vision
-        images = extraction_data.get("images", [])
+    try:
+        mtime = viewer_path.stat().st_mtime
+    except FileNotFoundError:
+        return None
 
-        if images:
-            logger.info(f"Describing {len(images)} diagrams with Gemini Vision")
-            gemini_start = time.time()
-            diagram_descriptions = await describe_diagrams_batch(images)
-            gemini_time = time.time() - gemini_start
-            extraction_data["gemini_time"] = gemini_time
-        else:
-            logger.info("No images found, skipping diagram description")
-            diagram_descriptions = []
+    if _viewer_template is None or mtime != _viewer_template_mtime:
+        _viewer_template = viewer_path.read_text(encoding="utf-8")
+        _viewer_template_mtime = mtime
 
-        # Stage 3: Merge all data into final result
-        result = merge_complete_extraction(
-            user_id=user_id,
-            session_id=session_id,
-            file_name=file.filename,
-            file_type=FileType.PDF,
-            file_size=file_size,
-            extraction_data=extraction_data,
-            diagram_descriptions=diagram_descriptions,
-            total_pages=total_pages
-        )
+    return _viewer_template
 
-        # Save result to JSON for caching
-        result_path = output_dir / "extraction_result.json"
-        ExtractionMerger.save_result_to_json(result, result_path)
 
-        # Cache result in memory
-        cache_key = f"{user_id}_{session_id}"
-        extraction_cache[cache_key] = result
+def _get_redis() -> Optional[Redis]:
+    """Return the shared Redis client, or None when the Redis result tier is disabled"""
+    global _redis
+    if not settings.redis_result_cache:
+        return None
+    if _redis is None:
+        _redis = Redis.from_url(settings.redis_url)
+    return _redis
 
-        total_time = time.time() - start_time
 
-        logger.success(f"PDF extraction completed in {total_time:.2f}s")
+async def _publish_result(cache_key: str, result: ExtractionResult, blob: Optional[bytes] = None):
+    """
+    Store a result in the in-memory LRU and, if enabled, the Redis tier shared by all workers
 
-        return UploadResponse(
-            success=True,
-            message=f"PDF extraction completed successfully in {total_time:.2f} seconds",
-            session_id=session_id,
-            user_id=user_id,
-            file_name=file.filename,
-            file_type=FileType.PDF,
-            estimated_time_seconds=int(total_time)
-        )
+    Args:
+        cache_key: "{user_id}_{session_id}"
+        result: Extraction result
+        blob: Already serialized result JSON, to skip a second serialization
+    """
+    _cache_result(cache_key, result)
+
+    redis = _get_redis()
+    if redis is None:
+        return
 
+    try:
+        if blob is None:
+            blob = await asyncio.to_thread(ExtractionMerger.dump_result_json, result)
+        await redis.set(REDIS_RESULT_KEY_PREFIX + cache_key, blob, ex=settings.redis_result_ttl_s)
     except Exception as e:
-        logger.error(f"PDF extraction failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+        logger.warning(f"Failed to publish {cache_key} to Redis: {e}")
 
 
-@router.post("/{user_id}/{session_id}/upload_idf_transcription")
-async def upload_idf_transcription(
-    user_id: str = PathParam(..., description="User identifier"),
-    session_id: str = PathParam(..., description="Session identifier"),
-    file: UploadFile = File(..., description="DOCX file to extract")
-) -> UploadResponse:
+async def _forget_result(cache_key: str):
+    """Drop a session's result from the in-memory LRU and the Redis tier"""
+    extraction_cache.pop(cache_key, None)
+
+    redis = _get_redis()
+    if redis is None:
+        return
+
+    try:
+        await redis.delete(REDIS_RESULT_KEY_PREFIX + cache_key)
+    except Exception as e:
+        logger.warning(f"Failed to drop {cache_key} from Redis: {e}")
+
+
+async def _get_result(user_id: str, session_id: str) -> Optional[ExtractionResult]:
     """
-    Upload and extract content from DOCX file (IDF Transcription)
+    Look up a session's result in the in-memory LRU, then Redis (if enabled), then extraction_result.json
 
-    This endpoint:
-    1. Accepts a DOCX file upload
-    2. Extracts text, images, and tables using python-docx
-    3. Describes diagrams using Gemini Vision
-    4. Returns complete extraction result
+    Evicted entries are reloaded from disk and re-cached, so eviction never loses results.
+
+    Args:
+        user_id: User identifier
+        session_id: Session identifier
+
+    Returns:
+        The extraction result, or None if the session has none yet
     """
-    logger.info(f"DOCX upload received: {file.filename} for user {user_id}, session {session_id}")
+    cache_key = f"{user_id}_{session_id}"
 
-    # Validate file type
-    if not file.filename.lower().endswith(('.docx', '.doc')):
-        raise HTTPException(status_code=400, detail="Only DOCX files are accepted")
+    # Check in-memory cache first
+    result = extraction_cache.get(cache_key)
+    if result is not None:
+        extraction_cache.move_to_end(cache_key)
+        return result
 
-    try:
-        # Create output directory for this session
-        output_dir = get_session_output_dir(user_id, session_id)
+    # Shared tier: results published by any worker
+    redis = _get_redis()
+    if redis is not None:
+        try:
+            blob = await redis.get(REDIS_RESULT_KEY_PREFIX + cache_key)
+            if blob is not None:
+                result = await asyncio.to_thread(ExtractionResult.model_validate_json, blob)
+                _cache_result(cache_key, result)
+                return result
+        except Exception as e:
+            logger.warning(f"Redis lookup failed for {cache_key}: {e}")
 
-        # Save uploaded file
-        upload_path = output_dir / file.filename
-        file_content = await file.read()
-        file_size = len(file_content)
+    # Try to load from JSON file
+    result_path = get_session_output_dir(user_id, session_id) / "extraction_result.json"
+    if not result_path.exists():
+        return None
 
-        with open(upload_path, "wb") as f:
-            f.write(file_content)
+    logger.info(f"Loading result from {result_path}")
+    result = await asyncio.to_thread(ExtractionMerger.load_result_from_json, result_path)
+    await _publish_result(cache_key, result)
+    return result
 
-        logger.info(f"File saved to {upload_path} ({file_size} bytes)")
 
-        # Start extraction process
-        start_time = time.time()
+def _link_cached_images(images: List[ExtractedImage], output_dir: Path) -> Optional[List[ExtractedImage]]:
+    """
+    Hardlink (or copy) a cached result's image files into this session's directory
 
-        # Stage 1: Extract DOCX
-        extraction_data = await extract_docx_complete(
-            str(upload_path),
-            user_id,
-            session_id
-        )
+    Args:
+        images: Images of the cached result, pointing into the original session's directory
+        output_dir: This session's output directory
+
+    Returns:
+        Images re-pointed at the session's own copies, or None if any source file is gone
+    """
+    linked = []
+    for image in images:
+        if not image.image_path:
+            linked.append(image)
+            continue
+
+        source = Path(image.image_path)
+        if not source.is_file():
+            return None  # Original session was cleaned up
+
+        target = output_dir / source.name
+        if target != source and not target.exists():
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)  # Different filesystem
+        linked.append(image.model_copy(update={"image_path": str(target)}))
+
+    return linked
+
+
+async def _load_result_by_hash(
+    file_hash: str,
+    user_id: str,
+    session_id: str,
+    file_name: str,
+    output_dir: Path
+) -> Optional[ExtractionResult]:
+    """
+    Reuse a previous extraction of identical file content
+
+    Args:
+        file_hash: SHA-256 of the uploaded file
+        user_id: User identifier of this upload
+        session_id: Session identifier of this upload
+        file_name: Name of this upload
+        output_dir: This session's output directory (cached images are linked into it)
+
+    Returns:
+        The cached result re-labelled for this upload, or None on a miss
+    """
+    cached_path = settings.extraction_result_cache_dir / f"{file_hash}.json"
+    if not cached_path.exists():
+        return None
+
+    try:
+        cached = await asyncio.to_thread(ExtractionMerger.load_result_from_json, cached_path)
+        # Never hand out paths into another user's session directory
+        images = await asyncio.to_thread(_link_cached_images, cached.extracted_images, output_dir)
+    except Exception as e:
+        logger.warning(f"Ignoring unusable extraction cache {cached_path.name}: {e}")
+        return None
+
+    if images is None:
+        logger.info(f"Extraction cache {cached_path.name} refers to removed images, re-extracting")
+        return None
+
+    return cached.model_copy(update={
+        "user_id": user_id,
+        "session_id": session_id,
+        "file_name": file_name,
+        "extracted_images": images
+    })
+
+
+async def _run_extraction(
+    upload_path: Path,
+    user_id: str,
+    session_id: str,
+    file_name: str,
+    file_type: FileType,
+    file_size: int,
+    file_hash: str,
+    job_id: str,
+    job: ExtractionStatus
+):
+    """
+    Run the extraction stages for a saved upload and publish the result
+
+    Runs as a background task after the upload response has been sent. Progress
+    and failures are recorded in the session's job status file for the /status
+    endpoint; once a re-upload supersedes the job it stops publishing anything.
+
+    Args:
+        upload_path: Path of the saved upload
+        user_id: User identifier
+        session_id: Session identifier
+        file_name: Original file name
+        file_type: FileType.PDF or FileType.DOCX
+        file_size: Upload size in bytes
+        file_hash: SHA-256 of the upload, used to cache the result for identical files
+        job_id: Identifier of this job in the session's job status file
+        job: Status recorded for this job
+    """
+    cache_key = f"{user_id}_{session_id}"
+    output_dir = upload_path.parent
+    label = file_type.value.upper()
+    start_time = time.perf_counter()
+
+    try:
+        # Stage 1: Extract document
+        if file_type == FileType.PDF:
+            # LlamaParse + PyMuPDF in parallel; the page count comes from the extractor's probe
+            extraction_data = await extract_pdf_complete(str(upload_path), user_id, session_id)
+            total_pages = extraction_data["total_pages"]
+        else:
+            extraction_data = await extract_docx_complete(str(upload_path), user_id, session_id)
+            total_pages = 0  # DOCX doesn't have traditional pages
 
         # Stage 2: Describe diagrams with Gemini Vision
         images = extraction_data.get("images", [])
+        job.current_stage = "describing_diagrams"
+        job.progress_percentage = 60.0
+        await asyncio.to_thread(_update_job_status, output_dir, job_id, job)
 
         if images:
             logger.info(f"Describing {len(images)} diagrams with Gemini Vision")
-            gemini_start = time.time()
+            gemini_start = time.perf_counter()
             diagram_descriptions = await describe_diagrams_batch(images)
-            gemini_time = time.time() - gemini_start
+            gemini_time = time.perf_counter() - gemini_start
             extraction_data["gemini_time"] = gemini_time
         else:
             logger.info("No images found, skipping diagram description")
             diagram_descriptions = []
 
         # Stage 3: Merge all data into final result
+        job.current_stage = "merging"
+        job.progress_percentage = 90.0
+        await asyncio.to_thread(_update_job_status, output_dir, job_id, job)
         result = merge_complete_extraction(
             user_id=user_id,
             session_id=session_id,
-            file_name=file.filename,
-            file_type=FileType.DOCX,
+            file_name=file_name,
+            file_type=file_type,
             file_size=file_size,
             extraction_data=extraction_data,
             diagram_descriptions=diagram_descriptions,
-            total_pages=0  # DOCX doesn't have traditional pages
+            total_pages=total_pages
         )
 
-        # Save result to JSON for caching
+        # A re-upload of this session started a newer job: don't overwrite its result (its
+        # extraction may also be rewriting the image files this result points at)
+        if not await asyncio.to_thread(_is_current_job, output_dir, job_id):
+            logger.info(f"{label} extraction for {cache_key} superseded by a newer upload, discarding")
+            return
+
+        # Save result to JSON for caching (per session, and by content hash for identical uploads),
+        # serializing once and keeping the writes off the event loop
         result_path = output_dir / "extraction_result.json"
-        ExtractionMerger.save_result_to_json(result, result_path)
+        blob = await asyncio.to_thread(ExtractionMerger.dump_result_json, result)
+        await asyncio.gather(
+            asyncio.to_thread(ExtractionMerger.save_result_to_json, result, result_path, blob),
+            asyncio.to_thread(
+                ExtractionMerger.save_result_to_json,
+                result, settings.extraction_result_cache_dir / f"{file_hash}.json", blob
+            )
+        )
 
-        # Cache result in memory
-        cache_key = f"{user_id}_{session_id}"
-        extraction_cache[cache_key] = result
+        # Cache result in memory and the shared tier; the job is done once the result is visible
+        await _publish_result(cache_key, result, blob)
+        await asyncio.to_thread(_clear_job_status, output_dir, job_id)
+
+        total_time = time.perf_counter() - start_time
+        logger.success(f"{label} extraction completed in {total_time:.2f}s")
 
-        total_time = time.time() - start_time
+    except Exception as e:
+        logger.error(f"{label} extraction failed: {e}")
+        job.status = "failed"
+        job.error_message = f"Extraction failed: {str(e)}"
+        await asyncio.to_thread(_update_job_status, output_dir, job_id, job)
+
+
+async def _start_extraction(
+    file: UploadFile,
+    file_type: FileType,
+    user_id: str,
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    response: Response
+) -> UploadResponse:
+    """
+    Save an upload and either reuse a cached result or schedule extraction in the background
+
+    Args:
+        file: Uploaded file
+        file_type: FileType.PDF or FileType.DOCX
+        user_id: User identifier
+        session_id: Session identifier
+        background_tasks: Request background tasks, run after the response is sent
+        response: Outgoing response, switched to 202 when extraction is scheduled
+
+    Returns:
+        UploadResponse - completed for a cache hit, otherwise started
+    """
+    label = file_type.value.upper()
 
-        logger.success(f"DOCX extraction completed in {total_time:.2f}s")
+    # Reject mislabelled or corrupt uploads before writing them or spending parse credits
+    if not await _has_expected_magic(file, file_type):
+        raise HTTPException(status_code=400, detail=f"Not a valid {label} file")
+
+    try:
+        # Create output directory for this session
+        output_dir = get_session_output_dir(user_id, session_id)
+
+        # Save uploaded file
+        upload_path = output_dir / file.filename
+        file_size, file_hash = await _save_upload(file, upload_path)
+
+        logger.info(f"File saved to {upload_path} ({file_size} bytes)")
 
-        return UploadResponse(
-            success=True,
-            message=f"DOCX extraction completed successfully in {total_time:.2f} seconds",
+        start_time = time.perf_counter()
+        cache_key = f"{user_id}_{session_id}"
+        result_path = output_dir / "extraction_result.json"
+
+        # Identical content was extracted before: reuse it and skip every stage
+        cached_result = await _load_result_by_hash(file_hash, user_id, session_id, file.filename, output_dir)
+        if cached_result is not None:
+            # Supersede any extraction still running for this session before publishing
+            await asyncio.to_thread(_clear_job_status, output_dir)
+            await asyncio.to_thread(ExtractionMerger.save_result_to_json, cached_result, result_path)
+            await _publish_result(cache_key, cached_result)
+
+            total_time = time.perf_counter() - start_time
+            logger.success(f"{label} extraction reused from cache ({file_hash[:12]}) in {total_time:.2f}s")
+
+            return UploadResponse(
+                success=True,
+                message=f"{label} extraction completed successfully in {total_time:.2f} seconds (cached)",
+                session_id=session_id,
+                user_id=user_id,
+                file_name=file.filename,
+                file_type=file_type,
+                estimated_time_seconds=int(total_time)
+            )
+
+        # Drop any previous result for this session so readers don't see stale data
+        await _forget_result(cache_key)
+        result_path.unlink(missing_ok=True)
+
+        # Record the job for every worker; this also supersedes an older job for the session
+        job_id = uuid.uuid4().hex
+        job = ExtractionStatus(
             session_id=session_id,
             user_id=user_id,
-            file_name=file.filename,
-            file_type=FileType.DOCX,
-            estimated_time_seconds=int(total_time)
+            status="processing",
+            progress_percentage=10.0,
+            current_stage="extracting"
         )
+        await asyncio.to_thread(_write_job_status, output_dir, job_id, job)
 
     except Exception as e:
-        logger.error(f"DOCX extraction failed: {e}")
+        logger.error(f"{label} upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
+    # Start extraction process after the response is sent; poll /status for progress
+    background_tasks.add_task(
+        _run_extraction,
+        upload_path, user_id, session_id, file.filename, file_type, file_size, file_hash, job_id, job
+    )
+    response.status_code = status.HTTP_202_ACCEPTED
+
+    logger.info(f"{label} extraction started for {cache_key}")
+
+    return UploadResponse(
+        success=True,
+        message="Extraction started",
+        session_id=session_id,
+        user_id=user_id,
+        file_name=file.filename,
+        file_type=file_type
+    )
+
+
+@router.post("/{user_id}/{session_id}/upload_idf_pdf")
+async def upload_idf_pdf(
+    background_tasks: BackgroundTasks,
+    response: Response,
+    user_id: str = PathParam(..., description="User identifier"),
+    session_id: str = PathParam(..., description="Session identifier"),
+    file: UploadFile = File(..., description="PDF file to extract")
+) -> UploadResponse:
+    """
+    Upload a PDF file (IDF - Invention Disclosure Form) and start extraction
+
+    This endpoint:
+    1. Accepts a PDF file upload
+    2. Returns 202 Accepted and, in the background:
+       - Extracts text using LlamaParse (agentic mode)
+       - Extracts images using PyMuPDF
+       - Describes diagrams using Gemini Vision
+    3. Poll /status (or /extraction_result) for the complete result
+
+    Identical files extracted before complete immediately with 200.
+    """
+    logger.info(f"PDF upload received: {file.filename} for user {user_id}, session {session_id}")
+
+    # Validate file type
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+
+    return await _start_extraction(file, FileType.PDF, user_id, session_id, background_tasks, response)
+
+
+@router.post("/{user_id}/{session_id}/upload_idf_transcription")
+async def upload_idf_transcription(
+    background_tasks: BackgroundTasks,
+    response: Response,
+    user_id: str = PathParam(..., description="User identifier"),
+    session_id: str = PathParam(..., description="Session identifier"),
+    file: UploadFile = File(..., description="DOCX file to extract")
+) -> UploadResponse:
+    """
+    Upload a DOCX file (IDF Transcription) and start extraction
+
+    This endpoint:
+    1. Accepts a DOCX file upload
+    2. Returns 202 Accepted and, in the background:
+       - Extracts text, images, and tables using python-docx
+       - Describes diagrams using Gemini Vision
+    3. Poll /status (or /extraction_result) for the complete result
+
+    Identical files extracted before complete immediately with 200.
+    """
+    logger.info(f"DOCX upload received: {file.filename} for user {user_id}, session {session_id}")
+
+    # Validate file type
+    if not file.filename.lower().endswith(('.docx', '.doc')):
+        raise HTTPException(status_code=400, detail="Only DOCX files are accepted")
+
+    return await _start_extraction(file, FileType.DOCX, user_id, session_id, background_tasks, response)
+
 
 @router.get("/{user_id}/{session_id}/extraction_result")
 async def get_extraction_result(
@@ -241,22 +615,8 @@ async def get_extraction_result(
 
     Returns the cached extraction result if available
     """
-    cache_key = f"{user_id}_{session_id}"
-
-    # Check in-memory cache first
-    if cache_key in extraction_cache:
-        logger.info(f"Returning cached result for {cache_key}")
-        return extraction_cache[cache_key]
-
-    # Try to load from JSON file
-    output_dir = get_session_output_dir(user_id, session_id)
-    result_path = output_dir / "extraction_result.json"
-
-    if result_path.exists():
-        logger.info(f"Loading result from {result_path}")
-        result = ExtractionMerger.load_result_from_json(result_path)
-        # Cache for future requests
-        extraction_cache[cache_key] = result
+    result = await _get_result(user_id, session_id)
+    if result is not None:
         return result
 
     # No result found
@@ -278,34 +638,22 @@ async def view_extraction(
     """
     try:
         # Get extraction result
-        cache_key = f"{user_id}_{session_id}"
-
-        if cache_key in extraction_cache:
-            result = extraction_cache[cache_key]
-        else:
-            output_dir = get_session_output_dir(user_id, session_id)
-            result_path = output_dir / "extraction_result.json"
-
-            if not result_path.exists():
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No extraction result found for user {user_id}, session {session_id}"
-                )
+        result = await _get_result(user_id, session_id)
 
-            result = ExtractionMerger.load_result_from_json(result_path)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No extraction result found for user {user_id}, session {session_id}"
+            )
 
         # Load HTML viewer template
-        viewer_path = settings.static_dir / "viewer.html"
+        html_template = _load_viewer_template(settings.static_dir / "viewer.html")
 
-        if not viewer_path.exists():
+        if html_template is None:
             raise HTTPException(status_code=500, detail="Viewer template not found")
 
-        with open(viewer_path, "r", encoding="utf-8") as f:
-            html_template = f.read()
-
-        # Inject result data as JSON into HTML
-        import json
-        result_json = result.model_dump_json(indent=2)
+        # Inject result data as JSON into HTML (compact - the page parses it, nobody reads it)
+        result_json = result.model_dump_json()
 
         # Replace placeholder in HTML with actual data
         html_content = html_template.replace(
@@ -332,11 +680,19 @@ async def get_extraction_status(
 
     Useful for polling during async extraction
     """
-    cache_key = f"{user_id}_{session_id}"
+    # Background extraction running or failed for this session (recorded by whichever worker took the upload)
+    output_dir = get_session_output_dir(user_id, session_id)
+    job_status = await asyncio.to_thread(_read_job_status, output_dir)
+    if job_status is not None:
+        job_id, updated_at, job = job_status
+        if job.status == "failed" and time.time() - updated_at > FAILED_JOB_TTL_S:
+            await asyncio.to_thread(_clear_job_status, output_dir, job_id)
+        else:
+            return job
 
-    # Check if result exists
-    if cache_key in extraction_cache:
-        result = extraction_cache[cache_key]
+    # Check if result exists (in memory or already persisted)
+    result = await _get_result(user_id, session_id)
+    if result is not None:
         return ExtractionStatus(
             session_id=session_id,
             user_id=user_id,
@@ -346,18 +702,6 @@ async def get_extraction_status(
             result=result
         )
 
-    # Check if extraction is in progress (would be tracked via Celery in production)
-    output_dir = get_session_output_dir(user_id, session_id)
-
-    if output_dir.exists() and any(output_dir.iterdir()):
-        return ExtractionStatus(
-            session_id=session_id,
-            user_id=user_id,
-            status="processing",
-            progress_percentage=50.0,
-            current_stage="extracting"
-        )
-
     # No extraction found
     return ExtractionStatus(
         session_id=session_id,
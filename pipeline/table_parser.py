@@ -2,10 +2,149 @@
 HTML Table Parser
 Parses HTML tables and extracts structured data (headers, rows, counts)
 """
-from typing import List, Tuple
-from bs4 import BeautifulSoup
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice, takewhile
+from typing import List, Optional, Tuple
+from lxml import etree
 from loguru import logger
 
+# Parsed results memoized per table HTML string (pure functions of their input)
+TABLE_CACHE_SIZE = 256
+
+# Common page markers in extracted markdown
+PAGE_MARKER_PATTERN = re.compile(r'(?:Page\s+(\d+)|---\s*Page\s+(\d+)\s*---|<!-- Page (\d+) -->)', re.IGNORECASE)
+
+# Case-insensitive "<table" probe (no lowercased copy of the input)
+TABLE_TAG_PATTERN = re.compile(r'<table', re.IGNORECASE)
+
+
+def _has_table_tag(html_content: str) -> bool:
+    """Cheap pre-filter: whether the input could contain a table at all"""
+    return bool(html_content) and TABLE_TAG_PATTERN.search(html_content) is not None
+
+
+def _find_table(html_content: str) -> Optional[etree._Element]:
+    """First <table> element in an HTML fragment (None without a table tag - no tree is built then)"""
+    if not _has_table_tag(html_content):
+        return None
+    root = etree.HTML(html_content)
+    return root.find('.//table') if root is not None else None
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def _table_signature(html_content: str) -> str:
+    """Text of the first three cells of a table's first row, used to locate the table in markdown"""
+    table = _find_table(html_content)
+    if table is None:
+        return ""
+
+    first_row = table.find('.//tr')
+    if first_row is None:
+        return ""
+
+    cells = islice(first_row.iter('th', 'td'), 3)
+    return " ".join([_text(cell) for cell in cells])
+
+
+def _is_within(element: etree._Element, ancestor: etree._Element) -> bool:
+    """Whether element is a descendant of ancestor"""
+    return any(parent is ancestor for parent in element.iterancestors())
+
+
+def _text(element: etree._Element) -> str:
+    """Element text with every piece stripped and concatenated (same as BeautifulSoup get_text(strip=True))"""
+    # Most cells are plain text leaves; skip the itertext walk for them
+    if not len(element):
+        return (element.text or "").strip()
+    return "".join(piece.strip() for piece in element.itertext())
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def _extract_table_caption_cached(html_content: str) -> str:
+    """extract_table_caption memoized per HTML string"""
+    try:
+        table = _find_table(html_content)
+
+        if table is None:
+            return ""
+
+        caption = table.find('.//caption')
+        return _text(caption) if caption is not None else ""
+
+    except Exception as e:
+        logger.error(f"Failed to extract table caption: {e}")
+        return ""
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def _parse_html_table_cached(html_content: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, ...], ...], int, int]:
+    """parse_html_table with immutable results, memoized per HTML string"""
+    try:
+        table = _find_table(html_content)
+
+        if table is None:
+            logger.warning("No table tag found in HTML")
+            return (), (), 0, 0
+
+        # One ordered walk over the table: first <thead>, first <tbody> and every <tr>
+        thead = tbody = None
+        table_rows = []
+        for element in table.iter('thead', 'tbody', 'tr'):
+            if element.tag == 'tr':
+                table_rows.append(element)
+            elif element.tag == 'thead':
+                if thead is None:
+                    thead = element
+            elif tbody is None:
+                tbody = element
+
+        headers = []
+        rows = []
+
+        # Extract headers from <thead> or first <tr> with <th> tags
+        if thead is not None:
+            header_row = next((tr for tr in table_rows if _is_within(tr, thead)), None)
+        else:
+            # Try to find headers in first row
+            header_row = table_rows[0] if table_rows else None
+        if header_row is not None:
+            headers = [_text(th) for th in header_row.iter('th')]
+
+        # Extract data rows from <tbody> or all <tr> tags
+        body_rows = [tr for tr in table_rows if _is_within(tr, tbody)] if tbody is not None else table_rows
+
+        for tr in body_rows:
+            # Split the row's cells by tag in a single walk
+            header_cells = []
+            data_cells = []
+            for cell in tr.iter('th', 'td'):
+                (header_cells if cell.tag == 'th' else data_cells).append(cell)
+
+            # Skip header rows
+            if not headers and header_cells:
+                headers = [_text(th) for th in header_cells]
+                continue
+
+            # Extract data cells
+            if data_cells:
+                rows.append([_text(td) for td in data_cells])
+
+        # Calculate dimensions
+        num_rows = len(rows)
+        num_cols = len(headers) if headers else (len(rows[0]) if rows else 0)
+
+        # If no explicit headers but we have rows, use first row as headers
+        if not headers and rows:
+            headers = [f"Column {i+1}" for i in range(num_cols)]
+
+        return tuple(headers), tuple(map(tuple, rows)), num_rows, num_cols
+
+    except Exception as e:
+        logger.error(f"Failed to parse HTML table: {e}")
+        return (), (), 0, 0
+
 
 class TableParser:
     """Parses HTML tables to extract structured data"""
@@ -21,61 +160,15 @@ class TableParser:
         Returns:
             Tuple of (headers, rows, num_rows, num_cols)
         """
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            table = soup.find('table')
-
-            if not table:
-                logger.warning("No table tag found in HTML")
-                return [], [], 0, 0
-
-            headers = []
-            rows = []
-
-            # Extract headers from <thead> or first <tr> with <th> tags
-            thead = table.find('thead')
-            if thead:
-                header_row = thead.find('tr')
-                if header_row:
-                    headers = [th.get_text(strip=True) for th in header_row.find_all('th')]
-            else:
-                # Try to find headers in first row
-                first_row = table.find('tr')
-                if first_row:
-                    ths = first_row.find_all('th')
-                    if ths:
-                        headers = [th.get_text(strip=True) for th in ths]
-
-            # Extract data rows from <tbody> or all <tr> tags
-            tbody = table.find('tbody')
-            tr_container = tbody if tbody else table
-
-            for tr in tr_container.find_all('tr'):
-                # Skip header rows
-                if tr.find('th') and not headers:
-                    headers = [th.get_text(strip=True) for th in tr.find_all('th')]
-                    continue
-
-                # Extract data cells
-                tds = tr.find_all('td')
-                if tds:
-                    row_data = [td.get_text(strip=True) for td in tds]
-                    rows.append(row_data)
-
-            # Calculate dimensions
-            num_rows = len(rows)
-            num_cols = len(headers) if headers else (len(rows[0]) if rows else 0)
-
-            # If no explicit headers but we have rows, use first row as headers
-            if not headers and rows:
-                headers = [f"Column {i+1}" for i in range(num_cols)]
-
-            return headers, rows, num_rows, num_cols
-
-        except Exception as e:
-            logger.error(f"Failed to parse HTML table: {e}")
+        # Non-table input never reaches the parser (or takes a cache slot)
+        if not _has_table_tag(html_content):
+            logger.warning("No table tag found in HTML")
             return [], [], 0, 0
 
+        headers, rows, num_rows, num_cols = _parse_html_table_cached(html_content)
+        # Fresh lists per call - the memoized result must not be mutated by callers
+        return list(headers), [list(row) for row in rows], num_rows, num_cols
+
     @staticmethod
     def extract_table_caption(html_content: str) -> str:
         """
@@ -87,19 +180,9 @@ class TableParser:
         Returns:
             Caption text or empty string
         """
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            table = soup.find('table')
-
-            if not table:
-                return ""
-
-            caption = table.find('caption')
-            return caption.get_text(strip=True) if caption else ""
-
-        except Exception as e:
-            logger.error(f"Failed to extract table caption: {e}")
+        if not _has_table_tag(html_content):
             return ""
+        return _extract_table_caption_cached(html_content)
 
     @staticmethod
     def detect_table_page_from_context(html_content: str, full_markdown: str) -> int:
@@ -114,47 +197,29 @@ class TableParser:
             Page number (0 if cannot determine)
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            table = soup.find('table')
-
-            if not table:
+            if not _has_table_tag(html_content):
                 return 0
 
-            # Extract some unique text from the table
-            first_row = table.find('tr')
-            if not first_row:
-                return 0
-
-            # Get first few cells as signature
-            cells = first_row.find_all(['th', 'td'])
-            signature = " ".join([cell.get_text(strip=True) for cell in cells[:3]])
+            signature = _table_signature(html_content)
 
             if not signature:
                 return 0
 
-            # Find this signature in the markdown and look for page markers
-            import re
-
-            # Split markdown by common page markers
-            page_pattern = r'(?:Page\s+(\d+)|---\s*Page\s+(\d+)\s*---|<!-- Page (\d+) -->)'
-            matches = list(re.finditer(page_pattern, full_markdown, re.IGNORECASE))
-
-            # Find position of signature in markdown
+            # Find position of signature in markdown (before scanning for page markers at all)
             signature_pos = full_markdown.find(signature)
 
             if signature_pos == -1:
                 return 0
 
-            # Find the last page marker before the signature
+            # Find the last page marker before the signature - scanned lazily, stopping past it
             current_page = 0
-            for match in matches:
-                marker_pos = match.start()
-                if marker_pos > signature_pos:
-                    break
-                # Extract page number from any of the groups
-                page_num = match.group(1) or match.group(2) or match.group(3)
-                if page_num:
-                    current_page = int(page_num)
+            markers_before = takewhile(
+                lambda match: match.start() <= signature_pos,
+                PAGE_MARKER_PATTERN.finditer(full_markdown)
+            )
+            for match in markers_before:
+                # Exactly one alternative matches, and lastindex names its page-number group
+                current_page = int(match.group(match.lastindex))
 
             return current_page
 
@@ -162,6 +227,47 @@ class TableParser:
             logger.debug(f"Could not detect table page from context: {e}")
             return 0
 
+    @staticmethod
+    def detect_table_pages_batch(html_contents: List[str], full_markdown: str) -> List[int]:
+        """
+        detect_table_page_from_context for many tables of one document
+
+        The page markers are scanned once and each table's page is a binary search
+        over their offsets, instead of a marker scan per table.
+
+        Args:
+            html_contents: HTML of each table
+            full_markdown: Full markdown text with page markers
+
+        Returns:
+            Page number per table, in input order (0 if cannot determine)
+        """
+        marker_starts = []
+        marker_pages = []
+        for match in PAGE_MARKER_PATTERN.finditer(full_markdown):
+            marker_starts.append(match.start())
+            marker_pages.append(int(match.group(match.lastindex)))
+
+        pages = []
+        for html_content in html_contents:
+            page_number = 0
+            try:
+                signature = _table_signature(html_content) if _has_table_tag(html_content) else ""
+                signature_pos = full_markdown.find(signature) if signature else -1
+
+                if signature_pos != -1:
+                    # Last marker starting at or before the signature
+                    marker_idx = bisect_right(marker_starts, signature_pos) - 1
+                    if marker_idx >= 0:
+                        page_number = marker_pages[marker_idx]
+
+            except Exception as e:
+                logger.debug(f"Could not detect table page from context: {e}")
+
+            pages.append(page_number)
+
+        return pages
+
 
 def parse_table_from_html(html_content: str) -> Tuple[List[str], List[List[str]], int, int]:
     """
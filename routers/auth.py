@@ -2,7 +2,9 @@
 Authentication Router
 Handles user registration, login, and logout
 """
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
@@ -78,7 +80,7 @@ async def register(
     logger.info(f"Registration attempt for email: {body.email}")
 
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == body.email).first()
+    existing_user = db.execute(select(User).where(User.email == body.email)).scalar_one_or_none()
 
     if existing_user:
         logger.warning(f"Registration failed: Email {body.email} already registered")
@@ -88,7 +90,7 @@ async def register(
         )
 
     # Hash password
-    password_hash, password_salt = hash_password(body.password)
+    password_hash, password_salt = await asyncio.to_thread(hash_password, body.password)
 
     # Create new user
     new_user = User(
@@ -101,7 +103,6 @@ async def register(
 
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
 
     logger.success(f"User registered successfully: {new_user.email} (ID: {new_user.id})")
 
@@ -132,7 +133,7 @@ async def login(
     logger.info(f"Login attempt for email: {body.email}")
 
     # Find user by email
-    user = db.query(User).filter(User.email == body.email).first()
+    user = db.execute(select(User).where(User.email == body.email)).scalar_one_or_none()
 
     if not user:
         logger.warning(f"Login failed: User not found for email {body.email}")
@@ -143,7 +144,7 @@ async def login(
         )
 
     # Verify password
-    if not verify_password(body.password, user.password_hash, user.password_salt):
+    if not await asyncio.to_thread(verify_password, body.password, user.password_hash, user.password_salt):
         logger.warning(f"Login failed: Incorrect password for email {body.email}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -205,11 +206,11 @@ async def logout(
 
     logger.info(f"Logout request for user: {current_user.email}")
 
-    # Invalidate all active sessions for this user
+    # Invalidate all active sessions for this user (single bulk UPDATE, no pre-SELECT)
     db.query(UserSession).filter(
         UserSession.user_id == current_user.id,
         UserSession.is_active == True
-    ).update({"is_active": False})
+    ).update({"is_active": False}, synchronize_session=False)
 
     db.commit()
 
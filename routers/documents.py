@@ -2,10 +2,12 @@
 Documents Router
 Handles document uploads for IDF, Transcription, and Claims
 """
+import os
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy import exists, select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from loguru import logger
@@ -14,11 +16,20 @@ from database import get_db, User, Project, Document
 from auth.dependencies import get_current_user
 from config import get_session_output_dir
 from services.cloudinary_service import upload_document
+from services.project_cache import invalidate_project
 
 # Upload constraints
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 ALLOWED_PDF_TYPES = {"application/pdf"}
 ALLOWED_DOCX_TYPES = {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+ALLOWED_EXTENSIONS = {
+    "idf": frozenset({".pdf"}),
+    "transcription": frozenset({".docx"}),
+    "claims": frozenset({".docx"}),
+}
+
+# Leading bytes inspected to confirm an upload's real file type
+MAGIC_SNIFF_BYTES = 1024
 
 router = APIRouter(
     prefix="/api/v1/projects",
@@ -45,39 +56,81 @@ async def verify_project_access(
     project_id: str,
     current_user: User,
     db: Session
-) -> Project:
+) -> None:
     """
     Verify user has access to project
 
+    Only an EXISTS check - the project row itself is not loaded.
+
     ROW-LEVEL SECURITY: Checks project ownership
     """
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id  # CRITICAL: Security check
-    ).first()
-
-    if not project:
+    has_access = db.execute(
+        select(exists().where(
+            Project.id == project_id,
+            Project.user_id == current_user.id  # CRITICAL: Security check
+        ))
+    ).scalar()
+
+    if not has_access:
         logger.warning(f"Project {project_id} not found or access denied for user {current_user.email}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    return project
-
 
-async def check_document_exists(
+async def verify_project_access_for_upload(
     project_id: str,
     document_type: str,
+    current_user: User,
     db: Session
-) -> bool:
-    """Check if document type already exists in project"""
-    existing = db.query(Document).filter(
-        Document.project_id == project_id,
+) -> Tuple[str, bool]:
+    """
+    Verify user has access to project and check whether the document type already exists
+
+    One query (project session_id + EXISTS subquery) instead of two sequential lookups.
+
+    ROW-LEVEL SECURITY: Checks project ownership
+
+    Returns:
+        (project session_id, whether a document of this type already exists in it)
+    """
+    has_document = exists().where(
+        Document.project_id == Project.id,
         Document.document_type == document_type
+    ).label("has_document")
+
+    row = db.execute(
+        select(Project.session_id, has_document).where(
+            Project.id == project_id,
+            Project.user_id == current_user.id  # CRITICAL: Security check
+        )
     ).first()
 
-    return existing is not None
+    if row is None:
+        logger.warning(f"Project {project_id} not found or access denied for user {current_user.email}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+
+    return row.session_id, bool(row.has_document)
+
+
+async def has_expected_magic(file: UploadFile, file_type: str) -> bool:
+    """
+    Check an upload's leading bytes against its declared type, leaving the stream at the start
+
+    Rejecting here avoids sending an obviously wrong file to Cloudinary.
+    """
+    head = await file.read(MAGIC_SNIFF_BYTES)
+    await file.seek(0)
+
+    if file_type == "pdf":
+        # PDF readers accept the header anywhere in the first 1 KB
+        return b"%PDF-" in head
+    # DOCX is a ZIP container
+    return head.startswith(b"PK\x03\x04")
 
 
 async def save_uploaded_file_cloudinary(
@@ -97,262 +150,177 @@ async def save_uploaded_file_cloudinary(
             ...
         }
     """
-    # Read file content and enforce size limit
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    # Enforce size limit without reading the upload into memory (it is spooled by Starlette)
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+    file.file.seek(0)
+
+    if file_size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB."
         )
 
-    # Upload to Cloudinary
+    # Stream to Cloudinary
     cloudinary_result = await upload_document(
-        file_bytes=file_content,
+        file_obj=file.file,
         filename=file.filename,
         user_id=user_id,
         session_id=session_id,
         document_type=document_type
     )
 
-    logger.info(f"☁️  Uploaded to Cloudinary: {cloudinary_result['url']} ({len(file_content)} bytes)")
+    logger.info(f"☁️  Uploaded to Cloudinary: {cloudinary_result['url']} ({file_size} bytes)")
 
     return cloudinary_result
 
 
 # Upload Endpoints
 
-@router.post("/{project_id}/upload/idf", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
-async def upload_idf(
-    project_id: str,
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def _make_upload_handler(
+    document_type: str,
+    label: str,
+    file_type: str,
+    allowed_mime_types: set,
+    doc: str
 ):
     """
-    Upload IDF document (PDF)
+    Build the upload endpoint for one document type
 
-    IDF = Information Disclosure Form (Patent document)
-    File naming: {user_id}_{session_id}_idf.pdf
-    """
-    logger.info(f"IDF upload request for project {project_id} by user {current_user.email}")
+    The IDF / Transcription / Claims endpoints only differ in the document type,
+    accepted extension and MIME types, so they share this handler body.
 
-    # Verify project access (ROW-LEVEL SECURITY)
-    project = await verify_project_access(project_id, current_user, db)
+    Args:
+        document_type: Document type stored on the record ("idf", "transcription", "claims")
+        label: Human-readable name used in logs and messages
+        file_type: Stored file type ("pdf" or "docx")
+        allowed_mime_types: Accepted MIME types
+        doc: Endpoint docstring (shown in the OpenAPI docs)
 
-    # Check if IDF already exists
-    if await check_document_exists(project_id, "idf", db):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="IDF document already uploaded for this project. Delete existing document first."
+    Returns:
+        Async endpoint function
+    """
+    format_name = file_type.upper()
+    allowed_exts = ALLOWED_EXTENSIONS[document_type]
+
+    async def handler(
+        project_id: str,
+        file: UploadFile = File(...),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        logger.info(f"{label} upload request for project {project_id} by user {current_user.email}")
+
+        # Verify project access (ROW-LEVEL SECURITY) and look up existing documents in one query
+        session_id, document_exists = await verify_project_access_for_upload(project_id, document_type, current_user, db)
+
+        # Check if document already exists
+        if document_exists:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{label} document already uploaded for this project. Delete existing document first."
+            )
+
+        # Validate file type (extension + MIME)
+        if os.path.splitext(file.filename)[1].lower() not in allowed_exts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only {format_name} files are accepted for {label} documents"
+            )
+        if file.content_type and file.content_type not in allowed_mime_types:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Only {format_name} files are accepted for {label} documents."
+            )
+        if not await has_expected_magic(file, file_type):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File content is not a valid {format_name} document"
+            )
+
+        # Upload to Cloudinary (NO local disk storage)
+        cloudinary_result = await save_uploaded_file_cloudinary(
+            file,
+            current_user.id,
+            session_id,
+            document_type,
+            file_type
         )
 
-    # Validate file type (extension + MIME)
-    if not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only PDF files are accepted for IDF documents"
+        # Create document record with Cloudinary URL
+        document = Document(
+            project_id=project_id,
+            document_type=document_type,
+            file_name=file.filename,
+            file_type=file_type,
+            file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL (not local path)
+            file_size_bytes=cloudinary_result.get("bytes", 0),
+            processing_status="pending"
         )
-    if file.content_type and file.content_type not in ALLOWED_PDF_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Only PDF files are accepted for IDF documents."
+
+        db.add(document)
+        db.commit()
+        invalidate_project(current_user.id, project_id)
+
+        logger.success(f"{label} document uploaded: {document.id} for project {project_id}")
+
+        # TODO: Trigger extraction pipeline (will be implemented in services/extraction_service.py)
+        # await process_extraction(document, db)
+
+        return DocumentUploadResponse(
+            success=True,
+            message=f"{label} document uploaded successfully to Cloudinary. Processing will begin shortly.",
+            document_id=document.id,
+            project_id=project_id,
+            document_type=document_type,
+            file_name=file.filename,
+            file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL
+            processing_status="pending"
         )
 
-    # Upload to Cloudinary (NO local disk storage)
-    cloudinary_result = await save_uploaded_file_cloudinary(
-        file,
-        current_user.id,
-        project.session_id,
-        "idf",
-        "pdf"
-    )
+    # Keep the original endpoint names (used as OpenAPI operation ids) and docs
+    handler.__name__ = handler.__qualname__ = f"upload_{document_type}"
+    handler.__doc__ = doc
+    return handler
 
-    # Create document record with Cloudinary URL
-    document = Document(
-        project_id=project_id,
-        document_type="idf",
-        file_name=file.filename,
-        file_type="pdf",
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL (not local path)
-        file_size_bytes=cloudinary_result.get("bytes", 0),
-        processing_status="pending"
-    )
 
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-
-    logger.success(f"IDF document uploaded: {document.id} for project {project_id}")
-
-    # TODO: Trigger extraction pipeline (will be implemented in services/extraction_service.py)
-    # await process_extraction(document, db)
-
-    return DocumentUploadResponse(
-        success=True,
-        message="IDF document uploaded successfully to Cloudinary. Processing will begin shortly.",
-        document_id=document.id,
-        project_id=project_id,
-        document_type="idf",
-        file_name=file.filename,
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL
-        processing_status="pending"
-    )
+upload_idf = router.post(
+    "/{project_id}/upload/idf", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED
+)(_make_upload_handler(
+    "idf", "IDF", "pdf", ALLOWED_PDF_TYPES,
+    """
+    Upload IDF document (PDF)
 
+    IDF = Information Disclosure Form (Patent document)
+    File naming: {user_id}_{session_id}_idf.pdf
+    """
+))
 
-@router.post("/{project_id}/upload/transcription", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
-async def upload_transcription(
-    project_id: str,
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+upload_transcription = router.post(
+    "/{project_id}/upload/transcription", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED
+)(_make_upload_handler(
+    "transcription", "Transcription", "docx", ALLOWED_DOCX_TYPES,
     """
     Upload Transcription document (DOCX)
 
     Transcription = Interview transcription document
     File naming: {user_id}_{session_id}_transcription.docx
     """
-    logger.info(f"Transcription upload request for project {project_id} by user {current_user.email}")
-
-    # Verify project access (ROW-LEVEL SECURITY)
-    project = await verify_project_access(project_id, current_user, db)
-
-    # Check if Transcription already exists
-    if await check_document_exists(project_id, "transcription", db):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Transcription document already uploaded for this project. Delete existing document first."
-        )
-
-    # Validate file type (extension + MIME)
-    if not file.filename.lower().endswith('.docx'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only DOCX files are accepted for Transcription documents"
-        )
-    if file.content_type and file.content_type not in ALLOWED_DOCX_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Only DOCX files are accepted for Transcription documents."
-        )
-
-    # Upload to Cloudinary (NO local disk storage)
-    cloudinary_result = await save_uploaded_file_cloudinary(
-        file,
-        current_user.id,
-        project.session_id,
-        "transcription",
-        "docx"
-    )
+))
 
-    # Create document record with Cloudinary URL
-    document = Document(
-        project_id=project_id,
-        document_type="transcription",
-        file_name=file.filename,
-        file_type="docx",
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL (not local path)
-        file_size_bytes=cloudinary_result.get("bytes", 0),
-        processing_status="pending"
-    )
-
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-
-    logger.success(f"Transcription document uploaded: {document.id} for project {project_id}")
-
-    # TODO: Trigger extraction pipeline
-    # await process_extraction(document, db)
-
-    return DocumentUploadResponse(
-        success=True,
-        message="Transcription document uploaded successfully to Cloudinary. Processing will begin shortly.",
-        document_id=document.id,
-        project_id=project_id,
-        document_type="transcription",
-        file_name=file.filename,
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL
-        processing_status="pending"
-    )
-
-
-@router.post("/{project_id}/upload/claims", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
-async def upload_claims(
-    project_id: str,
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+upload_claims = router.post(
+    "/{project_id}/upload/claims", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED
+)(_make_upload_handler(
+    "claims", "Claims", "docx", ALLOWED_DOCX_TYPES,
     """
     Upload Claims document (DOCX)
 
     Claims = Patent claims document
     File naming: {user_id}_{session_id}_claims.docx
     """
-    logger.info(f"Claims upload request for project {project_id} by user {current_user.email}")
-
-    # Verify project access (ROW-LEVEL SECURITY)
-    project = await verify_project_access(project_id, current_user, db)
-
-    # Check if Claims already exists
-    if await check_document_exists(project_id, "claims", db):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Claims document already uploaded for this project. Delete existing document first."
-        )
-
-    # Validate file type (extension + MIME)
-    if not file.filename.lower().endswith('.docx'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only DOCX files are accepted for Claims documents"
-        )
-    if file.content_type and file.content_type not in ALLOWED_DOCX_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Only DOCX files are accepted for Claims documents."
-        )
-
-    # Upload to Cloudinary (NO local disk storage)
-    cloudinary_result = await save_uploaded_file_cloudinary(
-        file,
-        current_user.id,
-        project.session_id,
-        "claims",
-        "docx"
-    )
-
-    # Create document record with Cloudinary URL
-    document = Document(
-        project_id=project_id,
-        document_type="claims",
-        file_name=file.filename,
-        file_type="docx",
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL (not local path)
-        file_size_bytes=cloudinary_result.get("bytes", 0),
-        processing_status="pending"
-    )
-
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-
-    logger.success(f"Claims document uploaded: {document.id} for project {project_id}")
-
-    # TODO: Trigger extraction pipeline
-    # await process_extraction(document, db)
-
-    return DocumentUploadResponse(
-        success=True,
-        message="Claims document uploaded successfully to Cloudinary. Processing will begin shortly.",
-        document_id=document.id,
-        project_id=project_id,
-        document_type="claims",
-        file_name=file.filename,
-        file_path=cloudinary_result["url"],  # ☁️ Cloudinary URL
-        processing_status="pending"
-    )
+))
 
 
 @router.get("/{project_id}/documents/{document_id}")
@@ -370,7 +338,7 @@ async def get_document(
     logger.info(f"Getting document {document_id} for project {project_id}")
 
     # Verify project access
-    project = await verify_project_access(project_id, current_user, db)
+    await verify_project_access(project_id, current_user, db)
 
     # Get document
     document = db.query(Document).filter(
@@ -413,7 +381,7 @@ async def delete_document(
     logger.info(f"Deleting document {document_id} for project {project_id}")
 
     # Verify project access
-    project = await verify_project_access(project_id, current_user, db)
+    await verify_project_access(project_id, current_user, db)
 
     # Get document
     document = db.query(Document).filter(
@@ -430,6 +398,7 @@ async def delete_document(
     # Delete document (cascade will delete extraction)
     db.delete(document)
     db.commit()
+    invalidate_project(current_user.id, project_id)
 
     logger.success(f"Document {document_id} deleted successfully")
 
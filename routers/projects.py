@@ -3,15 +3,17 @@ Projects Router
 Handles project management with row-level security
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, load_only
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 from loguru import logger
 import uuid
 
 from database import get_db, User, Project, Document
 from auth.dependencies import get_current_user
+from services.project_cache import get_cached, set_cached, invalidate_project, list_key, detail_key
 
 router = APIRouter(
     prefix="/api/v1/projects",
@@ -64,6 +66,67 @@ class ProjectListItem(BaseModel):
     document_count: int
 
 
+# Helper Functions
+
+def load_project_detail(
+    project_id: str,
+    current_user: User,
+    db: Session
+) -> Tuple[Project, List[DocumentSummary]]:
+    """
+    Load a project and its document summaries in one LEFT JOIN query
+
+    Only the DocumentSummary columns are selected for documents (no Document
+    objects are built). Response models in this router are built with
+    model_construct: the values come straight from typed DB columns, and FastAPI
+    checks them against response_model on the way out anyway.
+
+    ROW-LEVEL SECURITY: Checks project ownership
+
+    Returns:
+        (project, document summaries newest first)
+    """
+    rows = db.execute(
+        select(
+            Project,
+            Document.id,
+            Document.document_type,
+            Document.file_name,
+            Document.file_type,
+            Document.processing_status,
+            Document.created_at
+        ).join(
+            Document, Document.project_id == Project.id, isouter=True
+        ).where(
+            Project.id == project_id,
+            Project.user_id == current_user.id  # CRITICAL: Security check
+        ).order_by(Document.created_at.desc())
+    ).all()
+
+    if not rows:
+        logger.warning(f"Project {project_id} not found or access denied for user {current_user.email}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+
+    # A project without documents comes back as one row of NULL document columns
+    document_summaries = [
+        DocumentSummary.model_construct(
+            id=doc_id,
+            document_type=document_type,
+            file_name=file_name,
+            file_type=file_type,
+            processing_status=processing_status,
+            created_at=created_at
+        )
+        for _, doc_id, document_type, file_name, file_type, processing_status, created_at in rows
+        if doc_id is not None
+    ]
+
+    return rows[0][0], document_summaries
+
+
 # Endpoints
 
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
@@ -92,11 +155,13 @@ async def create_project(
 
     db.add(project)
     db.commit()
-    db.refresh(project)
+
+    # Project list changed
+    invalidate_project(current_user.id)
 
     logger.success(f"Project created: {project.name} (ID: {project.id}, Session: {session_id})")
 
-    return ProjectResponse(
+    return ProjectResponse.model_construct(
         id=project.id,
         name=project.name,
         description=project.description,
@@ -119,19 +184,23 @@ async def list_projects(
     """
     logger.info(f"Listing projects for user {current_user.email}")
 
-    # Query projects for current user only (ROW-LEVEL SECURITY)
-    projects = db.query(Project).filter(
+    # Serve repeated reads from the project cache
+    cache_key = list_key(current_user.id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    # Query projects for current user only (ROW-LEVEL SECURITY),
+    # with document counts aggregated in the same query
+    rows = db.query(Project, func.count(Document.id)).outerjoin(
+        Document, Document.project_id == Project.id
+    ).filter(
         Project.user_id == current_user.id
-    ).order_by(Project.created_at.desc()).all()
+    ).group_by(Project.id).order_by(Project.created_at.desc()).all()
 
     # Build response with document counts
-    response = []
-    for project in projects:
-        document_count = db.query(Document).filter(
-            Document.project_id == project.id
-        ).count()
-
-        response.append(ProjectListItem(
+    response = [
+        ProjectListItem.model_construct(
             id=project.id,
             name=project.name,
             description=project.description,
@@ -139,10 +208,14 @@ async def list_projects(
             created_at=project.created_at,
             updated_at=project.updated_at,
             document_count=document_count
-        ))
+        )
+        for project, document_count in rows
+    ]
 
     logger.info(f"Found {len(response)} projects for user {current_user.email}")
 
+    set_cached(cache_key, response)
+
     return response
 
 
@@ -159,38 +232,16 @@ async def get_project(
     """
     logger.info(f"Getting project {project_id} for user {current_user.email}")
 
-    # Query with row-level security check
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id  # CRITICAL: Security check
-    ).first()
+    # Serve repeated reads from the project cache (keyed by owner, so still row-level secure)
+    cache_key = detail_key(current_user.id, project_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return cached
 
-    if not project:
-        logger.warning(f"Project {project_id} not found or access denied for user {current_user.email}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    # Get documents for this project
-    documents = db.query(Document).filter(
-        Document.project_id == project_id
-    ).order_by(Document.created_at.desc()).all()
-
-    # Build document summaries
-    document_summaries = [
-        DocumentSummary(
-            id=doc.id,
-            document_type=doc.document_type,
-            file_name=doc.file_name,
-            file_type=doc.file_type,
-            processing_status=doc.processing_status,
-            created_at=doc.created_at
-        )
-        for doc in documents
-    ]
+    # Query with row-level security check (documents fetched in the same statement)
+    project, document_summaries = load_project_detail(project_id, current_user, db)
 
-    return ProjectResponse(
+    response = ProjectResponse.model_construct(
         id=project.id,
         name=project.name,
         description=project.description,
@@ -200,6 +251,10 @@ async def get_project(
         documents=document_summaries
     )
 
+    set_cached(cache_key, response)
+
+    return response
+
 
 @router.put("/{project_id}", response_model=ProjectResponse)
 async def update_project(
@@ -215,18 +270,8 @@ async def update_project(
     """
     logger.info(f"Updating project {project_id} for user {current_user.email}")
 
-    # Query with row-level security check
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id  # CRITICAL: Security check
-    ).first()
-
-    if not project:
-        logger.warning(f"Project {project_id} not found or access denied for user {current_user.email}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    # Query with row-level security check (documents fetched in the same statement)
+    project, document_summaries = load_project_detail(project_id, current_user, db)
 
     # Update fields if provided
     if request.name is not None:
@@ -235,31 +280,13 @@ async def update_project(
     if request.description is not None:
         project.description = request.description
 
-    project.updated_at = datetime.utcnow()
-
+    # updated_at is set by the model's onupdate when the UPDATE is flushed
     db.commit()
-    db.refresh(project)
+    invalidate_project(current_user.id, project_id)
 
     logger.success(f"Project {project_id} updated successfully")
 
-    # Get documents for response
-    documents = db.query(Document).filter(
-        Document.project_id == project_id
-    ).order_by(Document.created_at.desc()).all()
-
-    document_summaries = [
-        DocumentSummary(
-            id=doc.id,
-            document_type=doc.document_type,
-            file_name=doc.file_name,
-            file_type=doc.file_type,
-            processing_status=doc.processing_status,
-            created_at=doc.created_at
-        )
-        for doc in documents
-    ]
-
-    return ProjectResponse(
+    return ProjectResponse.model_construct(
         id=project.id,
         name=project.name,
         description=project.description,
@@ -283,8 +310,8 @@ async def delete_project(
     """
     logger.info(f"Deleting project {project_id} for user {current_user.email}")
 
-    # Query with row-level security check
-    project = db.query(Project).filter(
+    # Query with row-level security check (only the key is needed to delete it)
+    project = db.query(Project).options(load_only(Project.id)).filter(
         Project.id == project_id,
         Project.user_id == current_user.id  # CRITICAL: Security check
     ).first()
@@ -299,6 +326,7 @@ async def delete_project(
     # Delete project (cascade will delete documents, extractions, etc.)
     db.delete(project)
     db.commit()
+    invalidate_project(current_user.id, project_id)
 
     logger.success(f"Project {project_id} deleted successfully")
 
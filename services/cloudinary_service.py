@@ -10,11 +10,11 @@ from cloudinary.utils import cloudinary_url
 from config import settings
 from loguru import logger
 from pathlib import Path
-from typing import Dict, Optional
-import requests
+from typing import BinaryIO, Dict, Optional
 from io import BytesIO
 import asyncio
-from functools import partial
+import aiofiles
+import httpx
 
 
 # Configure Cloudinary on module import
@@ -27,9 +27,48 @@ cloudinary.config(
 
 logger.success(f"✅ Cloudinary configured: {settings.cloudinary_cloud_name}")
 
+# Documents are sent in chunks of this size (Cloudinary's minimum chunk is 5 MB)
+DOCUMENT_UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+# Files above this size are uploaded in chunks (upload_large) instead of one request body
+CHUNKED_UPLOAD_THRESHOLD = 10 * 1024 * 1024
+
+# Resource types a project folder can hold (deleted separately)
+CLOUDINARY_RESOURCE_TYPES = ("image", "raw", "video")
+
+# Downloads share one pooled async client (no threadpool worker per download)
+DOWNLOAD_TIMEOUT_S = 60.0
+DOWNLOAD_MAX_CONNECTIONS = 100
+DOWNLOAD_KEEPALIVE_CONNECTIONS = 20
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared download client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=DOWNLOAD_TIMEOUT_S,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=DOWNLOAD_MAX_CONNECTIONS,
+                max_keepalive_connections=DOWNLOAD_KEEPALIVE_CONNECTIONS
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared download client (call on application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 async def upload_document(
-    file_bytes: bytes,
+    file_obj: BinaryIO,
     filename: str,
     user_id: str,
     session_id: str,
@@ -39,7 +78,7 @@ async def upload_document(
     Upload document (PDF/DOCX) to Cloudinary cloud storage
 
     Args:
-        file_bytes: File content as bytes
+        file_obj: Readable binary file positioned at the start (streamed, never read whole)
         filename: Original filename
         user_id: User ID for folder organization
         session_id: Session ID for folder organization
@@ -59,11 +98,13 @@ async def upload_document(
         # Cloudinary folder structure: patmaster/{user_id}/{session_id}/
         folder = f"patmaster/{user_id}/{session_id}"
 
-        # Upload to Cloudinary (run in thread to avoid blocking async event loop)
+        # Upload to Cloudinary in chunks (run in thread to avoid blocking async event loop)
         # resource_type="auto" detects: image (PNG/JPG) vs raw (PDF/DOCX)
         result = await asyncio.to_thread(
-            cloudinary.uploader.upload,
-            file_bytes,
+            cloudinary.uploader.upload_large,
+            file_obj,
+            chunk_size=DOCUMENT_UPLOAD_CHUNK_SIZE,
+            filename=filename,  # A stream has no name of its own
             folder=folder,
             public_id=document_type,
             resource_type="auto",  # Auto-detect file type
@@ -132,6 +173,18 @@ async def upload_extracted_image(
         raise
 
 
+def _upload_path(path: Path, **options) -> Dict[str, any]:
+    """
+    Upload a local file, chunked when it is large (blocking - run in a thread)
+
+    A single-request upload builds the whole multipart body in memory; upload_large
+    reads and sends the file one chunk at a time.
+    """
+    if path.stat().st_size > CHUNKED_UPLOAD_THRESHOLD:
+        return cloudinary.uploader.upload_large(str(path), chunk_size=DOCUMENT_UPLOAD_CHUNK_SIZE, **options)
+    return cloudinary.uploader.upload(str(path), **options)
+
+
 async def upload_image_from_path(
     image_path: Path,
     user_id: str,
@@ -153,12 +206,11 @@ async def upload_image_from_path(
     try:
         folder = f"patmaster/{user_id}/{session_id}/images"
 
-        # Upload from file path (run in thread to avoid blocking async event loop)
-        with open(image_path, "rb") as f:
-            file_data = f.read()
+        # Upload from file path (the SDK opens and reads it inside the worker thread,
+        # so no disk I/O happens on the event loop)
         result = await asyncio.to_thread(
-            cloudinary.uploader.upload,
-            file_data,
+            _upload_path,
+            image_path,
             folder=folder,
             public_id=image_id,
             resource_type="image",
@@ -193,9 +245,7 @@ async def download_file(cloudinary_url: str) -> bytes:
         File content as bytes
     """
     try:
-        response = await asyncio.to_thread(
-            partial(requests.get, cloudinary_url, timeout=30)
-        )
+        response = await _get_http_client().get(cloudinary_url)
         response.raise_for_status()
 
         logger.debug(f"📥 Downloaded file from Cloudinary ({len(response.content) / 1024:.2f} KB)")
@@ -207,6 +257,35 @@ async def download_file(cloudinary_url: str) -> bytes:
         raise
 
 
+async def download_file_to_path(cloudinary_url: str, dest_path: Path) -> int:
+    """
+    Stream a file from Cloudinary URL to a local path without holding it in memory
+
+    Args:
+        cloudinary_url: Cloudinary secure URL
+        dest_path: Local file to write
+
+    Returns:
+        Number of bytes written
+    """
+    try:
+        size = 0
+        async with _get_http_client().stream("GET", cloudinary_url) as response:
+            response.raise_for_status()
+            async with aiofiles.open(dest_path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+                    size += len(chunk)
+
+        logger.debug(f"📥 Downloaded file from Cloudinary to {dest_path} ({size / 1024:.2f} KB)")
+
+        return size
+
+    except Exception as e:
+        logger.error(f"❌ Failed to download from Cloudinary: {e}")
+        raise
+
+
 async def delete_project_files(user_id: str, session_id: str):
     """
     Delete all files for a project from Cloudinary
@@ -218,8 +297,18 @@ async def delete_project_files(user_id: str, session_id: str):
     try:
         folder = f"patmaster/{user_id}/{session_id}"
 
-        # Delete all resources in folder (run in thread)
-        await asyncio.to_thread(cloudinary.api.delete_resources_by_prefix, folder)
+        # Delete all resources in folder - the API deletes one resource type per call,
+        # so documents (raw), images and any videos are deleted concurrently (run in threads)
+        outcomes = await asyncio.gather(
+            *(
+                asyncio.to_thread(cloudinary.api.delete_resources_by_prefix, folder, resource_type=resource_type)
+                for resource_type in CLOUDINARY_RESOURCE_TYPES
+            ),
+            return_exceptions=True
+        )
+        for resource_type, outcome in zip(CLOUDINARY_RESOURCE_TYPES, outcomes):
+            if isinstance(outcome, Exception):
+                logger.debug(f"Deleting {resource_type} resources in {folder} failed: {outcome}")
 
         # Delete the folder itself
         try:
@@ -259,6 +348,8 @@ __all__ = [
     'upload_extracted_image',
     'upload_image_from_path',
     'download_file',
+    'download_file_to_path',
+    'close_http_client',
     'delete_project_files',
     'get_file_url'
 ]
@@ -30,6 +30,29 @@ from pipeline.cloudinary_wrapper import (
     cleanup_temp_file
 )
 
+from services.project_cache import invalidate_project
+
+# Serialized form of the (very common) empty collections
+EMPTY_LIST_JSON = "[]"
+EMPTY_DICT_JSON = "{}"
+
+# JSON columns are stored compact (no spaces after separators) - smaller rows and Turso writes
+JSON_SEPARATORS = (",", ":")
+
+
+def _to_json(value) -> str:
+    """Compact json.dumps with the empty list/dict cases answered without serializing"""
+    if isinstance(value, list) and not value:
+        return EMPTY_LIST_JSON
+    if isinstance(value, dict) and not value:
+        return EMPTY_DICT_JSON
+    return json.dumps(value, separators=JSON_SEPARATORS)
+
+
+def _fields(item) -> dict:
+    """Field values of a pipeline result item, whether it is a model instance or a plain dict"""
+    return item if isinstance(item, dict) else vars(item)
+
 
 async def process_extraction(document: Document, db: Session):
     """
@@ -51,6 +74,7 @@ async def process_extraction(document: Document, db: Session):
         # Update status to processing
         document.processing_status = "processing"
         db.commit()
+        invalidate_project(document.project.user_id, document.project_id)
 
         # Get project details for user_id and session_id
         project = document.project
@@ -131,6 +155,7 @@ async def process_extraction(document: Document, db: Session):
         # Update document status
         document.processing_status = "completed"
         db.commit()
+        invalidate_project(document.project.user_id, document.project_id)
 
         logger.success(f"Extraction completed for document {document.id}")
 
@@ -141,6 +166,7 @@ async def process_extraction(document: Document, db: Session):
         document.processing_status = "failed"
         document.error_message = str(e)
         db.commit()
+        invalidate_project(document.project.user_id, document.project_id)
 
         raise
 
@@ -174,68 +200,74 @@ async def save_extraction_to_db(
         gemini_time=int(extraction_data.get("gemini_time", 0) * 1000),
         total_time=int(extraction_data.get("total_time", 0) * 1000),
         extraction_method=extraction_data.get("extraction_method", "unknown"),
-        extraction_metadata=json.dumps(extraction_data.get("extraction_sources", {}))
+        extraction_metadata=_to_json(extraction_data.get("extraction_sources", {}))
     )
 
     db.add(extraction)
     db.flush()  # Get extraction.id before adding related records
 
-    # Save images
-    for img in extraction_data.get("images", []):
-        image = ExtractedImage(
+    # Save images (added together - the flush sends one multi-row INSERT per table;
+    # each item is normalized to its field dict once instead of hasattr probes per field)
+    images = extraction_data.get("images", [])
+    db.add_all([
+        ExtractedImage(
             extraction_id=extraction.id,
-            image_id=img.image_id if hasattr(img, 'image_id') else img.get("image_id", ""),
-            page_number=img.page_number if hasattr(img, 'page_number') else img.get("page_number", 0),
-            image_path=img.image_path if hasattr(img, 'image_path') else img.get("image_path", ""),
-            image_type=img.image_type if hasattr(img, 'image_type') else img.get("image_type"),
-            width=img.width if hasattr(img, 'width') else img.get("width"),
-            height=img.height if hasattr(img, 'height') else img.get("height"),
-            presigned_url=img.presigned_url if hasattr(img, 'presigned_url') else img.get("presigned_url"),
-            diagram_description=img.diagram_description if hasattr(img, 'diagram_description') else img.get("diagram_description")
+            image_id=img.get("image_id", ""),
+            page_number=img.get("page_number", 0),
+            image_path=img.get("image_path", ""),
+            image_type=img.get("image_type"),
+            width=img.get("width"),
+            height=img.get("height"),
+            presigned_url=img.get("presigned_url"),
+            diagram_description=img.get("diagram_description")
         )
-        db.add(image)
+        for img in map(_fields, images)
+    ])
 
-    logger.info(f"Saved {len(extraction_data.get('images', []))} images")
+    logger.info(f"Saved {len(images)} images")
 
     # Save diagram descriptions
-    for desc in diagram_descriptions:
-        diagram = DiagramDescription(
+    db.add_all([
+        DiagramDescription(
             extraction_id=extraction.id,
-            image_id=desc.image_id if hasattr(desc, 'image_id') else desc.get("image_id", ""),
-            is_diagram=desc.is_diagram if hasattr(desc, 'is_diagram') else desc.get("is_diagram", True),
-            diagram_type=desc.diagram_type if hasattr(desc, 'diagram_type') else desc.get("diagram_type"),
-            outermost_elements=json.dumps(desc.outermost_elements if hasattr(desc, 'outermost_elements') else desc.get("outermost_elements", [])),
-            shape_mapping=json.dumps(desc.shape_mapping if hasattr(desc, 'shape_mapping') else desc.get("shape_mapping", {})),
-            nested_components=json.dumps(desc.nested_components if hasattr(desc, 'nested_components') else desc.get("nested_components", {})),
-            connections=json.dumps(desc.connections if hasattr(desc, 'connections') else desc.get("connections", [])),
-            all_text_labels=json.dumps(desc.all_text_labels if hasattr(desc, 'all_text_labels') else desc.get("all_text_labels", [])),
-            description_summary=desc.description_summary if hasattr(desc, 'description_summary') else desc.get("description_summary", ""),
-            image_type=desc.image_type if hasattr(desc, 'image_type') else desc.get("image_type")
+            image_id=desc.get("image_id", ""),
+            is_diagram=desc.get("is_diagram", True),
+            diagram_type=desc.get("diagram_type"),
+            outermost_elements=_to_json(desc.get("outermost_elements", [])),
+            shape_mapping=_to_json(desc.get("shape_mapping", {})),
+            nested_components=_to_json(desc.get("nested_components", {})),
+            connections=_to_json(desc.get("connections", [])),
+            all_text_labels=_to_json(desc.get("all_text_labels", [])),
+            description_summary=desc.get("description_summary", ""),
+            image_type=desc.get("image_type")
         )
-        db.add(diagram)
+        for desc in map(_fields, diagram_descriptions)
+    ])
 
     logger.info(f"Saved {len(diagram_descriptions)} diagram descriptions")
 
     # Save tables
-    for tbl in extraction_data.get("tables", []):
-        table = ExtractedTable(
+    tables = extraction_data.get("tables", [])
+    db.add_all([
+        ExtractedTable(
             extraction_id=extraction.id,
-            table_id=tbl.table_id if hasattr(tbl, 'table_id') else tbl.get("table_id", ""),
-            page_number=tbl.page_number if hasattr(tbl, 'page_number') else tbl.get("page_number", 0),
-            html_content=tbl.html_content if hasattr(tbl, 'html_content') else tbl.get("html_content", ""),
-            headers_json=json.dumps(tbl.headers if hasattr(tbl, 'headers') else tbl.get("headers", [])),
-            rows_json=json.dumps(tbl.rows if hasattr(tbl, 'rows') else tbl.get("rows", [])),
-            num_rows=tbl.num_rows if hasattr(tbl, 'num_rows') else tbl.get("num_rows", 0),
-            num_cols=tbl.num_cols if hasattr(tbl, 'num_cols') else tbl.get("num_cols", 0),
+            table_id=row.get("table_id", ""),
+            page_number=row.get("page_number", 0),
+            html_content=tbl.get_html() if hasattr(tbl, 'get_html') else row.get("html_content", ""),
+            headers_json=_to_json(row.get("headers", [])),
+            rows_json=_to_json(row.get("rows", [])),
+            num_rows=row.get("num_rows", 0),
+            num_cols=row.get("num_cols", 0),
             b_box_x=tbl.b_box.x if (hasattr(tbl, 'b_box') and tbl.b_box) else None,
             b_box_y=tbl.b_box.y if (hasattr(tbl, 'b_box') and tbl.b_box) else None,
             b_box_width=tbl.b_box.width if (hasattr(tbl, 'b_box') and tbl.b_box) else None,
             b_box_height=tbl.b_box.height if (hasattr(tbl, 'b_box') and tbl.b_box) else None,
-            extraction_source=tbl.extraction_source if hasattr(tbl, 'extraction_source') else tbl.get("extraction_source")
+            extraction_source=row.get("extraction_source")
         )
-        db.add(table)
+        for tbl, row in zip(tables, map(_fields, tables))
+    ])
 
-    logger.info(f"Saved {len(extraction_data.get('tables', []))} tables")
+    logger.info(f"Saved {len(tables)} tables")
 
     # Commit all changes
     db.commit()
@@ -0,0 +1,78 @@
+"""
+Project Cache
+Short-lived in-memory cache of project list/detail responses
+
+Entries are dropped explicitly whenever a project or one of its documents
+changes; the TTL only bounds staleness for changes made outside these paths.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Maximum cached responses (least recently used evicted first)
+PROJECT_CACHE_SIZE = 10_000
+
+# Seconds a cached response stays valid
+PROJECT_CACHE_TTL_S = 30.0
+
+_entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+
+def list_key(user_id: str) -> Tuple[str, str]:
+    """Cache key of a user's project list"""
+    return ("list", user_id)
+
+
+def detail_key(user_id: str, project_id: str) -> Tuple[str, str, str]:
+    """Cache key of one project's detail response"""
+    return ("detail", user_id, project_id)
+
+
+def get_cached(key: Hashable) -> Optional[Any]:
+    """
+    Cached value for key, or None if missing or expired
+
+    Args:
+        key: list_key(...) or detail_key(...)
+
+    Returns:
+        Cached response or None
+    """
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _entries[key]
+        return None
+
+    _entries.move_to_end(key)
+    return value
+
+
+def set_cached(key: Hashable, value: Any):
+    """
+    Store a response for key
+
+    Args:
+        key: list_key(...) or detail_key(...)
+        value: Response to cache (must not be mutated afterwards)
+    """
+    _entries[key] = (time.monotonic() + PROJECT_CACHE_TTL_S, value)
+    _entries.move_to_end(key)
+    if len(_entries) > PROJECT_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+
+def invalidate_project(user_id: str, project_id: Optional[str] = None):
+    """
+    Drop cached responses affected by a change to a user's project
+
+    Args:
+        user_id: Project owner
+        project_id: Changed project (None when only the list changed, e.g. on create)
+    """
+    _entries.pop(list_key(user_id), None)
+    if project_id is not None:
+        _entries.pop(detail_key(user_id, project_id), None)
@@ -0,0 +1,7 @@
+"""
+Shared test setup: config.Settings requires these at import time
+"""
+import os
+
+for _name in ("LLAMA_CLOUD_API_KEY", "GEMINI_API_KEY", "TURSO_DATABASE_URL", "TURSO_AUTH_TOKEN", "JWT_SECRET_KEY"):
+    os.environ.setdefault(_name, "test")
@@ -0,0 +1,77 @@
+"""
+Tests for HybridPDFExtractor layer scheduling
+"""
+import asyncio
+import threading
+
+import fitz
+
+from pipeline import pdf_extractor
+from pipeline.pdf_extractor import PDFExtractor
+from pipeline.pdf_extractor_hybrid import HybridPDFExtractor
+
+
+def _make_pdf(path) -> str:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_v1_parse_starts_while_pymupdf_layer_is_running(tmp_path, monkeypatch):
+    pdf_path = _make_pdf(tmp_path / "doc.pdf")
+    events = []
+    v1_parse_started = threading.Event()
+    probe_calls = []
+
+    extractor_v1 = PDFExtractor.__new__(PDFExtractor)
+    extractor_v1.output_dir = tmp_path
+    parser = object()
+    monkeypatch.setattr(extractor_v1, "_get_parser", lambda parse_mode, page_count: parser, raising=False)
+
+    real_probe = extractor_v1._probe_pdf
+
+    def counting_probe(path):
+        probe_calls.append(path)
+        return real_probe(path)
+
+    monkeypatch.setattr(extractor_v1, "_probe_pdf", counting_probe, raising=False)
+
+    async def fake_llamaparse(path, parser_arg=None):
+        assert parser_arg is parser
+        events.append("v1_parse_start")
+        v1_parse_started.set()
+        return {
+            "text_markdown": "# Hello",
+            "text_plain": "Hello",
+            "tables": [],
+            "mermaid_diagrams": [],
+            "confidence_score": None,
+            "processing_time": 0
+        }
+
+    def slow_pymupdf(path, on_image=None, render_pages=0):
+        # Hold the fitz lock for the whole layer: V1 must not need MuPDF to reach its parse
+        with pdf_extractor._FITZ_LOCK:
+            events.append("pymupdf_start")
+            v1_parse_started.wait(timeout=5)
+            events.append("pymupdf_end")
+        return {"images": [], "text_blocks": [], "text_plain": "", "page_images": []}
+
+    monkeypatch.setattr(extractor_v1, "_extract_with_llamaparse", fake_llamaparse, raising=False)
+    monkeypatch.setattr(extractor_v1, "_pymupdf_sync_extract", slow_pymupdf, raising=False)
+
+    hybrid = HybridPDFExtractor.__new__(HybridPDFExtractor)
+    hybrid.output_dir = tmp_path
+    hybrid._extractor_v1 = extractor_v1
+    hybrid._extractor_v2 = None
+    hybrid._v2_initialized = True
+    monkeypatch.setattr(hybrid, "_load_cached_result", lambda file_hash: None, raising=False)
+    monkeypatch.setattr(hybrid, "_save_cached_result", lambda file_hash, result: None, raising=False)
+
+    result = asyncio.run(hybrid.extract_pdf(pdf_path))
+
+    assert events.index("v1_parse_start") < events.index("pymupdf_end")
+    assert len(probe_calls) == 1
+    assert result["text_markdown"] == "# Hello"
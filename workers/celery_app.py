@@ -3,11 +3,64 @@ Celery Worker Configuration
 Handles async extraction jobs for scalability
 """
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init, worker_process_shutdown
 from loguru import logger
 import asyncio
+import os
+import shutil
+import socket
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from config import settings, get_session_output_dir
+from pipeline.pdf_extractor import extract_pdf_complete
+from pipeline.pdf_extractor_v2 import close_http_client as close_llamacloud_http_client
+from pipeline.docx_extractor import extract_docx_complete
+from pipeline.diagram_describer import describe_diagrams_batch
+from pipeline.merger import merge_complete_extraction, ExtractionMerger
+from pipeline.models import FileType
+
+# MessagePack payloads when available (kombu ships the serializer; it needs the msgpack package)
+try:
+    import msgpack  # noqa: F401
+    CELERY_SERIALIZER = "msgpack"
+except ImportError:
+    CELERY_SERIALIZER = "json"
+
+# libuv-backed event loop for the worker when available (falls back to stdlib asyncio)
+try:
+    import uvloop
+    _new_event_loop = uvloop.new_event_loop
+except ImportError:
+    _new_event_loop = asyncio.new_event_loop
+
+# Keep idle Redis connections alive and health-checked so pooled sockets stay usable
+REDIS_KEEPALIVE_OPTIONS = {
+    "socket_keepalive": True,
+    "socket_connect_timeout": 5,
+    "retry_on_timeout": True,
+    "health_check_interval": 30,
+}
+if hasattr(socket, "TCP_KEEPIDLE"):  # Linux only
+    REDIS_KEEPALIVE_OPTIONS["socket_keepalive_options"] = {socket.TCP_KEEPIDLE: 60}
+
+# Threads used to delete stale extraction directories in parallel
+CLEANUP_WORKERS = 8
+
+# LlamaParse results reference no session files and cost parse credits, so they are kept longer
+LLAMAPARSE_CACHE_MAX_AGE_HOURS = 7 * 24
+
+# PDF extraction queues: small uploads finish in seconds and must not wait behind long decks
+PDF_SMALL_QUEUE = "pdf_small"
+PDF_LARGE_QUEUE = "pdf_large"
+SMALL_PDF_MAX_BYTES = 1_000_000
 
-from config import settings
+# Per-task memory deltas kept (per worker process) when settings.worker_memory_profiling is on
+MEMORY_DELTA_WINDOW = 100
 
 # Initialize Celery app
 celery_app = Celery(
@@ -18,95 +71,174 @@ celery_app = Celery(
 
 # Celery configuration
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer=CELERY_SERIALIZER,
+    accept_content=["msgpack", "json"],  # JSON still accepted from older producers
+    result_serializer=CELERY_SERIALIZER,
+    result_accept_content=["msgpack", "json"],
     timezone="UTC",
     enable_utc=True,
-    task_track_started=True,
+    result_expires=3600,  # Drop finished results from Redis after an hour (default is a day)
     task_time_limit=settings.extraction_timeout,  # Hard timeout
     task_soft_time_limit=settings.extraction_timeout - 30,  # Soft timeout (warning)
     worker_prefetch_multiplier=1,  # Process one task at a time per worker
-    worker_max_tasks_per_child=50,  # Restart worker after 50 tasks (prevent memory leaks)
+    worker_max_memory_per_child=512_000,  # Recycle a worker child once its RSS passes ~512 MB (KiB)
+    worker_max_tasks_per_child=1000,  # Safety net only; recycling is memory-driven
+    task_acks_late=True,  # Ack after the task finishes so a killed worker's task is redelivered
+    task_reject_on_worker_lost=True,  # Requeue (not ack) when the worker process dies mid-task
+    task_acks_on_failure_or_timeout=True,  # A task that always times out must not loop through the queue
+    task_routes={"extract_pdf_async": {"queue": PDF_LARGE_QUEUE}},  # enqueue_pdf_extraction picks pdf_small
+    broker_pool_limit=32,  # Bounded, reused broker connections instead of churn under load
+    broker_transport_options={
+        # Redis must not redeliver an unacked task while it can still be running
+        "visibility_timeout": settings.extraction_timeout + 60,
+        **REDIS_KEEPALIVE_OPTIONS,
+    },
+    # Result backend (progress updates / results) gets the same connection hygiene
+    redis_socket_keepalive=True,
+    redis_socket_connect_timeout=5,
+    redis_retry_on_timeout=True,
+    redis_backend_health_check_interval=30,
 )
 
+# One event loop per worker process, reused by every task it runs. Module-level
+# asyncio primitives and pooled HTTP clients (Gemini semaphore, httpx clients)
+# bind to the loop they are first used on, so a fresh loop per task would break them.
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
 
-@celery_app.task(name="extract_pdf_async", bind=True)
-def extract_pdf_async(self, pdf_path: str, user_id: str, session_id: str):
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Return the worker process's event loop, creating it on first use"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = _new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+@worker_process_init.connect
+def _init_worker_loop(**kwargs):
+    """Create the event loop when a worker child process starts"""
+    _get_worker_loop()
+
+
+@worker_process_shutdown.connect
+def _close_worker_loop(**kwargs):
+    """Close pooled HTTP clients, finalize async generators and close the event loop when a worker child exits"""
+    global _worker_loop
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        _worker_loop.run_until_complete(close_llamacloud_http_client())
+        _worker_loop.run_until_complete(_worker_loop.shutdown_asyncgens())
+        _worker_loop.close()
+    _worker_loop = None
+
+
+# Traced memory at task start (by task id) and recent per-task deltas, for leak diagnosis
+_task_start_memory: Dict[str, int] = {}
+_task_memory_deltas: Deque[int] = deque(maxlen=MEMORY_DELTA_WINDOW)
+
+
+@worker_process_init.connect
+def _start_memory_tracing(**kwargs):
+    """Trace allocations in this worker child when memory profiling is enabled"""
+    if settings.worker_memory_profiling and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@task_prerun.connect
+def _record_task_start_memory(task_id=None, **kwargs):
+    """Remember the traced memory before a task runs"""
+    if tracemalloc.is_tracing():
+        _task_start_memory[task_id] = tracemalloc.get_traced_memory()[0]
+
+
+@task_postrun.connect
+def _log_task_memory_delta(task_id=None, task=None, **kwargs):
     """
-    Async Celery task for PDF extraction
+    Log how much traced memory a task left behind
+
+    A rolling mean that stays near zero means worker recycling (max_memory_per_child /
+    max_tasks_per_child) is only a safety net; steady growth points at a real leak.
+    """
+    start = _task_start_memory.pop(task_id, None)
+    if start is None:
+        return
+
+    delta = tracemalloc.get_traced_memory()[0] - start
+    _task_memory_deltas.append(delta)
+    mean_delta = sum(_task_memory_deltas) / len(_task_memory_deltas)
+    logger.info(
+        f"Memory {task.name if task else task_id}: retained {delta / 1024:+.1f} KiB "
+        f"(mean {mean_delta / 1024:+.1f} KiB over last {len(_task_memory_deltas)} tasks)"
+    )
+
+
+def _report_progress(task, stage: str, progress: float):
+    """Publish a PROCESSING state to the result backend (one Redis write per call)"""
+    task.update_state(state="PROCESSING", meta={"stage": stage, "progress": progress})
+
+
+def _run_extraction_task(
+    task,
+    extractor_fn: Callable[[str, str, str], Awaitable[Dict[str, Any]]],
+    file_path: str,
+    user_id: str,
+    session_id: str,
+    file_type: FileType
+) -> Dict[str, Any]:
+    """
+    Shared driver for the PDF / DOCX extraction tasks: extract, describe diagrams, merge, save
 
     Args:
-        pdf_path: Path to PDF file
+        task: Bound Celery task (for progress updates)
+        extractor_fn: extract_pdf_complete or extract_docx_complete
+        file_path: Path to the uploaded file
         user_id: User identifier
         session_id: Session identifier
+        file_type: Type of the uploaded file
 
     Returns:
         Extraction result dictionary
     """
-    logger.info(f"Starting async PDF extraction: {pdf_path}")
+    label = file_type.value.upper()
+    logger.info(f"Starting async {label} extraction: {file_path}")
 
     try:
-        # Update task state
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "pdf_extraction", "progress": 0.1}
-        )
-
-        # Import here to avoid circular imports
-        from pipeline.pdf_extractor import extract_pdf_complete
-        from pipeline.diagram_describer import describe_diagrams_batch
-        from pipeline.merger import merge_complete_extraction, ExtractionMerger
-        from pipeline.models import FileType
-        import fitz
-
-        # Run async extraction in event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Stage 1: Extract PDF
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "extracting_pdf", "progress": 0.2}
-        )
+        # Run async extraction in the worker's event loop
+        loop = _get_worker_loop()
 
-        extraction_data = loop.run_until_complete(
-            extract_pdf_complete(pdf_path, user_id, session_id)
-        )
+        async def run_extraction():
+            """Extract the document, then describe its diagrams"""
+            # Stage 1: Extract document
+            _report_progress(task, f"extracting_{file_type.value}", 0.2)
 
-        # Get total pages
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
-        file_size = Path(pdf_path).stat().st_size
-        file_name = Path(pdf_path).name
-        doc.close()
+            extraction_data = await extractor_fn(file_path, user_id, session_id)
 
-        # Stage 2: Describe diagrams
-        images = extraction_data.get("images", [])
+            # Stage 2: Describe diagrams
+            images = extraction_data.get("images", [])
 
-        if images:
-            self.update_state(
-                state="PROCESSING",
-                meta={"stage": "describing_diagrams", "progress": 0.6}
+            # The PDF extractor reports the size of the file it already had open; otherwise
+            # stat it in a thread while the diagram descriptions are in flight
+            file_size, diagram_descriptions = await asyncio.gather(
+                asyncio.sleep(0, result=extraction_data["file_size"]) if extraction_data.get("file_size")
+                else asyncio.to_thread(os.path.getsize, file_path),
+                describe_diagrams_batch(images) if images else asyncio.sleep(0, result=[])
             )
 
-            diagram_descriptions = loop.run_until_complete(
-                describe_diagrams_batch(images)
-            )
-        else:
-            diagram_descriptions = []
+            return extraction_data, file_size, diagram_descriptions
+
+        extraction_data, file_size, diagram_descriptions = loop.run_until_complete(run_extraction())
+
+        total_pages = extraction_data.get("total_pages", 0)
+        file_name = Path(file_path).name
 
         # Stage 3: Merge results
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "merging_results", "progress": 0.9}
-        )
+        _report_progress(task, "merging_results", 0.9)
 
         result = merge_complete_extraction(
             user_id=user_id,
             session_id=session_id,
             file_name=file_name,
-            file_type=FileType.PDF,
+            file_type=file_type,
             file_size=file_size,
             extraction_data=extraction_data,
             diagram_descriptions=diagram_descriptions,
@@ -114,14 +246,11 @@ def extract_pdf_async(self, pdf_path: str, user_id: str, session_id: str):
         )
 
         # Save result
-        from config import get_session_output_dir
         output_dir = get_session_output_dir(user_id, session_id)
         result_path = output_dir / "extraction_result.json"
         ExtractionMerger.save_result_to_json(result, result_path)
 
-        loop.close()
-
-        logger.success(f"Async PDF extraction completed: {pdf_path}")
+        logger.success(f"Async {label} extraction completed: {file_path}")
 
         return {
             "success": True,
@@ -131,113 +260,82 @@ def extract_pdf_async(self, pdf_path: str, user_id: str, session_id: str):
         }
 
     except Exception as e:
-        logger.error(f"Async PDF extraction failed: {e}")
+        logger.error(f"Async {label} extraction failed: {e}")
         return {
             "success": False,
             "error": str(e)
         }
 
 
-@celery_app.task(name="extract_docx_async", bind=True)
-def extract_docx_async(self, docx_path: str, user_id: str, session_id: str):
+@celery_app.task(name="extract_pdf_async", bind=True)
+def extract_pdf_async(self, pdf_path: str, user_id: str, session_id: str):
     """
-    Async Celery task for DOCX extraction
+    Async Celery task for PDF extraction
 
     Args:
-        docx_path: Path to DOCX file
+        pdf_path: Path to PDF file
         user_id: User identifier
         session_id: Session identifier
 
     Returns:
         Extraction result dictionary
     """
-    logger.info(f"Starting async DOCX extraction: {docx_path}")
+    return _run_extraction_task(self, extract_pdf_complete, pdf_path, user_id, session_id, FileType.PDF)
 
-    try:
-        # Update task state
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "docx_extraction", "progress": 0.1}
-        )
 
-        # Import here to avoid circular imports
-        from pipeline.docx_extractor import extract_docx_complete
-        from pipeline.diagram_describer import describe_diagrams_batch
-        from pipeline.merger import merge_complete_extraction, ExtractionMerger
-        from pipeline.models import FileType
-
-        # Run async extraction in event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Stage 1: Extract DOCX
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "extracting_docx", "progress": 0.2}
-        )
-
-        extraction_data = loop.run_until_complete(
-            extract_docx_complete(docx_path, user_id, session_id)
-        )
-
-        file_size = Path(docx_path).stat().st_size
-        file_name = Path(docx_path).name
+def enqueue_pdf_extraction(pdf_path: str, user_id: str, session_id: str):
+    """
+    Queue a PDF extraction on the small- or large-PDF queue by file size
 
-        # Stage 2: Describe diagrams
-        images = extraction_data.get("images", [])
+    Args:
+        pdf_path: Path to PDF file
+        user_id: User identifier
+        session_id: Session identifier
 
-        if images:
-            self.update_state(
-                state="PROCESSING",
-                meta={"stage": "describing_diagrams", "progress": 0.6}
-            )
+    Returns:
+        AsyncResult of the queued extract_pdf_async task
+    """
+    queue = PDF_SMALL_QUEUE if os.path.getsize(pdf_path) < SMALL_PDF_MAX_BYTES else PDF_LARGE_QUEUE
+    return extract_pdf_async.apply_async(args=(pdf_path, user_id, session_id), queue=queue)
 
-            diagram_descriptions = loop.run_until_complete(
-                describe_diagrams_batch(images)
-            )
-        else:
-            diagram_descriptions = []
 
-        # Stage 3: Merge results
-        self.update_state(
-            state="PROCESSING",
-            meta={"stage": "merging_results", "progress": 0.9}
-        )
+@celery_app.task(name="extract_docx_async", bind=True)
+def extract_docx_async(self, docx_path: str, user_id: str, session_id: str):
+    """
+    Async Celery task for DOCX extraction
 
-        result = merge_complete_extraction(
-            user_id=user_id,
-            session_id=session_id,
-            file_name=file_name,
-            file_type=FileType.DOCX,
-            file_size=file_size,
-            extraction_data=extraction_data,
-            diagram_descriptions=diagram_descriptions,
-            total_pages=0
-        )
+    Args:
+        docx_path: Path to DOCX file
+        user_id: User identifier
+        session_id: Session identifier
 
-        # Save result
-        from config import get_session_output_dir
-        output_dir = get_session_output_dir(user_id, session_id)
-        result_path = output_dir / "extraction_result.json"
-        ExtractionMerger.save_result_to_json(result, result_path)
+    Returns:
+        Extraction result dictionary
+    """
+    return _run_extraction_task(self, extract_docx_complete, docx_path, user_id, session_id, FileType.DOCX)
 
-        loop.close()
 
-        logger.success(f"Async DOCX extraction completed: {docx_path}")
+def _prune_cache_dir(cache_dir: Path, cutoff_time: float) -> int:
+    """
+    Delete cache files last written before cutoff_time
 
-        return {
-            "success": True,
-            "session_id": session_id,
-            "user_id": user_id,
-            "result_path": str(result_path)
-        }
+    Args:
+        cache_dir: Content-hash keyed cache directory
+        cutoff_time: Epoch seconds; older files are removed
 
-    except Exception as e:
-        logger.error(f"Async DOCX extraction failed: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    Returns:
+        Number of files deleted
+    """
+    deleted = 0
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff_time:
+                try:
+                    os.unlink(entry.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass  # Removed concurrently
+    return deleted
 
 
 @celery_app.task(name="cleanup_old_extractions")
@@ -251,32 +349,44 @@ def cleanup_old_extractions(age_hours: int = 24):
     logger.info(f"Starting cleanup of extractions older than {age_hours} hours")
 
     try:
-        import time
-        from config import settings
-
         output_dir = settings.extracted_output_dir
         current_time = time.time()
         cutoff_time = current_time - (age_hours * 3600)
 
-        deleted_count = 0
-
-        for session_dir in output_dir.iterdir():
-            if session_dir.is_dir():
-                # Check directory modification time
-                mtime = session_dir.stat().st_mtime
-
-                if mtime < cutoff_time:
-                    # Delete directory
-                    import shutil
-                    shutil.rmtree(session_dir)
-                    deleted_count += 1
-                    logger.info(f"Deleted old extraction: {session_dir.name}")
+        # Collect stale directories first, then delete them in parallel (rmtree is all blocking unlinks).
+        # scandir entries carry the d_type from readdir and cache their stat result.
+        with os.scandir(output_dir) as entries:
+            stale_dirs = [
+                entry.path for entry in entries
+                if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff_time
+            ]
+
+        def delete_dir(session_dir: str):
+            shutil.rmtree(session_dir)
+            logger.info(f"Deleted old extraction: {os.path.basename(session_dir)}")
+
+        with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS, thread_name_prefix="cleanup") as executor:
+            list(executor.map(delete_dir, stale_dirs))
+
+        deleted_count = len(stale_dirs)
+
+        # Content-hash caches: results point at images in session directories, so they age out
+        # with them; LlamaParse page texts are self-contained and get a longer lifetime
+        cache_deleted_count = _prune_cache_dir(settings.extraction_result_cache_dir, cutoff_time)
+        cache_deleted_count += _prune_cache_dir(settings.hybrid_cache_dir, cutoff_time)
+        cache_deleted_count += _prune_cache_dir(
+            settings.llamaparse_cache_dir,
+            current_time - max(age_hours, LLAMAPARSE_CACHE_MAX_AGE_HOURS) * 3600
+        )
 
-        logger.success(f"Cleanup completed. Deleted {deleted_count} old extractions")
+        logger.success(
+            f"Cleanup completed. Deleted {deleted_count} old extractions and {cache_deleted_count} cache files"
+        )
 
         return {
             "success": True,
-            "deleted_count": deleted_count
+            "deleted_count": deleted_count,
+            "cache_deleted_count": cache_deleted_count
         }
 
     except Exception as e: